@@ -1,7 +1,11 @@
-from app import db, LoginAttempts, app
+import os
+os.environ.setdefault("ARTIFACT_PREWARM", "0")  # Only the database is needed here, not the model
+
+from app import db, LoginAttempts, app, ensure_schema
 from datetime import datetime
 
 # Use the application context to access the database
+ensure_schema()
 with app.app_context():
     # Create a test login attempt
     test_attempt = LoginAttempts(
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+MANIFEST_PATH = "artifacts_manifest.json"
+# Files produced by training that the API and offline scripts load
+MANIFEST_FILES = [
+    "autoencoder_weights.npz", "autoencoder_model.keras", "feature_pipeline.pkl",
+    "scaler.pkl", "ip_frequencies.pkl", "label_encoders.pkl",
+    "autoencoder_weights_float16.npz", "autoencoder_weights_int8.npz",
+]
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(paths=MANIFEST_FILES, manifest_path=MANIFEST_PATH, root="."):
+    """Records the size and SHA-256 of each artifact (paths relative to `root`); run after training or exporting."""
+    manifest = {}
+    for path in paths:
+        full_path = os.path.join(root, path)
+        if os.path.exists(full_path):
+            manifest[path] = {"size": os.path.getsize(full_path), "sha256": file_sha256(full_path)}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_file(path, expected, manifest_path=MANIFEST_PATH):
+    """Raises ValueError when `path` differs from its manifest entry (size first, then SHA-256)."""
+    if os.path.getsize(path) != expected["size"] or file_sha256(path) != expected["sha256"]:
+        raise ValueError(f"{path} does not match {manifest_path}; re-run training or `python artifacts.py`")
+
+
+class ArtifactLoader:
+    """Loads named artifacts on first use (or in a background pre-warm) and records timings.
+
+    Each artifact is registered with the files it reads and a loader callable; heavy imports
+    belong inside the loader so importing the app stays cheap. Before loading, every file is
+    checked against the content-hash manifest, so a stale or half-copied artifact fails with a
+    clear error instead of being unpickled. Without a manifest, verification is skipped.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest = load_manifest(manifest_path)
+        self.timings = {}  # name -> {"verify_s": ..., "load_s": ...}
+        self._loaders = {}
+        self._values = {}
+        self._locks = {}
+        self._ready = threading.Event()
+        self._prewarm_thread = None
+        self.error = None
+
+    def register(self, name, loader, paths=()):
+        self._loaders[name] = (loader, list(paths))
+        self._locks[name] = threading.Lock()
+
+    def verify(self, path):
+        if self.manifest is None or path not in self.manifest:
+            return
+        verify_file(path, self.manifest[path])
+
+    def get(self, name):
+        if name in self._values:  # Fast path once loaded; no lock on the request path
+            return self._values[name]
+        with self._locks[name]:  # Concurrent first requests (or the pre-warm) load it only once
+            if name not in self._values:
+                loader, paths = self._loaders[name]
+                start = time.perf_counter()
+                for path in paths:
+                    self.verify(path)
+                verified = time.perf_counter()
+                value = loader()
+                self.timings[name] = {"verify_s": verified - start, "load_s": time.perf_counter() - verified}
+                self._values[name] = value
+        return self._values[name]
+
+    def loaded(self, name):
+        return name in self._values
+
+    def prewarm(self, steps=()):
+        """Loads every registered artifact, then runs `steps` ((name, callable) pairs), in a daemon thread."""
+        def run():
+            try:
+                for name in self._loaders:
+                    self.get(name)
+                for name, step in steps:
+                    start = time.perf_counter()
+                    step()
+                    self.timings[name] = {"load_s": time.perf_counter() - start}
+                self._ready.set()
+                logging.info(f"Artifacts warm: {self.breakdown()}")
+            except Exception as e:  # Surfaced through /ready; requests still load lazily
+                self.error = f"{type(e).__name__}: {e}"
+                logging.exception("Artifact pre-warm failed")
+
+        self._prewarm_thread = threading.Thread(target=run, name="artifact-prewarm", daemon=True)
+        self._prewarm_thread.start()
+
+    def ready(self):
+        if self._prewarm_thread is None:  # No pre-warm: ready once everything was loaded on demand
+            return all(name in self._values for name in self._loaders)
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until the pre-warm finishes; returns False right away if none was started."""
+        if self._prewarm_thread is None:
+            return False
+        return self._ready.wait(timeout)
+
+    def breakdown(self):
+        return {name: {key: round(value, 4) for key, value in timing.items()} for name, timing in self.timings.items()}
+
+
+if __name__ == "__main__":
+    for path, entry in write_manifest().items():
+        print(f"✅ {path}: {entry['sha256'][:12]} ({entry['size']} bytes)")
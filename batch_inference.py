@@ -0,0 +1,104 @@
+import threading
+import time
+import numpy as np
+
+from metrics import Histogram, BATCH_SIZE_BUCKETS, MICROSECOND_BUCKETS
+
+
+class _PendingRequest:
+    __slots__ = ("row", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, row):
+        self.row = row
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row scoring calls into one batched call.
+
+    `score_fn` receives an (n, features) array and must return n per-row results.
+    A batch is dispatched when it reaches `max_batch_size` rows or when the oldest
+    queued row has waited `max_wait_us` microseconds, whichever comes first.
+    """
+
+    def __init__(self, score_fn, max_batch_size=32, max_wait_us=2000):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1_000_000.0
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(MICROSECOND_BUCKETS)
+        self._pending = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        """Queues one feature row and blocks until its result is ready."""
+        request = _PendingRequest(np.asarray(row, dtype=np.float64).reshape(-1))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append(request)
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._condition.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+            # Hold the batch open until it is full or the oldest request hits its deadline
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            dispatched_at = time.perf_counter()
+            for request in batch:
+                self.queue_wait_histogram.observe((dispatched_at - request.enqueued_at) * 1_000_000.0)
+            self.batch_size_histogram.observe(len(batch))
+            try:
+                results = self.score_fn(np.vstack([request.row for request in batch]))
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            for request in batch:
+                request.done.set()
+
+    def close(self):
+        """Stops accepting work and scores whatever is still queued."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_us": self.max_wait * 1_000_000.0,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_us": self.queue_wait_histogram.snapshot(),
+        }
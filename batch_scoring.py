@@ -0,0 +1,171 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+
+from dataset_store import parse_login_times
+from geo_features import haversine_km
+from risk_scoring import RULES, DEFAULT_THRESHOLDS, rule_based_risk_batch, decide_batch
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Same defaults as parse_login_request() for fields missing from a record
+RECORD_DEFAULTS = {
+    "user_id": "Unknown",
+    "ip_address": "0.0.0.0",
+    "latitude": 0.0,
+    "longitude": 0.0,
+    "timezone": "UTC",
+    "device_info": "Unknown",
+    "typing_speed": 0.0,
+    "mouse_speed": 0.0,
+}
+STATE_COLUMNS = ["ip_address", "device_info", "timezone", "latitude", "longitude", "login_time"]
+
+
+def iter_record_chunks(stream, input_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields DataFrames of at most chunk_size records from a CSV or NDJSON text stream."""
+    if input_format == "csv":
+        yield from pd.read_csv(stream, chunksize=chunk_size, dtype={"user_id": str})
+        return
+    if input_format != "ndjson":
+        raise ValueError(f"Unsupported input format '{input_format}' (expected csv or ndjson)")
+    records = []
+    for line in stream:
+        if line.strip():
+            records.append(json.loads(line))
+        if len(records) >= chunk_size:
+            yield pd.DataFrame.from_records(records)
+            records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+class BatchScorer:
+    """Applies the /login rule-based and autoencoder scoring to a stream of historical logins.
+
+    Records are treated as a committed login history (like login_attempts): each record's
+    "previous login" is the preceding record of the same user, carried across chunk boundaries.
+    Records of a user must arrive in login_time order across chunks.
+    """
+
+    def __init__(self, feature_pipeline, model, time_format=None, thresholds=DEFAULT_THRESHOLDS, rules=RULES):
+        self.feature_pipeline = feature_pipeline
+        self.model = model
+        self.time_format = time_format
+        self.thresholds = thresholds
+        self.rules = rules  # Same compiled risk_rules.json as /login
+        self.last_state = {}  # user_id -> last (ip, device, timezone, lat, lon, login_time)
+
+    def _normalize(self, chunk):
+        df = chunk.copy()
+        for col, default in RECORD_DEFAULTS.items():
+            if col not in df:
+                df[col] = default
+            else:
+                df[col] = df[col].fillna(default)
+        df["user_id"] = df["user_id"].astype(str)
+        for col in ["latitude", "longitude", "typing_speed", "mouse_speed"]:
+            df[col] = df[col].astype(np.float64)
+        df["typing_speed"] = df["typing_speed"].clip(lower=0.0)
+        df["mouse_speed"] = df["mouse_speed"].clip(lower=0.0)
+        df["login_time"] = parse_login_times(df["login_time"], self.time_format)
+        return df
+
+    def _previous_state(self, df):
+        """prev_* columns: within-chunk shift, seeded from the carried state for each user's first row."""
+        grouped = df.groupby("user_id", sort=False)
+        prev = pd.DataFrame({f"prev_{col}": grouped[col].shift(1) for col in STATE_COLUMNS}, index=df.index)
+        first_rows = prev["prev_login_time"].isna() & df["user_id"].isin(self.last_state.keys())
+        if first_rows.any():
+            carried = pd.DataFrame.from_dict(
+                {user: self.last_state[user] for user in df.loc[first_rows, "user_id"]},
+                orient="index", columns=[f"prev_{col}" for col in STATE_COLUMNS]
+            )
+            prev.loc[first_rows] = carried.loc[df.loc[first_rows, "user_id"]].to_numpy()
+        return prev
+
+    def score_chunk(self, chunk):
+        df = self._normalize(chunk)
+        df = df.sort_values(by=["user_id", "login_time"], kind="stable")
+        prev = self._previous_state(df)
+
+        prev_lat = prev["prev_latitude"].to_numpy(dtype=np.float64)
+        prev_lon = prev["prev_longitude"].to_numpy(dtype=np.float64)
+        lat = df["latitude"].to_numpy()
+        lon = df["longitude"].to_numpy()
+        time_diff = ((df["login_time"] - pd.to_datetime(prev["prev_login_time"])).dt.total_seconds() / 3600).to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            geo_velocity = np.where(time_diff > 0, haversine_km(prev_lat, prev_lon, lat, lon) / time_diff, 0.0)
+        geo_velocity = np.nan_to_num(geo_velocity, nan=0.0)
+
+        risk_score, change_flags = rule_based_risk_batch(
+            prev["prev_ip_address"], prev["prev_device_info"], prev["prev_timezone"], prev_lat, prev_lon,
+            df["ip_address"], df["device_info"], df["timezone"], lat, lon, rules=self.rules
+        )
+        has_changes = change_flags.any(axis=1)
+
+        raw = np.column_stack([
+            lat, lon, df["typing_speed"].to_numpy(), df["mouse_speed"].to_numpy(), geo_velocity,
+            df["login_time"].dt.hour.to_numpy(),
+            self.feature_pipeline.ip_frequency_many(df["ip_address"].to_numpy()),
+        ])
+        scaled = self.feature_pipeline.transform_rows(raw)
+        error_score = np.mean(np.abs(scaled - self.model.predict(scaled, verbose=0)), axis=1)
+
+        decision, reason, total_risk_score = decide_batch(error_score, risk_score, has_changes, self.thresholds,
+                                                          rules=self.rules)
+        blocked, _, block_reason = self.rules.block({"geo_velocity": geo_velocity})
+        decision = np.where(blocked, "block", decision)
+        reason = np.where(blocked, block_reason, reason)
+
+        # Carry each user's last record into the next chunk
+        last_rows = df.drop_duplicates("user_id", keep="last")
+        self.last_state.update(zip(last_rows["user_id"], last_rows[STATE_COLUMNS].itertuples(index=False, name=None)))
+
+        labels = np.array(self.rules.change_labels, dtype=object)
+        result = pd.DataFrame({
+            "user_id": df["user_id"],
+            "login_time": df["login_time"],
+            "status": decision,
+            "reason": reason,
+            "risk_score": total_risk_score,
+            "changes": ["; ".join(labels[row]) for row in change_flags],
+            "geo_velocity": geo_velocity,
+            "autoencoder_error": error_score,
+            "rule_based_risk": np.where(has_changes, risk_score, 0),
+        }, index=df.index)
+        return result.sort_index()  # Back to input order
+
+
+def score_stream(stream, input_format, feature_pipeline, model, chunk_size=DEFAULT_CHUNK_SIZE, time_format=None,
+                 thresholds=DEFAULT_THRESHOLDS):
+    """Yields one scored DataFrame per input chunk."""
+    scorer = BatchScorer(feature_pipeline, model, time_format=time_format, thresholds=thresholds)
+    for chunk in iter_record_chunks(stream, input_format, chunk_size):
+        yield scorer.score_chunk(chunk)
+
+
+def format_results(results, output_format, include_header=True):
+    """Serializes a scored chunk as NDJSON (the /login response shape) or CSV text."""
+    if output_format == "csv":
+        buffer = io.StringIO()
+        results.to_csv(buffer, index=False, header=include_header)
+        return buffer.getvalue()
+    lines = []
+    for row in results.itertuples(index=False):
+        lines.append(json.dumps({
+            "user_id": row.user_id,
+            "login_time": row.login_time.isoformat(),
+            "status": row.status,
+            "reason": row.reason,
+            "risk_score": float(row.risk_score),
+            "changes": row.changes.split("; ") if row.changes else [],
+            "geo_velocity": float(row.geo_velocity),
+            "breakdown": {
+                "autoencoder_error": float(row.autoencoder_error),
+                "rule_based_risk": int(row.rule_based_risk),
+                "total_risk_score": float(row.risk_score),
+            },
+        }))
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,284 @@
+import argparse
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+PROFILE_PATH = "behavior_profiles.npy"
+BEHAVIOR_FEATURES = ("typing_speed", "mouse_speed")
+DEFAULT_CAPACITY = 1 << 20  # Slots; grows by doubling past MAX_LOAD
+DEFAULT_WINDOW = 16  # Recent values kept per feature for quantiles
+DEFAULT_ALPHA = 0.2  # EWMA weight of the newest login
+DEFAULT_MIN_COUNT = 5  # Logins before z-scores are reported (0 until then)
+MAX_LOAD = 0.7
+_HASH_KEY = b"behavior-profile"
+
+
+def record_dtype(n_features=len(BEHAVIOR_FEATURES), window=DEFAULT_WINDOW):
+    """One fixed-size slot per user; key 0 marks an empty slot."""
+    return np.dtype([
+        ("key", "<u8"),
+        ("count", "<u4"),
+        ("ring_pos", "<u2"),  # Next slot of `recent` to overwrite
+        ("ring_len", "<u2"),
+        ("last_seen", "<f8"),  # Unix seconds of the latest update
+        ("mean", "<f8", (n_features,)),  # Welford running mean and sum of squared deviations
+        ("m2", "<f8", (n_features,)),
+        ("ewma", "<f8", (n_features,)),
+        ("recent", "<f4", (n_features, window)),
+    ])
+
+
+def user_key(user_id):
+    """Stable 64-bit key of a user id (Python's hash() is salted per process); never 0."""
+    digest = hashlib.blake2b(str(user_id).encode(), digest_size=8, key=_HASH_KEY).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _timestamp(login_time):
+    if login_time is None:
+        return time.time()
+    if isinstance(login_time, datetime):
+        if login_time.tzinfo is None:
+            login_time = login_time.replace(tzinfo=timezone.utc)  # Naive times (utcnow, CSVs) are UTC
+        return login_time.timestamp()
+    return float(login_time)
+
+
+class BehaviorProfileStore:
+    """Per-user running statistics of behavioral features in a memory-mapped hash table.
+
+    Every user owns one fixed-size record (see record_dtype) in a NumPy array backed by a .npy
+    file, found by linear probing on a 64-bit hash of the user id. A record holds the login
+    count, Welford mean/variance, an EWMA and a ring buffer of the last `window` values of each
+    feature, so update() and zscores() are O(1) and memory is capacity * itemsize bytes,
+    whatever the history length. The OS writes pages back to the file; flush() forces it.
+
+    Z-scores compare a login with the user's own baseline, so a naturally slow typist is not
+    an outlier just for being slow. Until a user has min_count logins they are reported as 0.
+    Reads and updates take a lock (_grow() swaps the arrays); the file must only be opened for
+    writing by one process.
+    """
+
+    def __init__(self, path=PROFILE_PATH, capacity=DEFAULT_CAPACITY, features=BEHAVIOR_FEATURES,
+                 window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA, min_count=DEFAULT_MIN_COUNT):
+        self.path = path
+        self.features = tuple(features)
+        self.alpha = alpha
+        self.min_count = min_count
+        dtype = record_dtype(len(self.features), window)
+        if os.path.exists(path):
+            records = np.load(path, mmap_mode="r+")
+            if records.dtype != dtype:
+                raise ValueError(f"{path} holds profiles for a different feature count or window; move it aside to rebuild")
+        else:
+            capacity = 1 << max(4, math.ceil(math.log2(capacity)))  # Power of two, so probing can mask
+            records = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(capacity,))
+        self._attach(records)
+        self.size = int(np.count_nonzero(self._keys))
+        self.window = window
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flush_thread = None
+
+    def _attach(self, records):
+        self.records = records
+        self.capacity = len(records)
+        self._mask = self.capacity - 1
+        # Plain ndarray views of each field (same memory): the hot path skips record lookups and memmap wrapping
+        fields = np.asarray(records)
+        self._keys, self._count, self._ring_pos, self._ring_len, self._last_seen, self._mean, self._m2, self._ewma, \
+            self._recent = (fields[name] for name in records.dtype.names)
+
+    def _find(self, key):
+        """Slot holding `key`, or the empty slot where it would go."""
+        keys, mask = self._keys, self._mask
+        slot = key & mask
+        while True:
+            found = int(keys[slot])
+            if found == key or found == 0:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        """Doubles the table into a new file, re-inserting every record in vectorized probing rounds."""
+        old = self.records
+        occupied = np.flatnonzero(old["key"])
+        tmp_path = self.path + ".tmp"
+        new = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=old.dtype, shape=(self.capacity * 2,))
+        mask = np.uint64(len(new) - 1)
+        slots = old["key"][occupied] & mask
+        while occupied.size:
+            free = np.flatnonzero(new["key"][slots] == 0)
+            _, first = np.unique(slots[free], return_index=True)  # One winner per free slot this round
+            placed = free[first]
+            new[slots[placed]] = old[occupied[placed]]
+            waiting = np.ones(occupied.size, dtype=bool)
+            waiting[placed] = False
+            occupied, slots = occupied[waiting], (slots[waiting] + np.uint64(1)) & mask
+        new.flush()
+        del old
+        os.replace(tmp_path, self.path)
+        self._attach(new)
+
+    def update(self, user_id, values, login_time=None):
+        """Adds one committed login's feature values (same order as `features`) to the user's profile."""
+        key = user_key(user_id)
+        last_seen = _timestamp(login_time)
+        with self._lock:
+            slot = self._find(key)
+            if self._keys[slot] == 0:
+                if self.size + 1 > self.capacity * MAX_LOAD:
+                    self._grow()
+                    slot = self._find(key)
+                self.records[slot] = 0
+                self._keys[slot] = key
+                self.size += 1
+            count = int(self._count[slot]) + 1
+            pos = int(self._ring_pos[slot])
+            mean, m2, ewma, recent = self._mean[slot], self._m2[slot], self._ewma[slot], self._recent[slot]
+            for i, value in enumerate(values):  # Plain floats: a handful of features is faster than array ops
+                x = float(value)
+                old_mean = float(mean[i])
+                new_mean = old_mean + (x - old_mean) / count  # Welford
+                mean[i] = new_mean
+                m2[i] += (x - old_mean) * (x - new_mean)
+                ewma[i] = x if count == 1 else self.alpha * x + (1 - self.alpha) * float(ewma[i])
+                recent[i, pos] = x
+            self._ring_pos[slot] = (pos + 1) % self.window
+            self._ring_len[slot] = min(int(self._ring_len[slot]) + 1, self.window)
+            self._count[slot] = count
+            self._last_seen[slot] = last_seen
+            self.updates += 1
+
+    def _slot(self, user_id):
+        """The user's slot or None; call with the lock held."""
+        slot = self._find(user_key(user_id))
+        return slot if self._keys[slot] != 0 else None
+
+    def zscores(self, user_id, values):
+        """{feature_z, feature_ewma_z} of a login against the user's baseline; zeros while it is too short.
+
+        z uses the long-run Welford mean, ewma_z the recent level (EWMA); both scale by the Welford std.
+        """
+        with self._lock:
+            slot = self._slot(user_id)
+            count = 0 if slot is None else int(self._count[slot])
+            if count < max(self.min_count, 2):
+                return {**{f"{name}_z": 0.0 for name in self.features}, **{f"{name}_ewma_z": 0.0 for name in self.features}}
+            scores = {}
+            for i, name in enumerate(self.features):
+                std = math.sqrt(self._m2[slot, i] / (count - 1))
+                x = float(values[i])
+                scores[f"{name}_z"] = (x - float(self._mean[slot, i])) / std if std > 0 else 0.0
+                scores[f"{name}_ewma_z"] = (x - float(self._ewma[slot, i])) / std if std > 0 else 0.0
+            return scores
+
+    def profile(self, user_id, quantiles=(0.1, 0.5, 0.9)):
+        """The user's baseline (count, mean, std, EWMA and quantiles of recent values) or None."""
+        with self._lock:
+            slot = self._slot(user_id)
+            if slot is None:
+                return None
+            record = self.records[slot].copy()
+        count, recent_len = int(record["count"]), int(record["ring_len"])
+        std = np.sqrt(record["m2"] / (count - 1)) if count > 1 else np.zeros(len(self.features))
+        recent = np.quantile(record["recent"][:, :recent_len], quantiles, axis=1)  # (quantiles, features)
+        return {
+            "logins": count,
+            "last_seen": float(record["last_seen"]),
+            **{name: {
+                "mean": float(record["mean"][i]),
+                "std": float(std[i]),
+                "ewma": float(record["ewma"][i]),
+                "recent_quantiles": {str(q): float(recent[j, i]) for j, q in enumerate(quantiles)},
+            } for i, name in enumerate(self.features)},
+        }
+
+    def flush(self):
+        with self._lock:
+            self.records.flush()
+
+    def start_flushing(self, interval_s=60):
+        """Flushes dirty pages every interval_s seconds from a daemon thread until close()."""
+        def run():
+            while not self._stop.wait(interval_s):
+                self.flush()
+
+        self._flush_thread = threading.Thread(target=run, name="behavior-profile-flush", daemon=True)
+        self._flush_thread.start()
+
+    def close(self):
+        if self._flush_thread is not None:
+            self._stop.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def stats(self):
+        return {
+            "users": self.size,
+            "capacity": self.capacity,
+            "load": self.size / self.capacity,
+            "updates": self.updates,
+            "record_bytes": self.records.dtype.itemsize,
+            "file_bytes": int(self.records.nbytes),
+            "features": list(self.features),
+            "window": self.window,
+            "alpha": self.alpha,
+            "min_count": self.min_count,
+        }
+
+
+def behavior_risk(zscores, weight, z_threshold):
+    """weight * (largest |z| beyond z_threshold); 0 when weight is 0 (the default: reported, not scored)."""
+    if not weight:
+        return 0.0
+    largest = max((abs(z) for z in zscores.values()), default=0.0)
+    return weight * max(0.0, largest - z_threshold)
+
+
+def assess_behavior(profiles, user_id, speeds, weight, z_threshold):
+    """(z-scores plus behavior_risk, behavior_risk) of one login; (None, 0.0) without a profile store.
+
+    Shared by app.py and asgi_app.py, so both add the same behavior_risk to the error before deciding.
+    """
+    if profiles is None:
+        return None, 0.0
+    zscores = profiles.zscores(user_id, speeds)
+    behavior = {**zscores, "behavior_risk": behavior_risk(zscores, weight, z_threshold)}
+    return behavior, behavior["behavior_risk"]
+
+
+def build_profiles(dataset, path=PROFILE_PATH, batch_size=100_000, **kwargs):
+    """Replays a login dataset (in login_time order within each batch) into a new profile store."""
+    from dataset_store import iter_dataset_batches
+
+    if os.path.exists(path):
+        os.remove(path)
+    store = BehaviorProfileStore(path, **kwargs)
+    columns = ["user_id", "login_time", *store.features]
+    for batch in iter_dataset_batches(dataset, columns=columns, batch_size=batch_size):
+        batch = batch.dropna().sort_values("login_time", kind="stable")
+        values = batch[list(store.features)].to_numpy(dtype=np.float64)
+        for user_id, login_time, row in zip(batch["user_id"], batch["login_time"], values):
+            store.update(user_id, row, login_time.to_pydatetime())
+    store.close()
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build per-user behavioral baselines from a login dataset")
+    parser.add_argument("--dataset", default="processed_login_data")
+    parser.add_argument("--path", default=PROFILE_PATH)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    store = build_profiles(args.dataset, args.path, capacity=args.capacity)
+    print(f"✅ {store.size} user profiles from {store.updates} logins saved to {args.path} "
+          f"in {time.perf_counter() - start:.1f} s ({store.records.nbytes / 1e6:.1f} MB)")
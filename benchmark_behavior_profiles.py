@@ -0,0 +1,69 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from behavior_profiles import BehaviorProfileStore, BEHAVIOR_FEATURES
+from login_generator import generate_users, parse_count, parse_scenarios, DEFAULT_SCENARIOS
+
+
+def history_zscores(history, user_id, values):
+    """The baseline recomputed from the user's full history on each request (what the store avoids)."""
+    rows = history[history["user_id"] == user_id][list(BEHAVIOR_FEATURES)]
+    return (np.asarray(values) - rows.mean().to_numpy()) / rows.std().to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update / z-score latency and size of the per-user behavior profiles")
+    parser.add_argument("--users", type=parse_count, default=parse_count("100k"))
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    history = generate_users(1, args.users, np.random.default_rng(args.seed), parse_scenarios(DEFAULT_SCENARIOS))
+    history = history.sort_values("login_time", kind="stable")
+    user_ids = history["user_id"].astype(str).to_numpy()
+    values = history[list(BEHAVIOR_FEATURES)].to_numpy(dtype=np.float64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "behavior_profiles.npy")
+        store = BehaviorProfileStore(path, capacity=1024)  # Starts small so the build includes the doublings
+        start = time.perf_counter()
+        for user_id, row in zip(user_ids, values):
+            store.update(user_id, row)
+        build_s = time.perf_counter() - start
+        print(f"build:        {len(history):,} logins, {store.size:,} users in {build_s:.2f} s "
+              f"({build_s / len(history) * 1e6:.1f} us per update, table grown to {store.capacity:,} slots)")
+
+        rng = np.random.default_rng(args.seed)
+        sample = rng.integers(0, len(history), size=args.lookups)
+        start = time.perf_counter()
+        for i in sample:
+            store.update(user_ids[i], values[i])
+        update_us = (time.perf_counter() - start) / len(sample) * 1e6
+        start = time.perf_counter()
+        for i in sample:
+            store.zscores(user_ids[i], values[i])
+        zscore_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+        history["user_id"] = history["user_id"].astype(str)
+        slow_sample = sample[:200]
+        start = time.perf_counter()
+        for i in slow_sample:
+            history_zscores(history, user_ids[i], values[i])
+        history_us = (time.perf_counter() - start) / len(slow_sample) * 1e6
+        print(f"per login:    update {update_us:.1f} us, z-scores {zscore_us:.1f} us "
+              f"vs {history_us:,.0f} us recomputed from {len(history):,} history rows")
+
+        store.close()
+        reopened = BehaviorProfileStore(path)
+        print(f"size:         {store.records.dtype.itemsize} bytes per slot, file {os.path.getsize(path) / 1e6:.1f} MB "
+              f"({os.path.getsize(path) / store.size:.0f} bytes per user at load {store.size / store.capacity:.2f}); "
+              f"reopened with {reopened.size:,} users")
+        del reopened, store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import parse_login_times, save_dataset, load_dataset, dataset_path, LEGACY_DATASETS
+
+REPEATS = 5
+TRAINING_COLUMNS = ["user_id", "latitude", "longitude", "typing_speed", "mouse_speed", "login_time"]
+
+
+def best_of(fn, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def read_csv(path, columns=None):
+    df = pd.read_csv(path, usecols=columns)
+    df["login_time"] = parse_login_times(df["login_time"])  # What every script did on each load
+    return df
+
+
+def scale_up(df, copies):
+    """Replicates a login history with fresh user ids and shifted times (the v4 data is only ~1k rows)."""
+    parts = []
+    span = df["login_time"].max() - df["login_time"].min()
+    user_span = int(df["user_id"].max()) + 1
+    for i in range(copies):
+        part = df.copy()
+        part["user_id"] = part["user_id"] + i * user_span
+        part["login_time"] = part["login_time"] + (i % 12) * span
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def compare(label, csv_file, name, root, columns):
+    csv_time = best_of(lambda: read_csv(csv_file))
+    csv_projected = best_of(lambda: read_csv(csv_file, columns))
+    parquet_time = best_of(lambda: load_dataset(name, root=root))
+    parquet_projected = best_of(lambda: load_dataset(name, columns=columns, root=root))
+    csv_size = directory_size(csv_file)
+    parquet_size = directory_size(dataset_path(name, root))
+    print(f"{label:<45} csv {csv_size / 1e6:8.2f} MB {csv_time * 1e3:9.1f} ms (projected {csv_projected * 1e3:8.1f} ms) | "
+          f"parquet {parquet_size / 1e6:8.2f} MB {parquet_time * 1e3:9.1f} ms (projected {parquet_projected * 1e3:8.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV and Parquet dataset load time and size")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in the scaled-up v4 dataset")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        for name in LEGACY_DATASETS:
+            csv_file = f"{name}.csv"
+            if not os.path.exists(csv_file):
+                continue
+            df = pd.read_csv(csv_file)
+            if "login_time" not in df:
+                continue
+            df["login_time"] = parse_login_times(df["login_time"])
+            save_dataset(df, name, root=root)
+            compare(name, csv_file, name, root, [c for c in TRAINING_COLUMNS if c in df])
+
+        v4 = read_csv("augmented_login_data_v4.csv")
+        big = scale_up(v4, int(np.ceil(args.rows / len(v4))))
+        big_csv = os.path.join(root, "scaled.csv")
+        big.to_csv(big_csv, index=False)
+        save_dataset(big, "scaled", root=root)
+        compare(f"augmented_login_data_v4 x{len(big) // len(v4)} ({len(big)} rows)", big_csv, "scaled", root, TRAINING_COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from ip_sketch import IPFrequencySketch, DEFAULT_EPSILON, DEFAULT_DELTA
+
+
+def synthetic_ips(n_logins, n_ips, seed=42):
+    """Zipf-like login stream: a few very busy IPs (NAT, offices) and a long tail."""
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.2, size=n_logins), n_ips) - 1
+    octets = np.stack([ranks >> 24 & 255, ranks >> 16 & 255, ranks >> 8 & 255, ranks & 255], axis=1) + [10, 0, 0, 0]
+    return np.array([".".join(map(str, row)) for row in octets], dtype=object)
+
+
+def dict_bytes(frequencies):
+    return sys.getsizeof(frequencies) + sum(sys.getsizeof(ip) + sys.getsizeof(f) for ip, f in frequencies.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy, memory and speed of the IP-frequency sketch")
+    parser.add_argument("--logins", type=int, default=2_000_000)
+    parser.add_argument("--ips", type=int, default=1_000_000)
+    parser.add_argument("--epsilon", type=float, default=DEFAULT_EPSILON)
+    parser.add_argument("--delta", type=float, default=DEFAULT_DELTA)
+    args = parser.parse_args()
+
+    ips = synthetic_ips(args.logins, args.ips)
+    counts = Counter(ips)
+    exact = {ip: count / len(ips) for ip, count in counts.items()}
+
+    sketch = IPFrequencySketch(epsilon=args.epsilon, delta=args.delta, half_life_s=None)
+    start = time.perf_counter()
+    sketch.update_many(ips)
+    print(f"bulk update:  {len(ips)} logins, {len(exact)} distinct IPs in {time.perf_counter() - start:.2f} s")
+
+    distinct = np.array(list(exact), dtype=object)
+    errors = sketch.frequencies(distinct) - np.array([exact[ip] for ip in distinct])
+    print(f"memory:       sketch {sketch.counts.nbytes / 1e6:.1f} MB vs dict {dict_bytes(exact) / 1e6:.1f} MB")
+    print(f"error:        max {errors.max():.2e}, mean {errors.mean():.2e}, min {errors.min():.2e} "
+          f"(bound +{sketch.epsilon:.0e} w.p. {1 - sketch.delta:.3f}); "
+          f"{np.mean(errors > sketch.epsilon):.4%} of IPs above the bound")
+
+    top = [ip for ip, _ in counts.most_common(20)]
+    found = {ip for ip, _ in sketch.heavy_hitters(20)}
+    print(f"heavy hitters: {len(found.intersection(top))}/20 of the true top 20 recovered")
+
+    sample = distinct[:20_000]
+    start = time.perf_counter()
+    for ip in sample:
+        sketch.update(ip)
+    update_us = (time.perf_counter() - start) / len(sample) * 1e6
+    start = time.perf_counter()
+    for ip in sample:
+        sketch.get(ip)
+    get_us = (time.perf_counter() - start) / len(sample) * 1e6
+    print(f"latency:      update {update_us:.1f} us, get {get_us:.1f} us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ip_sketch.npz")
+        start = time.perf_counter()
+        sketch.save(path)
+        save_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        IPFrequencySketch.load(path)
+        load_ms = (time.perf_counter() - start) * 1e3
+        print(f"snapshot:     {os.path.getsize(path) / 1e6:.1f} MB, save {save_ms:.0f} ms, load {load_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+
+from loadtest import run_load
+
+# /login latency and errors with and without model swaps under load, against a running app.py, e.g.
+#   MODEL_ADMIN_TOKEN=secret python app.py
+#   python benchmark_model_swap.py --url http://127.0.0.1:5000 --token secret --versions v1 v2
+
+
+def activate(url, token, version):
+    request = urllib.request.Request(
+        url.rstrip("/") + "/models/activate", data=json.dumps({"version": version}).encode(),
+        headers={"Content-Type": "application/json", "X-Admin-Token": token}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def swap_loop(url, token, versions, interval_s, stop, swapped):
+    i = 0
+    while not stop.wait(interval_s):
+        i += 1
+        activate(url, token, versions[i % len(versions)])
+        swapped.append(versions[i % len(versions)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /login under load while swapping model versions")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--token", required=True, help="MODEL_ADMIN_TOKEN of the server")
+    parser.add_argument("--versions", nargs="+", required=True, help="published versions to alternate between")
+    parser.add_argument("--swap-interval", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--users", type=int, default=5000)
+    args = parser.parse_args()
+
+    activate(args.url, args.token, args.versions[0])
+    time.sleep(args.swap_interval)
+    baseline = asyncio.run(run_load(args.url, args.concurrency, args.duration, args.users, seed=42))
+
+    stop, swapped = threading.Event(), []
+    swapper = threading.Thread(target=swap_loop, args=(args.url, args.token, args.versions, args.swap_interval, stop, swapped))
+    swapper.start()
+    try:
+        swapping = asyncio.run(run_load(args.url, args.concurrency, args.duration, args.users, seed=43))
+    finally:
+        stop.set()
+        swapper.join()
+
+    print(f"{'run':22s} {'req/s':>10s} {'p50 ms':>10s} {'p99 ms':>10s} {'max ms':>10s}  statuses")
+    for name, r in [("no swaps", baseline), (f"{len(swapped)} swaps", swapping)]:
+        print(f"{name:22s} {r['requests_per_sec']:10.1f} {r['p50_ms']:10.1f} {r['p99_ms']:10.1f} {r['max_ms']:10.1f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
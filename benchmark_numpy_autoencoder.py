@@ -0,0 +1,61 @@
+import sys
+import time
+import numpy as np
+import joblib
+from tensorflow.keras.models import load_model
+
+from numpy_autoencoder import NumpyAutoencoder, KERAS_MODEL_PATH, NUMPY_WEIGHTS_PATH
+from dataset_store import load_dataset
+
+PARITY_TOLERANCE = 1e-5  # Max absolute difference allowed in reconstruction error
+numerical_cols = ["latitude", "longitude", "typing_speed", "mouse_speed", "geo_velocity", "login_hour", "ip_frequency"]
+
+
+def reconstruction_errors(model, X):
+    return np.mean(np.abs(X - model.predict(X, verbose=0)), axis=1)
+
+
+def time_per_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def check_parity(keras_model, numpy_model, X):
+    keras_errors = reconstruction_errors(keras_model, X)
+    numpy_errors = reconstruction_errors(numpy_model, X)
+    max_diff = float(np.max(np.abs(keras_errors - numpy_errors)))
+    print(f"Parity on {len(X)} rows: max |Δ reconstruction error| = {max_diff:.2e}")
+    return max_diff <= PARITY_TOLERANCE
+
+
+def main():
+    keras_model = load_model(KERAS_MODEL_PATH)
+    numpy_model = NumpyAutoencoder.load(NUMPY_WEIGHTS_PATH)
+    scaler = joblib.load("scaler.pkl")
+
+    # Real rows (scaled like training) plus random points across and beyond the scaled range
+    df = load_dataset("augmented_login_data_v4_with_geo_velocity", columns=numerical_cols[:5] + ["login_time"])
+    df["login_hour"] = df["login_time"].dt.hour
+    df["ip_frequency"] = 0.0
+    X_real = scaler.transform(df[numerical_cols].values)
+    X_random = np.random.default_rng(42).uniform(-0.5, 1.5, size=(10_000, len(numerical_cols)))
+    X = np.vstack([X_real, X_random])
+
+    if not check_parity(keras_model, numpy_model, X):
+        print(f"🚨 Parity check failed (tolerance {PARITY_TOLERANCE})")
+        sys.exit(1)
+    print("✅ NumPy runtime matches Keras within tolerance")
+
+    single_row = X[:1]
+    batch = X[:1024]
+    print("\nLatency per call:")
+    for name, model in (("keras", keras_model), ("numpy", numpy_model)):
+        single = time_per_call(lambda: model.predict(single_row, verbose=0), 200)
+        batched = time_per_call(lambda: model.predict(batch, verbose=0), 50)
+        print(f"  {name:6s} 1 row: {single * 1e6:10.1f} µs    1024 rows: {batched * 1e6:10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import time
+
+import numpy as np
+
+from login_generator import parse_count
+from quantile_sketch import KLLSketch, DEFAULT_K
+
+QUANTILES = np.array([0.01, 0.5, 0.9, 0.95, 0.99, 0.999])
+
+
+def rank_error(sorted_values, estimates):
+    """Largest |true rank of each estimate - its target quantile|."""
+    return float(np.max(np.abs(np.searchsorted(sorted_values, estimates) / len(sorted_values) - QUANTILES)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy, memory and speed of the KLL score sketch")
+    parser.add_argument("--scores", type=parse_count, default=parse_count("10M"))
+    parser.add_argument("--partitions", type=int, default=32, help="sketches merged into one")
+    parser.add_argument("--single", type=int, default=500_000, help="scores also added one at a time")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Reconstruction errors are right-skewed; a gamma distribution has the same shape
+    scores = np.random.default_rng(args.seed).gamma(2.0, 0.07, size=args.scores)
+    exact = np.sort(scores)
+
+    sketch = KLLSketch(args.k, seed=args.seed)
+    start = time.perf_counter()
+    sketch.update_many(scores)
+    bulk_s = time.perf_counter() - start
+    print(f"bulk:         {args.scores:,} scores in {bulk_s:.2f} s; max rank error {rank_error(exact, sketch.quantiles(QUANTILES)):.3%}; "
+          f"{sketch.retained:,} items ({sketch.retained * 8 / 1e3:.1f} kB) vs {scores.nbytes / 1e6:.0f} MB of scores")
+
+    parts = [KLLSketch(args.k, seed=i) for i in range(args.partitions)]
+    for part, chunk in zip(parts, np.array_split(scores, args.partitions)):
+        part.update_many(chunk)
+    start = time.perf_counter()
+    merged = KLLSketch(args.k, seed=args.seed)
+    for part in parts:
+        merged.merge(part)
+    merge_s = time.perf_counter() - start
+    print(f"merged:       {args.partitions} partition sketches in {merge_s * 1e3:.1f} ms; "
+          f"max rank error {rank_error(exact, merged.quantiles(QUANTILES)):.3%}; {merged.retained:,} items")
+
+    single = KLLSketch(args.k, seed=args.seed)
+    sample = scores[:args.single].tolist()
+    start = time.perf_counter()
+    for value in sample:
+        single.update(value)
+    single_us = (time.perf_counter() - start) / len(sample) * 1e6
+    start = time.perf_counter()
+    for _ in range(1000):
+        single.quantile(0.95)
+    query_us = (time.perf_counter() - start) / 1000 * 1e6
+    print(f"per score:    update {single_us:.2f} us, quantile query {query_us:.0f} us; "
+          f"max rank error {rank_error(np.sort(scores[:args.single]), single.quantiles(QUANTILES)):.3%} over {len(sample):,} scores")
+
+    print("\n quantile        exact       sketch")
+    for q, value, estimate in zip(QUANTILES, np.quantile(scores, QUANTILES), merged.quantiles(QUANTILES)):
+        print(f"  p{q * 100:<7g} {value:12.6f} {estimate:12.6f}")
+
+
+if __name__ == "__main__":
+    main()
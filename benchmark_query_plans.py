@@ -0,0 +1,139 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+
+import migrate
+from login_generator import generate_users, parse_count, parse_scenarios, DEFAULT_SCENARIOS
+
+# Query plans and latencies of the hot login_attempts queries before and after the index migration, e.g.
+#   python benchmark_query_plans.py --rows 10M
+# The table is filled in a local SQLite file at the pre-index schema (migrations up to 0002, like a
+# db42.sql database), then migrate.py applies the rest and the same queries run again.
+
+INSERT = """INSERT INTO login_attempts (user_id, ip_address, latitude, longitude, timezone, device_info,
+    typing_speed, mouse_speed, login_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+LATEST_FOR_USER = """SELECT ip_address, device_info, timezone, latitude, longitude, login_time
+FROM login_attempts WHERE user_id = ? ORDER BY login_time DESC LIMIT 1"""
+# fetch_real_data.py before and after (HOUR() is MySQL; the counting is what matters here)
+IP_FREQUENCY_CORRELATED = """SELECT (SELECT COUNT(*) FROM login_attempts la WHERE la.ip_address = l.ip_address)
+FROM login_attempts l LIMIT ?"""
+IP_FREQUENCY_GROUPED = """SELECT l.id, ip.ip_frequency FROM login_attempts l
+JOIN (SELECT ip_address, COUNT(*) AS ip_frequency FROM login_attempts GROUP BY ip_address) ip
+ON ip.ip_address = l.ip_address"""
+# app.py's last-login cache warm-up
+WARM_CACHE = """SELECT l.user_id, l.ip_address, l.login_time FROM login_attempts l
+JOIN (SELECT user_id, MAX(login_time) AS login_time FROM login_attempts GROUP BY user_id
+      ORDER BY MAX(login_time) DESC LIMIT ?) recent
+ON l.user_id = recent.user_id AND l.login_time = recent.login_time ORDER BY l.login_time"""
+
+
+def fill(path, rows, seed):
+    """Inserts ~rows synthetic attempts (login_generator.py) into a pre-index login_attempts table."""
+    engine = create_engine(f"sqlite:///{path}")
+    migrate.upgrade(engine, target=2)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    scenarios = parse_scenarios(DEFAULT_SCENARIOS)
+    rng = np.random.default_rng(seed)
+    shard_users, inserted, user_id = 25_000, 0, 1
+    start = time.perf_counter()
+    while inserted < rows:
+        df = generate_users(user_id, shard_users, rng, scenarios)
+        user_id += shard_users
+        df = df.iloc[:rows - inserted]
+        conn.executemany(INSERT, zip(
+            df["user_id"].astype(str), df["ip_address"].astype(str), df["latitude"].tolist(),
+            df["longitude"].tolist(), df["timezone"].astype(str), df["device_info"].astype(str),
+            df["typing_speed"].tolist(), df["mouse_speed"].tolist(),
+            df["login_time"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        ))
+        conn.commit()
+        inserted += len(df)
+        print(f"  {inserted:,} rows ({inserted / (time.perf_counter() - start):,.0f} rows/s)")
+    conn.close()
+    return user_id - 1
+
+
+def plan(conn, sql, params):
+    return "; ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def timed(conn, sql, params_list):
+    """Mean seconds per execution over params_list."""
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / len(params_list)
+
+
+def measure(path, users, args):
+    """{query: (seconds per lookup / row / user, plan)}; without indexes, smaller samples are timed."""
+    conn = sqlite3.connect(path)
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    lookups = [(str(u),) for u in rng.integers(1, users + 1, size=args.lookups)]
+    indexed = any(name.startswith("ix_") for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'"))
+    # Without indexes every lookup, correlated row and warmed user is a full table scan
+    sample = args.lookups if indexed else args.slow_lookups
+    warm_users = args.warm_users if indexed else args.slow_lookups
+    results["latest attempt for user_id (per lookup)"] = (
+        timed(conn, LATEST_FOR_USER, lookups[:sample]), plan(conn, LATEST_FOR_USER, lookups[0])
+    )
+    results["ip_frequency, correlated (per row)"] = (
+        timed(conn, IP_FREQUENCY_CORRELATED, [(args.slow_lookups,)]) / args.slow_lookups,
+        plan(conn, IP_FREQUENCY_CORRELATED, (args.slow_lookups,))
+    )
+    results["ip_frequency, grouped join (all rows)"] = (timed(conn, IP_FREQUENCY_GROUPED, [()]), plan(conn, IP_FREQUENCY_GROUPED, ()))
+    results["last-login cache warm-up (per user)"] = (
+        timed(conn, WARM_CACHE, [(warm_users,)]) / warm_users, plan(conn, WARM_CACHE, (warm_users,))
+    )
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login_attempts query plans before/after the index migration")
+    parser.add_argument("--rows", type=parse_count, default=parse_count("10M"))
+    parser.add_argument("--db", help="SQLite file to create (default: a temporary file); reused if it exists and is not migrated yet")
+    parser.add_argument("--lookups", type=int, default=2000, help="latest-attempt lookups timed with the index")
+    parser.add_argument("--slow-lookups", type=int, default=5, help="lookups / correlated rows / warmed users timed without it")
+    parser.add_argument("--warm-users", type=int, default=100_000, help="users in the cache warm-up with the index")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "login_attempts.db")
+        if not os.path.exists(path):
+            print(f"Filling {path} with {args.rows:,} rows...")
+            fill(path, args.rows, args.seed)
+        with sqlite3.connect(path) as conn:
+            rows, users = conn.execute("SELECT COUNT(*), COUNT(DISTINCT user_id) FROM login_attempts").fetchone()
+
+        print("Before: migrations up to 0002 (no secondary indexes)...")
+        before = measure(path, users, args)
+        engine = create_engine(f"sqlite:///{path}")
+        start = time.perf_counter()
+        migrate.upgrade(engine)
+        engine.dispose()
+        migration_s = time.perf_counter() - start
+        print("After: all migrations...")
+        after = measure(path, users, args)
+
+    print(f"\n{rows:,} rows, {users:,} users; migrate.py upgrade (index build) took {migration_s:.1f} s\n")
+    print(f"{'query':48s} {'before ms':>12s} {'after ms':>12s} {'speedup':>10s}")
+    for name, (seconds, _) in before.items():
+        new_seconds = after[name][0]
+        print(f"{name:48s} {seconds * 1000:12.3f} {new_seconds * 1000:12.3f} {seconds / new_seconds:9.1f}x")
+    for name in before:
+        print(f"\n{name}\n  before: {before[name][1]}\n  after:  {after[name][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from login_generator import generate_users, parse_count, parse_scenarios, DEFAULT_SCENARIOS
+from risk_scoring import DEFAULT_THRESHOLDS
+from rule_engine import RuleEngine, RULES_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check one-login and batch rule evaluation agree, and time both")
+    parser.add_argument("--users", type=parse_count, default=parse_count("20k"))
+    parser.add_argument("--rules", default=RULES_PATH)
+    parser.add_argument("--single", type=int, default=50_000, help="logins also scored one at a time")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    df = generate_users(1, args.users, rng, parse_scenarios(DEFAULT_SCENARIOS))
+    fields = ["ip_address", "device_info", "timezone", "latitude", "longitude"]
+    current = df[["user_id"] + fields].astype({field: object for field in ["ip_address", "device_info", "timezone"]})
+    previous = current.groupby("user_id", observed=True)[fields].shift(1)
+    error_score = rng.gamma(2.0, 0.07, size=len(df))
+    geo_velocity = np.where(df["scenario"] == "impossible_travel", 5000.0, rng.exponential(20.0, size=len(df)))
+    print(f"{len(df):,} logins from {args.users:,} users")
+
+    batch_rules = RuleEngine.load(args.rules)
+    start = time.perf_counter()
+    blocked, _, _ = batch_rules.block({"geo_velocity": geo_velocity})
+    risk_score, flags = batch_rules.changes(previous, current)
+    decision, reason, total_risk_score = batch_rules.decide(error_score, risk_score, flags.any(axis=1), DEFAULT_THRESHOLDS)
+    batch_s = time.perf_counter() - start
+    print(f"batch:  {batch_s:.2f} s ({len(df) / batch_s:,.0f} logins/s)")
+
+    single_rules = RuleEngine.load(args.rules)
+    Previous = namedtuple("Previous", fields)
+    sample = np.arange(min(args.single, len(df)))
+    rows = list(zip(*(previous[field].to_numpy()[sample] for field in fields)))
+    currents = current.iloc[sample][fields].to_dict("records")
+    mismatches = 0
+    start = time.perf_counter()
+    for i, prev_row, cur in zip(sample, rows, currents):
+        last_attempt = None if all(value != value or value is None for value in prev_row) else Previous(*prev_row)
+        block = single_rules.block_one(geo_velocity=geo_velocity[i])
+        score, changes = single_rules.changes_one(last_attempt, cur)
+        one = single_rules.decide_one(error_score[i], score, changes, DEFAULT_THRESHOLDS)
+        mismatches += (block is not None) != blocked[i] or score != risk_score[i] or \
+            one[:2] != (decision[i], reason[i]) or not np.isclose(one[2], total_risk_score[i])
+    single_s = time.perf_counter() - start
+    print(f"single: {single_s / len(sample) * 1e6:.1f} us per login in this loop (block + changes + decide + comparison) over {len(sample):,} logins; "
+          f"{mismatches} disagree with the batch result")
+
+    print("\nhits (batch)")
+    for name, count in batch_rules.stats()["hits"].items():
+        print(f"  {name:24s} {count:>10,} ({count / len(df):.2%})")
+    print("\nevaluation (single login), mean us")
+    for name, snapshot in single_rules.stats()["evaluation_us"].items():
+        print(f"  {name:24s} {snapshot['mean']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Time from process start to the first /health and /ready answers of app.py
+
+SERVER = (
+    "import sys, time; started = float(sys.argv[1]);"
+    "from werkzeug.serving import make_server;"
+    "from app import app, start_prewarm;"
+    "server = make_server('127.0.0.1', int(sys.argv[2]), app, threaded=True);"
+    "start_prewarm();"
+    "print(f'BOUND {time.time() - started:.3f}', flush=True);"
+    "server.serve_forever()"
+)
+
+
+def poll(url, deadline):
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def measure(port, env):
+    started = time.time()
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(started), str(port)], env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        poll(f"http://127.0.0.1:{port}/health", started + 60)
+        health_s = time.time() - started
+        _, body = poll(f"http://127.0.0.1:{port}/ready", started + 120)
+        ready_s = time.time() - started
+        return health_s, ready_s, body["startup"]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time to first healthcheck and readiness")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        for run in range(args.runs):
+            health_s, ready_s, breakdown = measure(args.port, env)
+            print(f"run {run + 1}: /health {health_s:.2f} s, /ready {ready_s:.2f} s")
+        print("breakdown of the last run:")
+        for step, timing in breakdown.items():
+            print(f"  {step:<18} {timing}")
+
+
+if __name__ == "__main__":
+    main()
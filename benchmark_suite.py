@@ -0,0 +1,387 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_generator
+import data_generatorB
+import data_generatorC
+import data_generatorD
+from dataset_store import save_dataset, load_dataset, LOGIN_COLUMNS
+from geo_features import compute_geo_velocity
+from login_generator import generate, parse_count, parse_scenarios, DEFAULT_SCENARIOS
+
+# End-to-end benchmarks on a synthetic login history built with the data_generator*.py chain
+# (or login_generator.py with --generator engine), e.g.
+#   python benchmark_suite.py --rows 10k --output bench_10k.json
+#   python benchmark_suite.py --rows 1M --suites generate geo detect --baseline bench_1M_previous.json
+#   python benchmark_suite.py --rows 50M --generator engine --suites generate geo
+# Results are JSON (with the commit, Python and library versions) so releases can be compared.
+
+SUITES = ["generate", "geo", "detect", "login", "train"]
+GENERATOR_CHAIN = [data_generator, data_generatorB, data_generatorC, data_generatorD]  # One login per user each
+BATCH_SIZES = [1, 32, 1024, 65536]
+
+
+def latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "count": int(ms.size),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def run_isolated(fn, *args):
+    """Runs fn(*args) in a fresh process, so imports and peak memory don't leak between suites."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def synthetic_history(users, logins_per_user, seed):
+    """The processed_login_data starting point: each user logs in around a home city from one IP and device."""
+    rng = np.random.default_rng(seed)
+    cities = data_generatorD.major_locations
+    home = rng.integers(0, len(cities), size=users)
+    user_id = np.repeat(np.arange(1, users + 1), logins_per_user)
+    home = np.repeat(home, logins_per_user)
+    n = user_id.size
+    gaps = rng.exponential(24.0, size=(users, logins_per_user)).cumsum(axis=1).reshape(-1)  # Hours between logins
+    start = np.repeat(rng.uniform(0, 24 * 30, size=users), logins_per_user)
+    return pd.DataFrame({
+        "user_id": user_id,
+        "ip_address": [f"10.{(u >> 16) & 255}.{(u >> 8) & 255}.{u & 255}" for u in user_id],
+        "latitude": np.round(np.array([cities[i][1] for i in home]) + rng.uniform(-0.05, 0.05, size=n), 6),
+        "longitude": np.round(np.array([cities[i][2] for i in home]) + rng.uniform(-0.05, 0.05, size=n), 6),
+        "timezone": [cities[i][3] for i in home],
+        "device_info": rng.choice(data_generatorD.device_types, size=users).repeat(logins_per_user),
+        "typing_speed": np.round(rng.uniform(2.5, 15, size=n), 2),
+        "mouse_speed": np.round(rng.uniform(300, 2000, size=n), 2),
+        "login_time": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.round((start + gaps) * 3600), unit="s"),
+    })
+
+
+def bench_generate(rows, base_logins, seed):
+    users = max(1, rows // (base_logins + len(GENERATOR_CHAIN)))
+    stages = {}
+    start = time.perf_counter()
+    df = synthetic_history(users, base_logins, seed)
+    stages["synthetic_history"] = {"rows": len(df), "seconds": time.perf_counter() - start}
+    rng = random.Random(seed)
+    for module in GENERATOR_CHAIN:
+        start = time.perf_counter()
+        df = module.augment(df, rng)
+        stages[module.__name__] = {"rows_added": users, "seconds": time.perf_counter() - start}
+    for stage in stages.values():
+        stage["rows_per_s"] = stage.get("rows", stage.get("rows_added")) / stage["seconds"]
+    return df, {"users": users, "rows": len(df), "stages": stages}
+
+
+def bench_generate_engine(rows, seed, dataset_root, workers):
+    """login_generator.py straight into the dataset store, then read back for the other suites."""
+    users = max(1, rows // 20)
+    start = time.perf_counter()
+    written = generate("benchmark", users, parse_scenarios(DEFAULT_SCENARIOS), workers=workers, seed=seed,
+                       root=dataset_root)
+    seconds = time.perf_counter() - start
+    load_start = time.perf_counter()
+    df = load_dataset("benchmark", columns=LOGIN_COLUMNS, root=dataset_root)
+    stages = {
+        "login_generator": {"rows": written, "seconds": seconds, "rows_per_s": written / seconds},
+        "load_dataset": {"rows": len(df), "seconds": time.perf_counter() - load_start},
+    }
+    stages["load_dataset"]["rows_per_s"] = len(df) / stages["load_dataset"]["seconds"]
+    return df, {"users": users, "rows": written, "workers": workers, "stages": stages}
+
+
+def bench_geo(df):
+    df = df.sort_values(by=["user_id", "login_time"])
+    results = {}
+    for method in ["haversine", "ellipsoidal"]:
+        start = time.perf_counter()
+        compute_geo_velocity(df, method=method)
+        seconds = time.perf_counter() - start
+        results[method] = {"seconds": seconds, "rows_per_s": len(df) / seconds}
+    return results
+
+
+def raw_feature_rows(df, pipeline, limit, seed):
+    sample = df.sample(n=min(limit, len(df)), random_state=seed).sort_values(by=["user_id", "login_time"])
+    sample = sample.join(compute_geo_velocity(sample, method="haversine")["geo_velocity"])
+    return pipeline.feature_frame(sample).to_numpy(dtype=np.float64)
+
+
+def bench_detect(df, seed, single_calls=2000, threads=32):
+    from batch_inference import MicroBatcher
+    from model_registry import ModelRegistry
+
+    bundle = ModelRegistry().load(ModelRegistry().configured_version())
+    rows = raw_feature_rows(df, bundle.pipeline, max(BATCH_SIZES), seed)
+    results = {"model_version": bundle.version}
+
+    latencies = []
+    for i in range(single_calls):
+        start = time.perf_counter()
+        bundle.score(rows[i % len(rows)][None, :])
+        latencies.append(time.perf_counter() - start)
+    results["single_row"] = latency_summary(latencies)
+
+    results["batched"] = {}
+    for size in BATCH_SIZES:
+        batch = np.resize(rows, (size, rows.shape[1]))
+        repeats = max(3, 100_000 // size)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            bundle.score(batch)
+        seconds = (time.perf_counter() - start) / repeats
+        results["batched"][str(size)] = {"batch_ms": seconds * 1000.0, "per_row_us": seconds / size * 1e6}
+
+    # The /login path: concurrent single-row calls coalesced by the micro-batcher
+    batcher = MicroBatcher(bundle.score, max_batch_size=32, max_wait_us=2000)
+    try:
+        calls = single_calls * 4
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda i: batcher.submit(rows[i % len(rows)]), range(calls)))
+        seconds = time.perf_counter() - start
+        results["micro_batched"] = {
+            "threads": threads, "calls": calls, "calls_per_s": calls / seconds,
+            "mean_batch_size": batcher.batch_size_histogram.snapshot()["mean"],
+        }
+    finally:
+        batcher.close()
+    return results
+
+
+def bench_login(dataset_root, seed, requests, threads, seeded_users):
+    """Runs in its own process: /login through the Flask app on a throwaway SQLite database."""
+    import logging
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(dataset_root, 'login_benchmark.db')}"
+    os.environ["ARTIFACT_PREWARM"] = "0"
+    os.environ["MODEL_REGISTRY_POLL_S"] = "0"
+    from app import app, db, ensure_schema, warm_database, get_bundle, login_attempts
+
+    logging.disable(logging.INFO)
+    df = load_dataset("benchmark", root=dataset_root)
+    ordered = df.sort_values(by=["user_id", "login_time"])
+    history = ordered.groupby("user_id").nth(-2)  # Previous login in the database ...
+    upcoming = ordered.groupby("user_id").tail(1).set_index("user_id")  # ... the last one is replayed
+    users = history["user_id"].drop_duplicates().sample(n=min(seeded_users, history["user_id"].nunique()),
+                                                        random_state=seed)
+    history = history[history["user_id"].isin(users)]
+
+    ensure_schema()
+    with app.app_context():
+        rows = history[LOGIN_COLUMNS].assign(user_id=history["user_id"].astype(str),
+                                              geo_velocity=0.0).to_dict("records")
+        for start in range(0, len(rows), 5000):
+            db.session.execute(login_attempts.insert(), rows[start:start + 5000])
+        db.session.commit()
+    warm_database()
+    get_bundle()
+
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(users.to_numpy(), size=requests)
+    payloads = []
+    for user in picked:
+        row = upcoming.loc[user]
+        payloads.append({
+            "user_id": str(user), "ip_address": row["ip_address"], "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]), "timezone": row["timezone"], "device_info": row["device_info"],
+            "typing_speed": float(row["typing_speed"]), "mouse_speed": float(row["mouse_speed"]),
+        })
+
+    results = {"seeded_users": len(users)}
+    client = app.test_client()
+    statuses, latencies = {}, []
+    start = time.perf_counter()
+    for payload in payloads:
+        sent = time.perf_counter()
+        status = client.post("/login", json=payload).status_code
+        latencies.append(time.perf_counter() - sent)
+        statuses[status] = statuses.get(status, 0) + 1
+    seconds = time.perf_counter() - start
+    results["sequential"] = {**latency_summary(latencies), "requests_per_s": len(payloads) / seconds,
+                             "statuses": {str(k): v for k, v in sorted(statuses.items())}}
+
+    local = threading.local()
+    latencies = []
+
+    def send(payload):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        sent = time.perf_counter()
+        local.client.post("/login", json=payload)
+        latencies.append(time.perf_counter() - sent)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send, payloads))
+    seconds = time.perf_counter() - start
+    results["concurrent"] = {**latency_summary(latencies), "threads": threads, "requests_per_s": len(payloads) / seconds}
+    return results
+
+
+def bench_train(dataset_root, seed, epochs, batch_size):
+    """Runs in its own process so the reported peak RSS is training's alone."""
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+    from model_builder import build_autoencoder
+    from train_autoencoder import preprocess
+
+    tf.keras.utils.set_random_seed(seed)
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    df = load_dataset("benchmark", columns=LOGIN_COLUMNS, root=dataset_root)
+    X = preprocess(df)[0]
+    preprocess_s = time.perf_counter() - start
+    X_train, X_val = train_test_split(X, test_size=0.1, random_state=seed)
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self.started = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            epoch_seconds.append(time.perf_counter() - self.started)
+
+    epoch_seconds = []
+    autoencoder = build_autoencoder(X_train.shape[1], encoder_units=(16, 8, 4))
+    history = autoencoder.fit(X_train, X_train, epochs=epochs, batch_size=batch_size, shuffle=True,
+                              validation_data=(X_val, X_val), callbacks=[EpochTimer()], verbose=0)
+    return {
+        "tensorflow_version": tf.__version__,
+        "training_rows": len(X_train),
+        "preprocess_s": preprocess_s,
+        "epoch_s": epoch_seconds,
+        "mean_epoch_s": float(np.mean(epoch_seconds[1:] or epoch_seconds)),  # The first epoch includes tracing
+        "final_val_loss": float(history.history["val_loss"][-1]),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_mb": rss_before,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(results, baseline, tolerance):
+    """Prints every timing/throughput that moved by more than `tolerance` against a previous run."""
+    previous = dict(flatten(baseline["results"]))
+    regressions = 0
+    for path, value in flatten(results):
+        old = previous.get(path)
+        higher_is_better = path.endswith("_per_s")
+        if not old or not (higher_is_better or path.endswith(("_s", "_ms", "_us", "_mb"))):
+            continue
+        change = (value - old) / old
+        worse = -change if higher_is_better else change
+        if abs(change) > tolerance:
+            regressions += worse > 0
+            print(f"{'⚠️ slower' if worse > 0 else '✅ faster'}  {path}: {old:.4g} -> {value:.4g} ({change:+.1%})")
+    print(f"{regressions} regression(s) beyond {tolerance:.0%} against {baseline['environment'].get('commit')}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible benchmarks for data generation, scoring and training")
+    parser.add_argument("--rows", type=parse_count, default=parse_count("10k"), help="synthetic history size (10k .. 50M)")
+    parser.add_argument("--base-logins", type=int, default=6,
+                        help="vectorized logins per user before the 4 generator stages (raise for large --rows)")
+    parser.add_argument("--generator", choices=["chain", "engine"], default="chain",
+                        help="data_generator*.py chain, or the parallel login_generator.py engine")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="login_generator.py worker processes")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--login-requests", type=int, default=2000)
+    parser.add_argument("--login-threads", type=int, default=16)
+    parser.add_argument("--login-users", type=int, default=10_000, help="users with a previous login in the database")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "parameters": vars(args), "results": {}}
+    results = report["results"]
+    with tempfile.TemporaryDirectory() as dataset_root:
+        print(f"Generating {args.rows:,} rows...")
+        if args.generator == "engine":
+            df, results["generate"] = bench_generate_engine(args.rows, args.seed, dataset_root, args.workers)
+        else:
+            df, results["generate"] = bench_generate(args.rows, args.base_logins, args.seed)
+        if "geo" in args.suites:
+            print("Geo-velocity...")
+            results["geo"] = bench_geo(df)
+        if "detect" in args.suites:
+            print("Anomaly scoring...")
+            results["detect"] = bench_detect(df, args.seed)
+        if args.generator == "chain" and ("login" in args.suites or "train" in args.suites):
+            save_dataset(df, "benchmark", root=dataset_root)
+        del df
+        if "login" in args.suites:
+            print("/login...")
+            results["login"] = run_isolated(bench_login, dataset_root, args.seed, args.login_requests,
+                                            args.login_threads, args.login_users)
+        if "train" in args.suites:
+            print("Training...")
+            results["train"] = run_isolated(bench_train, dataset_root, args.seed, args.epochs, args.batch_size)
+        if "generate" not in args.suites:
+            del results["generate"]
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(json.dumps(results, indent=2, default=str))
+    print(f"✅ Results saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f), args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
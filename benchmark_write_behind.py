@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+NUM_USERS = 200
+REQUESTS = 4000
+CLIENT_THREADS = 8
+
+
+def run_worker():
+    """Runs inside a subprocess so app.py picks up the mode from the environment."""
+    from app import app, db, LoginAttempts, attempt_writer, ensure_schema
+
+    ensure_schema()
+
+    # Seed one login per user; every benchmark request then only changes the IP (+2 risk -> allow)
+    with app.app_context():
+        seed_time = datetime.utcnow() - timedelta(days=1)
+        db.session.execute(LoginAttempts.__table__.insert().values([
+            dict(user_id=f"bench_{u}", ip_address="10.0.0.1", latitude=40.7128, longitude=-74.0060,
+                 timezone="EST", device_info="Windows", typing_speed=5.0, mouse_speed=500.0,
+                 geo_velocity=0.0, login_time=seed_time)
+            for u in range(NUM_USERS)
+        ]))
+        db.session.commit()
+
+    client = app.test_client()
+
+    def send(i):
+        response = client.post("/login", json={
+            "user_id": f"bench_{i % NUM_USERS}", "ip_address": f"10.1.{i // 250}.{i % 250}",
+            "latitude": 40.7128, "longitude": -74.0060, "timezone": "EST", "device_info": "Windows",
+            "typing_speed": 5.0, "mouse_speed": 500.0
+        })
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CLIENT_THREADS) as pool:
+        statuses = list(pool.map(send, range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    if attempt_writer is not None:
+        attempt_writer.close()  # Drain so the row count below is complete
+    with app.app_context():
+        stored = LoginAttempts.query.count() - NUM_USERS
+    print(f"RESULT {REQUESTS / elapsed:.1f} req/s, {statuses.count(200)} allowed, {stored} rows stored")
+
+
+def main():
+    for mode in ("0", "1"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ)
+            env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            env["WRITE_BEHIND_ENABLED"] = mode
+            env["WRITE_BEHIND_SPILL_PATH"] = os.path.join(tmp, "spill.jsonl")
+            output = subprocess.run([sys.executable, __file__, "--worker"], env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            result = [line for line in output.splitlines() if line.startswith("RESULT")][-1]
+            print(f"write-behind {'on ' if mode == '1' else 'off'}: {result[len('RESULT '):]}")
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        run_worker()
+    else:
+        main()
@@ -0,0 +1,70 @@
+import sys
+import joblib
+import numpy as np
+
+from feature_pipeline import FeaturePipeline, FEATURE_COLUMNS, PIPELINE_PATH
+from geo_features import compute_geo_velocity
+from dataset_store import load_dataset
+
+TOLERANCE = 1e-12
+
+
+def check_artifacts(pipeline, scaler, ip_frequencies):
+    """The serialized pipeline must match the scaler and IP frequencies it was built from."""
+    failures = []
+    if not np.array_equal(pipeline.scale, scaler.scale_) or not np.array_equal(pipeline.offset, scaler.min_):
+        failures.append(f"{PIPELINE_PATH} scale/offset differ from scaler.pkl")
+    if pipeline.ip_frequencies != ip_frequencies:
+        failures.append(f"{PIPELINE_PATH} IP frequencies differ from ip_frequencies.pkl")
+    return failures
+
+
+def check_paths(pipeline, scaler, df, name):
+    """Online single-record path, offline batch path and the plain sklearn scaler must agree."""
+    failures = []
+    online = np.vstack([
+        pipeline.transform_one(row.latitude, row.longitude, row.typing_speed, row.mouse_speed,
+                               row.geo_velocity, row.login_hour, row.ip_address)
+        for row in df.itertuples()
+    ])
+    offline = pipeline.transform_frame(df)
+
+    reference = df[FEATURE_COLUMNS[:6]].copy()
+    reference["ip_frequency"] = [pipeline.ip_frequency(ip) for ip in df["ip_address"]]
+    expected = scaler.transform(reference[FEATURE_COLUMNS].to_numpy())
+
+    for label, values in (("online vs offline", online - offline), ("offline vs scaler.pkl", offline - expected)):
+        drift = float(np.max(np.abs(values)))
+        print(f"  {name}: {label} max drift {drift:.2e}")
+        if drift > TOLERANCE:
+            failures.append(f"{name}: {label} drift {drift:.2e} exceeds {TOLERANCE:.0e}")
+    return failures
+
+
+def load_records(name):
+    df = load_dataset(name)
+    df = df.sort_values(by=["user_id", "login_time"]).reset_index(drop=True)
+    if "geo_velocity" not in df:
+        df["geo_velocity"] = compute_geo_velocity(df)["geo_velocity"]
+    df["login_hour"] = df["login_time"].dt.hour
+    return df
+
+
+def main():
+    pipeline = FeaturePipeline.load(PIPELINE_PATH)
+    scaler = joblib.load("scaler.pkl")
+    ip_frequencies = joblib.load("ip_frequencies.pkl")
+
+    failures = check_artifacts(pipeline, scaler, ip_frequencies)
+    failures += check_paths(pipeline, scaler, load_records("augmented_login_data_v4_with_geo_velocity"), "v4 dataset")
+    failures += check_paths(pipeline, scaler, load_records("test_login_data"), "test dataset")
+
+    if failures:
+        for failure in failures:
+            print(f"🚨 {failure}")
+        sys.exit(1)
+    print("✅ Online and offline feature paths are in parity")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 import pandas as pd
 import random
-from datetime import datetime, timedelta
+from datetime import timedelta
+from dataset_store import load_dataset, save_dataset
 
-# Load the existing dataset
-file_path = "augmented_login_data.csv"
-df = pd.read_csv(file_path)
+SOURCE = "augmented_login_data"
+TARGET = "augmented_login_data_v2"
 
 # Define global locations with timezones
 locations = [
@@ -21,44 +21,45 @@ locations = [
 ]
 
 # Generate a more varied set of IP addresses
-def generate_ip():
-    return f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}"
+def generate_ip(rng=random):
+    return f"{rng.randint(1, 255)}.{rng.randint(1, 255)}.{rng.randint(1, 255)}.{rng.randint(1, 255)}"
 
 # Define varied device types
 devices = ["Windows", "macOS", "Linux", "iOS", "Android"]
 
-# Generate new entries with major shifts
-new_entries = []
-user_groups = df.groupby("user_id")
+def augment(df, rng=random):
+    """Adds one login per user from a new country, IP and device, 48-72 hours after their last one."""
+    new_entries = []
+    # Last login of each user (df is sorted by user_id, login_time), in user_id order
+    latest_entries = df.groupby("user_id").tail(1).sort_values(by="user_id", kind="stable")
 
-for user_id, group in user_groups:
-    latest_entry = group.iloc[-1].to_dict()  # Get the last login for each user
-    new_location = random.choice(locations)  # Select a new country
-    
-    old_time = datetime.strptime(latest_entry["login_time"], "%Y-%m-%d %H:%M:%S")
-    new_time = old_time + timedelta(hours=random.randint(48, 72))  # Shift time by at least 48 hours
-    
-    new_entry = {
-        "user_id": user_id,
-        "ip_address": generate_ip(),
-        "latitude": new_location[1],
-        "longitude": new_location[2],
-        "timezone": new_location[3],
-        "device_info": random.choice(devices),
-        "typing_speed": round(random.uniform(2, 15), 2),  # CPS
-        "mouse_speed": round(random.uniform(300, 2000), 2),  # PPS
-        "login_time": new_time.strftime("%Y-%m-%d %H:%M:%S")
-    }
-    new_entries.append(new_entry)
+    for latest_entry in latest_entries.to_dict("records"):
+        new_location = rng.choice(locations)  # Select a new country
 
-# Append new data to the original DataFrame
-new_df = pd.DataFrame(new_entries)
-final_df = pd.concat([df, new_df], ignore_index=True)
+        old_time = latest_entry["login_time"]
+        new_time = old_time + timedelta(hours=rng.randint(48, 72))  # Shift time by at least 48 hours
 
-# Ensure user IDs remain sequential
-final_df = final_df.sort_values(by=["user_id", "login_time"]).reset_index(drop=True)
+        new_entry = {
+            "user_id": latest_entry["user_id"],
+            "ip_address": generate_ip(rng),
+            "latitude": new_location[1],
+            "longitude": new_location[2],
+            "timezone": new_location[3],
+            "device_info": rng.choice(devices),
+            "typing_speed": round(rng.uniform(2, 15), 2),  # CPS
+            "mouse_speed": round(rng.uniform(300, 2000), 2),  # PPS
+            "login_time": new_time
+        }
+        new_entries.append(new_entry)
 
-# Save the updated dataset
-final_df.to_csv("augmented_login_data_v2.csv", index=False)
+    # Append new data to the original DataFrame
+    new_df = pd.DataFrame(new_entries)
+    final_df = pd.concat([df, new_df], ignore_index=True)
 
-print("✅ New dataset with major location shifts saved as 'augmented_login_data_v2.csv'")
+    # Ensure user IDs remain sequential
+    return final_df.sort_values(by=["user_id", "login_time"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    save_dataset(augment(load_dataset(SOURCE)), TARGET)
+    print(f"✅ New dataset with major location shifts saved as '{TARGET}'")
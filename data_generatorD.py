@@ -1,9 +1,10 @@
 import pandas as pd
 import random
 import datetime
+from dataset_store import load_dataset, save_dataset
 
-# Load the dataset
-df = pd.read_csv("augmented_login_data_v3.csv")
+SOURCE = "augmented_login_data_v3"
+TARGET = "augmented_login_data_v4"
 
 # Define major locations, timezones, and devices for major shifts
 major_locations = [
@@ -27,44 +28,46 @@ major_locations = [
 device_types = ["Windows", "macOS", "Linux", "iOS", "Android"]
 
 # Function to generate a random IP address
-def generate_random_ip():
-    return ".".join(str(random.randint(1, 255)) for _ in range(4))
+def generate_random_ip(rng=random):
+    return ".".join(str(rng.randint(1, 255)) for _ in range(4))
 
-# Group data by user_id and find the latest login
-new_entries = []
-for user_id, user_data in df.groupby("user_id"):
-    latest_entry = user_data.iloc[-1]  # Get the latest login for the user
+def augment(df, rng=random):
+    """Adds one login per user from a major city with a new IP and device, 48-96 hours after their last one."""
+    new_entries = []
+    # Latest login of each user (df is sorted by user_id, login_time), in user_id order
+    latest_entries = df.groupby("user_id").tail(1).sort_values(by="user_id", kind="stable")
 
-    # Pick a random new location that is different from the current
-    new_location = random.choice(major_locations)
-    new_lat, new_lon, new_timezone = new_location[1], new_location[2], new_location[3]
+    for latest_entry in latest_entries.to_dict("records"):
+        # Pick a random new location that is different from the current
+        new_location = rng.choice(major_locations)
+        new_lat, new_lon, new_timezone = new_location[1], new_location[2], new_location[3]
 
-    # Ensure at least 48-hour shift from latest login time
-    old_time = datetime.datetime.strptime(latest_entry["login_time"], "%Y-%m-%d %H:%M:%S")
-    new_time = old_time + datetime.timedelta(hours=random.randint(48, 96))  # 2 to 4 days shift
+        # Ensure at least 48-hour shift from latest login time
+        old_time = latest_entry["login_time"]
+        new_time = old_time + datetime.timedelta(hours=rng.randint(48, 96))  # 2 to 4 days shift
 
-    # Create new entry with major location shift
-    new_entry = {
-        "user_id": latest_entry["user_id"],
-        "ip_address": generate_random_ip(),
-        "latitude": new_lat,
-        "longitude": new_lon,
-        "timezone": new_timezone,
-        "device_info": random.choice(device_types),
-        "typing_speed": round(random.uniform(2, 15), 2),  # CPS
-        "mouse_speed": round(random.uniform(300, 2000), 2),  # PPS
-        "login_time": new_time.strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    new_entries.append(new_entry)
+        # Create new entry with major location shift
+        new_entry = {
+            "user_id": latest_entry["user_id"],
+            "ip_address": generate_random_ip(rng),
+            "latitude": new_lat,
+            "longitude": new_lon,
+            "timezone": new_timezone,
+            "device_info": rng.choice(device_types),
+            "typing_speed": round(rng.uniform(2, 15), 2),  # CPS
+            "mouse_speed": round(rng.uniform(300, 2000), 2),  # PPS
+            "login_time": new_time,
+        }
+        new_entries.append(new_entry)
 
-# Append new entries to the original dataset
-new_df = pd.DataFrame(new_entries)
-final_df = pd.concat([df, new_df], ignore_index=True)
+    # Append new entries to the original dataset
+    new_df = pd.DataFrame(new_entries)
+    final_df = pd.concat([df, new_df], ignore_index=True)
 
-# Sort by user_id to maintain sequential order
-final_df = final_df.sort_values(by=["user_id", "login_time"]).reset_index(drop=True)
+    # Sort by user_id to maintain sequential order
+    return final_df.sort_values(by=["user_id", "login_time"]).reset_index(drop=True)
 
-# Save the new dataset
-final_df.to_csv("augmented_login_data_v4.csv", index=False)
 
-print("✅ New dataset with major location shifts saved as 'augmented_login_data_v4.csv'")
+if __name__ == "__main__":
+    save_dataset(augment(load_dataset(SOURCE)), TARGET)
+    print(f"✅ New dataset with major location shifts saved as '{TARGET}'")
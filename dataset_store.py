@@ -0,0 +1,177 @@
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Without pyarrow the store reads and writes the legacy CSV files
+    pa = None
+
+DATASET_ROOT = "datasets"
+PARTITION_COLUMN = "login_month"  # Hive partition, e.g. datasets/<name>/login_month=2025-02/
+DICTIONARY_COLUMNS = ["ip_address", "device_info", "timezone"]
+LOGIN_COLUMNS = ["user_id", "ip_address", "latitude", "longitude", "timezone", "device_info",
+                 "typing_speed", "mouse_speed", "login_time"]
+
+_last_part_ns = 0
+_part_lock = threading.Lock()
+
+
+def parse_login_times(values, time_format=None):
+    """Parses login_time values; tries ISO 8601, then the day-first format of the v4 CSVs."""
+    if time_format:
+        return pd.to_datetime(values, format=time_format)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    try:
+        return pd.to_datetime(values, format="ISO8601")
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, format="%d-%m-%Y %H:%M")
+
+
+def _name(name):
+    return name[:-len(".csv")] if name.endswith(".csv") else name
+
+
+def dataset_path(name, root=DATASET_ROOT):
+    return os.path.join(root, _name(name))
+
+
+def csv_path(name):
+    return _name(name) + ".csv"
+
+
+def has_parquet(name, root=DATASET_ROOT):
+    return pa is not None and os.path.isdir(dataset_path(name, root))
+
+
+def _to_table(df):
+    df = df.copy()
+    if "login_time" in df:
+        df["login_time"] = parse_login_times(df["login_time"])
+        # Format each distinct month once; strftime on every row dominated large writes
+        months, codes = np.unique(df["login_time"].to_numpy(dtype="datetime64[M]"), return_inverse=True)
+        labels = np.array(["unknown" if np.isnat(month) else str(month) for month in months], dtype=object)
+        df[PARTITION_COLUMN] = labels[codes.reshape(-1)]
+        # Group rows by partition (stable, so row order within a month is kept); interleaved months
+        # would otherwise be written as thousands of tiny row groups
+        df = df.sort_values(PARTITION_COLUMN, kind="stable")
+    for col in DICTIONARY_COLUMNS:
+        if col in df and pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")  # Stored as Parquet dictionary-encoded columns
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _next_part_name():
+    """Zero-padded nanosecond timestamp, strictly increasing within the process."""
+    global _last_part_ns
+    with _part_lock:
+        _last_part_ns = max(time.time_ns(), _last_part_ns + 1)
+        return f"{_last_part_ns:020d}"
+
+
+def save_dataset(df, name, append=False, root=DATASET_ROOT, part_name=None):
+    """Writes a login dataset as typed, month-partitioned Parquet (CSV if pyarrow is missing).
+
+    With append=True new files are added next to the existing ones; otherwise the dataset is replaced.
+    Files are read back in name order; unless `part_name` is given, parts are named by write time so
+    appends to the same month come back in the order they were written.
+    """
+    if pa is None:
+        df.to_csv(csv_path(name), mode="a" if append else "w", header=not (append and os.path.exists(csv_path(name))), index=False)
+        return csv_path(name)
+    path = dataset_path(name, root)
+    if not append and os.path.isdir(path):
+        shutil.rmtree(path)
+    table = _to_table(df)
+    partition_cols = [PARTITION_COLUMN] if PARTITION_COLUMN in table.column_names else None
+    pq.write_to_dataset(
+        table, path, partition_cols=partition_cols,
+        basename_template=f"part-{part_name or _next_part_name()}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    return path
+
+
+def load_dataset(name, columns=None, start=None, end=None, keep_categories=False, root=DATASET_ROOT):
+    """Loads a login dataset, reading only `columns` and, for Parquet, only partitions in [start, end).
+
+    login_time is always returned as datetimes. Dictionary-encoded columns come back as plain
+    strings unless keep_categories is set. Parquet rows come back grouped by month, keeping
+    their written order within a month.
+    """
+    if has_parquet(name, root):
+        dataset = ds.dataset(dataset_path(name, root), format="parquet", partitioning="hive")
+        row_filter = None
+        if start is not None:
+            row_filter = ds.field("login_time") >= pd.Timestamp(start)
+        if end is not None:
+            end_filter = ds.field("login_time") < pd.Timestamp(end)
+            row_filter = end_filter if row_filter is None else row_filter & end_filter
+        read_columns = columns or [c for c in dataset.schema.names if c != PARTITION_COLUMN]
+        df = dataset.to_table(columns=read_columns, filter=row_filter).to_pandas()
+        if not keep_categories:
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(object)
+        return df
+
+    df = pd.read_csv(csv_path(name), usecols=columns)
+    if "login_time" in df:
+        df["login_time"] = parse_login_times(df["login_time"])
+        if start is not None:
+            df = df[df["login_time"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["login_time"] < pd.Timestamp(end)]
+    return df
+
+
+def iter_dataset_batches(name, columns=None, batch_size=100_000, root=DATASET_ROOT):
+    """Streams a dataset in DataFrame batches (partition order, i.e. by month)."""
+    if has_parquet(name, root):
+        dataset = ds.dataset(dataset_path(name, root), format="parquet", partitioning="hive")
+        read_columns = columns or [c for c in dataset.schema.names if c != PARTITION_COLUMN]
+        for batch in dataset.to_batches(columns=read_columns, batch_size=batch_size):
+            df = batch.to_pandas()
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(object)
+            yield df
+        return
+    for df in pd.read_csv(csv_path(name), usecols=columns, chunksize=batch_size):
+        if "login_time" in df:
+            df["login_time"] = parse_login_times(df["login_time"])
+        yield df
+
+
+def convert_csv(name, root=DATASET_ROOT):
+    """Migrates a legacy <name>.csv into the Parquet store."""
+    return save_dataset(load_dataset(name, root=root) if has_parquet(name, root) else _read_legacy_csv(name), name, root=root)
+
+
+def _read_legacy_csv(name):
+    df = pd.read_csv(csv_path(name))
+    if "login_time" in df:
+        df["login_time"] = parse_login_times(df["login_time"])
+    return df
+
+
+LEGACY_DATASETS = [
+    "processed_login_data", "augmented_login_data", "augmented_login_data_v2", "augmented_login_data_v3",
+    "augmented_login_data_v4", "augmented_login_data_v4_with_geo_velocity", "test_login_data",
+    "test_results", "validated_anomalies",
+]
+
+
+if __name__ == "__main__":
+    if pa is None:
+        raise SystemExit("pyarrow is required to convert datasets to Parquet")
+    for legacy in LEGACY_DATASETS:
+        if os.path.exists(csv_path(legacy)):
+            print(f"✅ {csv_path(legacy)} -> {convert_csv(legacy)}")
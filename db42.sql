@@ -12,9 +12,29 @@ CREATE TABLE login_attempts (
     device_info VARCHAR(255),
     typing_speed FLOAT,
     mouse_speed FLOAT,
-    login_time DATETIME
+    geo_velocity FLOAT DEFAULT NULL,
+    login_time DATETIME,
+    INDEX ix_login_attempts_user_id_login_time (user_id, login_time),
+    INDEX ix_login_attempts_ip_address (ip_address)
 );
 
+-- Daily aggregates of attempts removed by retention.py
+CREATE TABLE login_rollups (
+    day DATE NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    ip_address VARCHAR(50) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    typing_speed_sum FLOAT NOT NULL DEFAULT 0,
+    mouse_speed_sum FLOAT NOT NULL DEFAULT 0,
+    max_geo_velocity FLOAT,
+    first_login DATETIME,
+    last_login DATETIME,
+    PRIMARY KEY (day, user_id, ip_address),
+    INDEX ix_login_rollups_ip_address (ip_address)
+);
+
+-- Existing databases: `python migrate.py` adds geo_velocity, the indexes and login_rollups
+
 SHOW TABLES;
 
 SELECT * FROM login_attempts;
@@ -360,7 +380,7 @@ INSERT INTO login_attempts (user_id, ip_address, latitude, longitude, timezone,
 
 
 Select * from login_attempts;
-ALTER TABLE login_attempts ADD COLUMN geo_velocity FLOAT DEFAULT NULL;
+-- geo_velocity is now part of CREATE TABLE above (migrations/0002_geo_velocity.py for older databases)
 
 SET SQL_SAFE_UPDATES = 0;
 
@@ -0,0 +1,99 @@
+import numpy as np
+
+# joblib and pandas are imported where used: the API only needs them once the pipeline loads
+
+FEATURE_COLUMNS = ["latitude", "longitude", "typing_speed", "mouse_speed", "geo_velocity", "login_hour", "ip_frequency"]
+PIPELINE_PATH = "feature_pipeline.pkl"
+UNSEEN_IP_FREQUENCY = 0.0  # Frequency used for IPs missing from the training distribution
+
+
+class FeaturePipeline:
+    """Turns raw login records into scaled autoencoder input, online and offline alike.
+
+    The fitted MinMaxScaler is folded into `scale` and `offset` arrays, so scaling a
+    record is `raw * scale + offset` (the same arithmetic as MinMaxScaler.transform).
+    """
+
+    def __init__(self, scale, offset, ip_frequencies, unseen_ip_frequency=UNSEEN_IP_FREQUENCY):
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.ip_frequencies = dict(ip_frequencies)
+        self.unseen_ip_frequency = unseen_ip_frequency
+
+    @classmethod
+    def from_scaler(cls, scaler, ip_frequencies, unseen_ip_frequency=UNSEEN_IP_FREQUENCY):
+        return cls(scaler.scale_, scaler.min_, ip_frequencies, unseen_ip_frequency)
+
+    @classmethod
+    def load(cls, path=PIPELINE_PATH):
+        import joblib
+        return joblib.load(path)
+
+    def save(self, path=PIPELINE_PATH):
+        import joblib
+        joblib.dump(self, path)
+
+    def use_ip_frequencies(self, source):
+        """Swaps the IP-frequency lookup, e.g. for a live IPFrequencySketch (anything with get())."""
+        self.ip_frequencies = source
+
+    def ip_frequency(self, ip_address):
+        return self.ip_frequencies.get(ip_address, self.unseen_ip_frequency)
+
+    def ip_frequency_many(self, ip_addresses):
+        """ip_frequency() over a column of IPs."""
+        if isinstance(self.ip_frequencies, dict):
+            import pandas as pd
+            return pd.Series(ip_addresses).map(self.ip_frequencies).fillna(self.unseen_ip_frequency).to_numpy(dtype=np.float64)
+        return self.ip_frequencies.frequencies(ip_addresses, default=self.unseen_ip_frequency)
+
+    def raw_row(self, latitude, longitude, typing_speed, mouse_speed, geo_velocity, login_hour, ip_address):
+        """Unscaled feature row in FEATURE_COLUMNS order."""
+        return [latitude, longitude, typing_speed, mouse_speed, geo_velocity, login_hour, self.ip_frequency(ip_address)]
+
+    def transform_one(self, latitude, longitude, typing_speed, mouse_speed, geo_velocity, login_hour, ip_address):
+        """Single-record fast path: returns a scaled (7,) array."""
+        row = np.array(self.raw_row(latitude, longitude, typing_speed, mouse_speed, geo_velocity, login_hour, ip_address))
+        return row * self.scale + self.offset
+
+    def transform_rows(self, raw_rows):
+        """Scales an (n, 7) array of raw feature rows."""
+        return np.asarray(raw_rows, dtype=np.float64) * self.scale + self.offset
+
+    def feature_frame(self, df):
+        """Unscaled FEATURE_COLUMNS frame; derives login_hour and ip_frequency when missing."""
+        import pandas as pd
+
+        features = pd.DataFrame(index=df.index)
+        for col in FEATURE_COLUMNS[:5]:
+            features[col] = df[col].astype(np.float64)
+        if "login_hour" in df:
+            features["login_hour"] = df["login_hour"]
+        else:
+            features["login_hour"] = pd.to_datetime(df["login_time"]).dt.hour
+        if "ip_frequency" in df:
+            features["ip_frequency"] = df["ip_frequency"]
+        else:
+            features["ip_frequency"] = self.ip_frequency_many(df["ip_address"].to_numpy())
+        return features
+
+    def transform_frame(self, df):
+        """Batch path: returns the scaled (n, 7) array for a DataFrame of login records."""
+        return self.transform_rows(self.feature_frame(df).to_numpy(dtype=np.float64))
+
+
+def build_pipeline(scaler_path="scaler.pkl", ip_frequencies_path="ip_frequencies.pkl", path=PIPELINE_PATH):
+    """Builds feature_pipeline.pkl from the scaler and IP-frequency artifacts saved by training."""
+    import joblib
+
+    pipeline = FeaturePipeline.from_scaler(joblib.load(scaler_path), joblib.load(ip_frequencies_path))
+    pipeline.save(path)
+    return pipeline
+
+
+if __name__ == "__main__":
+    from artifacts import write_manifest
+
+    build_pipeline()
+    write_manifest()
+    print(f"✅ Feature pipeline saved as {PIPELINE_PATH}")
@@ -0,0 +1,115 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# WGS-84 ellipsoid (the model geopy's geodesic uses)
+WGS84_A = 6378.137  # Semi-major axis in km
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts scalars or equal-length arrays."""
+    if all(isinstance(v, (int, float)) for v in (lat1, lon1, lat2, lon2)):
+        # Scalar fast path for the online /login request
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def ellipsoidal_km(lat1, lon1, lat2, lon2, tolerance=1e-12, max_iterations=200):
+    """Vectorized Vincenty inverse formula on the WGS-84 ellipsoid, in km.
+
+    Agrees with geopy's geodesic to well under a metre. The few nearly antipodal
+    pairs where the iteration does not converge fall back to the haversine distance.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (lat1, lon1, lat2, lon2)))
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cos_U2 * sin_lam) ** 2 + (cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam) ** 2)
+            cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_U1 * cos_U2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos2_alpha == 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_U1 * sin_U2 / cos2_alpha)
+            C = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * WGS84_F * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - lam_prev) < tolerance
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distance = WGS84_B * A * (sigma - delta_sigma)
+
+    fallback = ~converged | ~np.isfinite(distance)
+    if fallback.any():
+        distance = np.where(fallback, haversine_km(lat1, lon1, lat2, lon2), distance)
+    return distance
+
+
+DISTANCE_METHODS = {
+    "haversine": haversine_km,
+    "ellipsoidal": ellipsoidal_km,
+}
+
+
+def compute_geo_velocity(df, method="haversine", user_col="user_id", time_col="login_time",
+                         lat_col="latitude", lon_col="longitude"):
+    """Per-user previous-point distance (km), time delta (h) and velocity (km/h).
+
+    `df` must already be sorted by user and login time, and `time_col` must hold datetimes.
+    Returns a DataFrame aligned to `df.index` with prev_<lat_col>, prev_<lon_col>,
+    prev_<time_col>, distance_km, time_diff_hours and geo_velocity. The first login of each
+    user has NaN previous values and a geo_velocity of 0, as does any non-positive time delta.
+    """
+    import pandas as pd  # Callers already hold a DataFrame; the scalar /login path never needs pandas
+
+    distance_fn = DISTANCE_METHODS[method]
+    grouped = df.groupby(user_col, sort=False)
+    prev_lat = grouped[lat_col].shift(1)
+    prev_lon = grouped[lon_col].shift(1)
+    prev_time = grouped[time_col].shift(1)
+
+    has_prev = prev_lat.notna().to_numpy() & prev_lon.notna().to_numpy() & prev_time.notna().to_numpy()
+    distance = np.full(len(df), np.nan)
+    distance[has_prev] = distance_fn(
+        prev_lat.to_numpy()[has_prev], prev_lon.to_numpy()[has_prev],
+        df[lat_col].to_numpy(dtype=np.float64)[has_prev], df[lon_col].to_numpy(dtype=np.float64)[has_prev]
+    )
+    time_diff_hours = ((df[time_col] - prev_time).dt.total_seconds() / 3600.0).to_numpy()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        velocity = np.where(has_prev & (time_diff_hours > 0), distance / time_diff_hours, 0.0)
+    velocity = np.nan_to_num(velocity, nan=0.0)
+
+    return pd.DataFrame({
+        f"prev_{lat_col}": prev_lat,
+        f"prev_{lon_col}": prev_lon,
+        f"prev_{time_col}": prev_time,
+        "distance_km": distance,
+        "time_diff_hours": time_diff_hours,
+        "geo_velocity": velocity,
+    }, index=df.index)
@@ -0,0 +1,277 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+SKETCH_PATH = "ip_sketch.npz"
+DEFAULT_EPSILON = 1e-5  # Max over-estimate of an IP's frequency (w = 271,829 counters per row)
+DEFAULT_DELTA = 0.01  # Probability that an estimate exceeds that bound (d = 5 rows)
+DEFAULT_HALF_LIFE_S = 30 * 24 * 3600
+DEFAULT_TOP_K = 100
+_MASK64 = (1 << 64) - 1
+_RENORMALIZE_EXPONENT = 64.0  # Rescale counters before exp() weights get anywhere near overflow
+_HASH_KEY = b"ip-frequency"
+
+
+def _timestamp(login_time):
+    if login_time is None:
+        return time.time()
+    if isinstance(login_time, datetime):
+        if login_time.tzinfo is None:
+            login_time = login_time.replace(tzinfo=timezone.utc)  # Naive times (utcnow, CSVs) are UTC
+        return login_time.timestamp()
+    return float(login_time)
+
+
+def _hash_pair(ip_address):
+    digest = hashlib.blake2b(str(ip_address).encode(), digest_size=16, key=_HASH_KEY).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class IPFrequencySketch:
+    """Memory-bounded, time-decayed estimate of each IP's share of logins (count-min sketch).
+
+    Each IP maps to one counter in each of `depth` rows (double hashing of a blake2b digest);
+    its count estimate is the minimum of those counters, and its frequency is that estimate
+    divided by the total count. Memory is width * depth float64 counters regardless of how
+    many distinct IPs are seen.
+
+    Error bound: with width = ceil(e / epsilon) and depth = ceil(ln(1 / delta)) an estimate
+    never under-counts, and over-counts by more than epsilon * total with probability at most
+    delta, so frequency(ip) lies in [f, f + epsilon] with probability >= 1 - delta.
+
+    Decay uses forward decay: a login at time t adds exp(t / tau) relative to a landmark, so an
+    update touches `depth` counters and old logins fade with the configured half-life without
+    ever rewriting the table. Counts and total decay by the same factor, so frequencies can be
+    read without knowing the current time. half_life_s=None disables decay.
+
+    The top_k IPs by estimated count are tracked as heavy hitters.
+    """
+
+    def __init__(self, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA, half_life_s=DEFAULT_HALF_LIFE_S, top_k=DEFAULT_TOP_K):
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.half_life_s = half_life_s
+        self.top_k = top_k
+        self.counts = np.zeros((self.depth, self.width), dtype=np.float64)
+        self.total = 0.0
+        self.landmark = None  # Time at which a login weighs exactly 1
+        self.updates = 0
+        self._rows = np.arange(self.depth)
+        self._heavy = {}  # ip -> estimated (landmark-relative) count
+        self._heavy_floor = 0.0
+        self._lock = threading.Lock()
+        self._snapshot_thread = None
+        self._stop = threading.Event()
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def _columns(self, ip_address):
+        h1, h2 = _hash_pair(ip_address)
+        return [((h1 + i * h2) & _MASK64) % self.width for i in range(self.depth)]
+
+    def _columns_many(self, ip_addresses):
+        pairs = np.array([_hash_pair(ip) for ip in ip_addresses], dtype=np.uint64).reshape(-1, 2)
+        # uint64 arithmetic wraps like the & _MASK64 in _columns
+        return ((pairs[:, :1] + self._rows.astype(np.uint64) * pairs[:, 1:]) % np.uint64(self.width)).astype(np.intp)
+
+    def _decay_rate(self):
+        return 0.0 if not self.half_life_s else math.log(2) / self.half_life_s
+
+    def _exponent(self, timestamp):
+        """Forward-decay exponent of a login at `timestamp`; moves the landmark when it grows too large."""
+        if self.landmark is None:
+            self.landmark = timestamp
+        exponent = self._decay_rate() * (timestamp - self.landmark)
+        if exponent > _RENORMALIZE_EXPONENT:
+            factor = math.exp(-exponent)
+            self.counts *= factor
+            self.total *= factor
+            self._heavy = {ip: count * factor for ip, count in self._heavy.items()}
+            self._heavy_floor *= factor
+            self.landmark = timestamp
+            exponent = 0.0
+        return exponent
+
+    def _track(self, ip_address, estimate):
+        if ip_address in self._heavy or len(self._heavy) < self.top_k:
+            self._heavy[ip_address] = estimate
+            if len(self._heavy) == self.top_k:
+                self._heavy_floor = min(self._heavy.values())
+        elif estimate > self._heavy_floor:
+            del self._heavy[min(self._heavy, key=self._heavy.get)]
+            self._heavy[ip_address] = estimate
+            self._heavy_floor = min(self._heavy.values())
+
+    def update(self, ip_address, login_time=None, count=1.0):
+        """Records `count` logins from ip_address at login_time (datetime or epoch seconds; default now)."""
+        columns = self._columns(ip_address)
+        with self._lock:
+            weight = count * math.exp(self._exponent(_timestamp(login_time)))
+            self.counts[self._rows, columns] += weight
+            self.total += weight
+            self.updates += 1
+            self._track(ip_address, float(self.counts[self._rows, columns].min()))
+
+    def update_many(self, ip_addresses, login_times=None, counts=None):
+        """Bulk update, e.g. seeding from a training set; login_times is a datetime64 array or None (now)."""
+        ip_addresses = np.asarray(ip_addresses, dtype=object)
+        if len(ip_addresses) == 0:
+            return
+        if login_times is None:
+            timestamps = np.full(len(ip_addresses), time.time())
+        else:
+            timestamps = np.asarray(login_times, dtype="datetime64[ns]").astype(np.int64) / 1e9
+        weights = np.ones(len(ip_addresses)) if counts is None else np.asarray(counts, dtype=np.float64)
+        uniques, inverse = np.unique(ip_addresses.astype(str), return_inverse=True)
+        columns = self._columns_many(uniques)
+        with self._lock:
+            self._exponent(float(timestamps.max()))  # Renormalize once, for the newest login
+            weights = weights * np.exp(self._decay_rate() * (timestamps - self.landmark))
+            for row in range(self.depth):
+                np.add.at(self.counts[row], columns[inverse, row], weights)
+            self.total += float(weights.sum())
+            self.updates += len(ip_addresses)
+            estimates = self.counts[self._rows, columns].min(axis=1)
+            for i in np.argsort(estimates)[-self.top_k:]:
+                self._track(str(uniques[i]), float(estimates[i]))
+
+    def get(self, ip_address, default=None):
+        """Estimated frequency of ip_address, or `default` for an IP never counted (dict-compatible)."""
+        estimate = float(self.counts[self._rows, self._columns(ip_address)].min())
+        if estimate <= 0.0 or self.total <= 0.0:
+            return default
+        return estimate / self.total
+
+    def frequencies(self, ip_addresses, default=0.0):
+        """Vectorized get() over an array of IPs; hashes each distinct IP once."""
+        ip_addresses = np.asarray(ip_addresses, dtype=object).astype(str)
+        if len(ip_addresses) == 0 or self.total <= 0.0:
+            return np.full(len(ip_addresses), default, dtype=np.float64)
+        uniques, inverse = np.unique(ip_addresses, return_inverse=True)
+        estimates = self.counts[self._rows, self._columns_many(uniques)].min(axis=1)
+        result = np.where(estimates > 0.0, estimates / self.total, default)
+        return result[inverse]
+
+    def heavy_hitters(self, n=None):
+        """The most frequent IPs as (ip, estimated frequency), highest first."""
+        with self._lock:
+            ranked = sorted(self._heavy.items(), key=lambda item: item[1], reverse=True)[:n or self.top_k]
+            total = self.total
+        return [(ip, count / total) for ip, count in ranked] if total > 0 else []
+
+    @classmethod
+    def from_frequencies(cls, ip_frequencies, total_count=None, login_time=None, **kwargs):
+        """Seeds a sketch from a {ip: frequency} dict such as ip_frequencies.pkl.
+
+        Without total_count the least frequent IP is assumed to have been seen once, which holds
+        for value_counts(normalize=True) over a dataset with any single-use IP.
+        """
+        sketch = cls(**kwargs)
+        if ip_frequencies:
+            frequencies = np.array(list(ip_frequencies.values()), dtype=np.float64)
+            if total_count is None:
+                total_count = round(1.0 / frequencies[frequencies > 0].min())
+            timestamp = _timestamp(login_time)
+            sketch.update_many(list(ip_frequencies.keys()),
+                               login_times=np.full(len(frequencies), int(timestamp * 1e9), dtype="datetime64[ns]"),
+                               counts=frequencies * total_count)
+        return sketch
+
+    def save(self, path=SKETCH_PATH):
+        """Writes an uncompressed .npz snapshot atomically (reloads with a single read)."""
+        with self._lock:
+            heavy = sorted(self._heavy.items(), key=lambda item: item[1], reverse=True)
+            arrays = dict(
+                counts=self.counts.copy(), total=self.total,
+                landmark=np.nan if self.landmark is None else self.landmark,
+                half_life_s=np.nan if not self.half_life_s else self.half_life_s,
+                top_k=self.top_k, updates=self.updates,
+                heavy_ips=np.array([ip for ip, _ in heavy], dtype=str),
+                heavy_counts=np.array([count for _, count in heavy], dtype=np.float64),
+            )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SKETCH_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            half_life_s = float(data["half_life_s"])
+            sketch = cls(half_life_s=None if np.isnan(half_life_s) else half_life_s, top_k=int(data["top_k"]))
+            sketch.counts = data["counts"]
+            sketch.depth, sketch.width = sketch.counts.shape
+            sketch._rows = np.arange(sketch.depth)
+            sketch.total = float(data["total"])
+            landmark = float(data["landmark"])
+            sketch.landmark = None if np.isnan(landmark) else landmark
+            sketch.updates = int(data["updates"])
+            sketch._heavy = dict(zip(data["heavy_ips"].tolist(), data["heavy_counts"].tolist()))
+        sketch._heavy_floor = min(sketch._heavy.values()) if len(sketch._heavy) == sketch.top_k else 0.0
+        return sketch
+
+    def start_snapshots(self, path=SKETCH_PATH, interval_s=300):
+        """Saves a snapshot every interval_s seconds from a daemon thread until close()."""
+        def run():
+            while not self._stop.wait(interval_s):
+                self.save(path)
+
+        self._snapshot_path = path
+        self._snapshot_thread = threading.Thread(target=run, name="ip-sketch-snapshots", daemon=True)
+        self._snapshot_thread.start()
+
+    def close(self):
+        """Stops periodic snapshots and writes a final one."""
+        if self._snapshot_thread is not None:
+            self._stop.set()
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+            self.save(self._snapshot_path)
+
+    def stats(self):
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "epsilon": self.epsilon,
+            "delta": self.delta,
+            "half_life_s": self.half_life_s,
+            "updates": self.updates,
+            "memory_bytes": int(self.counts.nbytes),
+            "heavy_hitters": [{"ip_address": ip, "frequency": f} for ip, f in self.heavy_hitters(10)],
+        }
+
+
+def open_sketch(path=SKETCH_PATH, seed_frequencies=None, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA,
+                half_life_s=DEFAULT_HALF_LIFE_S, top_k=DEFAULT_TOP_K):
+    """Reloads the last snapshot, or seeds a new sketch from the training IP frequencies.
+
+    A snapshot taken with other settings (epsilon / delta change the table size; the half-life
+    and top_k change how its counts are read) is replaced by a freshly seeded sketch, with a warning.
+    """
+    if os.path.exists(path):
+        sketch = IPFrequencySketch.load(path)
+        requested = {"width": math.ceil(math.e / epsilon), "depth": math.ceil(math.log(1 / delta)),
+                     "half_life_s": half_life_s or None, "top_k": top_k}
+        found = {"width": sketch.width, "depth": sketch.depth, "half_life_s": sketch.half_life_s or None,
+                 "top_k": sketch.top_k}
+        if found == requested:
+            return sketch
+        changed = ", ".join(f"{name} {found[name]} -> {requested[name]}" for name in requested if found[name] != requested[name])
+        logging.warning(f"{path} was built with other IP sketch settings ({changed}); "
+                        f"re-seeding from the training frequencies (the snapshot is replaced on the next save)")
+    return IPFrequencySketch.from_frequencies(seed_frequencies or {}, epsilon=epsilon, delta=delta,
+                                              half_life_s=half_life_s, top_k=top_k)
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+import aiohttp
+import numpy as np
+
+# Compares /login servers under many concurrent clients, e.g.
+#   python loadtest.py --target flask=http://127.0.0.1:5000 --target asgi=http://127.0.0.1:8000 --concurrency 1000
+
+LOCATIONS = [(40.7128, -74.0060, "EST"), (51.5074, -0.1278, "GMT"), (35.6895, 139.6917, "JST"), (19.0760, 72.8777, "IST")]
+EXPECTED_STATUSES = {200, 401, 403}
+
+
+def make_payload(rng, num_users):
+    user = rng.randrange(num_users)
+    lat, lon, tz = LOCATIONS[user % len(LOCATIONS)]
+    return {
+        "user_id": f"load_{user}",
+        "ip_address": f"10.{user % 250}.{rng.randrange(4)}.1",  # Occasional IP change
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": tz,
+        "device_info": "Windows",
+        "typing_speed": round(rng.uniform(2.5, 15), 2),
+        "mouse_speed": round(rng.uniform(300, 2000), 2),
+    }
+
+
+def valid_body(status, body):
+    """Checks the response against the /login contract."""
+    if body.get("status") not in ("allow", "mfa", "block"):
+        return False
+    if "breakdown" not in body:
+        return status == 403 and "geo_velocity" in body  # Impossible-travel block has no breakdown
+    return {"autoencoder_error", "rule_based_risk", "total_risk_score"} <= body["breakdown"].keys()
+
+
+async def client(session, url, deadline, rng, num_users, latencies, statuses):
+    while time.perf_counter() < deadline:
+        payload = make_payload(rng, num_users)
+        start = time.perf_counter()
+        try:
+            async with session.post(url, json=payload) as response:
+                body = await response.json(content_type=None)
+                elapsed = time.perf_counter() - start
+        except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError):
+            statuses["error"] += 1
+            continue
+        latencies.append(elapsed)
+        if response.status in EXPECTED_STATUSES and valid_body(response.status, body):
+            statuses[response.status] += 1
+        else:
+            statuses["contract_violation"] += 1
+
+
+async def run_load(base_url, concurrency, duration, num_users, seed):
+    latencies, statuses = [], Counter()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client(session, base_url.rstrip("/") + "/login", deadline, random.Random(seed + i), num_users, latencies, statuses)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000.0 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /login load test")
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, may be repeated")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per target")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON results file")
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.target:
+        name, url = target.split("=", 1)
+        print(f"Running {args.concurrency} clients against {name} ({url}) for {args.duration:.0f}s...")
+        results[name] = asyncio.run(run_load(url, args.concurrency, args.duration, args.users, args.seed))
+
+    print(f"\n{'target':10s} {'req/s':>10s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s}  statuses")
+    for name, r in results.items():
+        print(f"{name:10s} {r['requests_per_sec']:10.1f} {r['p50_ms']:10.1f} {r['p95_ms']:10.1f} {r['p99_ms']:10.1f}  {r['statuses']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
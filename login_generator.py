@@ -0,0 +1,267 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_store
+from data_generatorD import major_locations, device_types
+from dataset_store import save_dataset, dataset_path
+
+# Vectorized synthetic login histories at load-test scale, written straight to the dataset store, e.g.
+#   python login_generator.py --rows 100M --workers 16 --name synthetic_logins
+#   python login_generator.py --users 50k --scenario local_drift --scenario impossible_travel:0.01
+# Users are generated in shards; shard i always gets the i-th child of SeedSequence(--seed), so the
+# output depends on the seed and shard size only, not on the number of workers.
+
+CITY_LATITUDES = np.array([city[1] for city in major_locations])
+CITY_LONGITUDES = np.array([city[2] for city in major_locations])
+TIMEZONES = [city[3] for city in major_locations]
+SCENARIO_LABELS = ["normal", "local_drift", "relocation", "device_change", "impossible_travel"]
+DEFAULT_SCENARIOS = ["relocation:0.02", "device_change:0.02", "local_drift:1.0", "impossible_travel:0.005"]
+DEFAULT_SHARD_USERS = 50_000
+START = np.datetime64("2025-01-01T00:00:00", "s")
+
+
+def parse_count(value):
+    """'10k', '2.5M', '50M' or a plain integer."""
+    value = value.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+def random_ips(rng, size):
+    """Random public-looking IPv4 addresses as uint32 (first octet 1-223)."""
+    return rng.integers(1 << 24, 224 << 24, size=size, dtype=np.uint32)
+
+
+def fill_index(mask):
+    """For every row, the index of the latest row at or before it where mask is set.
+
+    Each user's first row is always set, so values never leak from one user to the next.
+    """
+    return np.maximum.accumulate(np.where(mask, np.arange(mask.size), 0))
+
+
+def segment_cumsum(values, segment_start):
+    """Cumulative sum of values restarting at every segment_start row."""
+    total = np.cumsum(values)
+    start = fill_index(segment_start)
+    return total - total[start] + values[start]
+
+
+# Scenarios modify a block of sessions in place; they run in this order whatever the command line order
+def relocation(block, rng, rate):
+    """Major relocation (data_generatorC/D): a new city, IP and device 48-96 hours later, kept from then on."""
+    moved = (rng.random(block["n"]) < rate) & ~block["first"]
+    count = int(moved.sum())
+    block["city"][moved] = rng.integers(0, len(major_locations), size=count)
+    block["ip"][moved] = random_ips(rng, count)
+    block["device"][moved] = rng.integers(0, len(device_types), size=count)
+    block["gap_s"][moved] = rng.uniform(48, 96, size=count) * 3600
+    block["segment_start"] |= moved
+    index = fill_index(block["segment_start"])
+    for key in ["city", "ip", "device"]:
+        block[key] = block[key][index]
+    block["label"][moved] = SCENARIO_LABELS.index("relocation")
+
+
+def device_change(block, rng, rate):
+    """A new device (same place and IP), used from then on."""
+    changed = (rng.random(block["n"]) < rate) & ~block["first"]
+    block["device"][changed] = rng.integers(0, len(device_types), size=int(changed.sum()))
+    # Relocations (segment starts) keep the device they moved to
+    block["device"] = block["device"][fill_index(changed | block["segment_start"])]
+    block["label"][changed] = SCENARIO_LABELS.index("device_change")
+
+
+def local_drift(block, rng, rate):
+    """Local drift (data_generator.py): up to 0.05 degrees from the previous login, 10 minutes per km moved."""
+    drifted = (rng.random(block["n"]) < rate) & ~block["segment_start"]
+    step_lat = np.where(drifted, rng.uniform(-0.05, 0.05, size=block["n"]), 0.0)
+    step_lon = np.where(drifted, rng.uniform(-0.05, 0.05, size=block["n"]), 0.0)
+    block["lat_offset"] = segment_cumsum(step_lat, block["segment_start"])
+    block["lon_offset"] = segment_cumsum(step_lon, block["segment_start"])
+    # Equirectangular distance of the step; plenty for 0.05 degree moves
+    latitude = np.radians(CITY_LATITUDES[block["city"]])
+    step_km = 6371.0 * np.radians(np.hypot(step_lat, step_lon * np.cos(latitude)))
+    block["gap_s"] += step_km * 10 * 60
+    block["label"][drifted & (block["label"] == 0)] = SCENARIO_LABELS.index("local_drift")
+
+
+def impossible_travel(block, rng, rate):
+    """Account-takeover attempt: another city, IP and device minutes after the previous login (one-off)."""
+    attack = (rng.random(block["n"]) < rate) & ~block["first"]
+    count = int(attack.sum())
+    shift = rng.integers(1, len(major_locations), size=count)
+    block["city"][attack] = (block["city"][attack] + shift) % len(major_locations)
+    block["ip"][attack] = random_ips(rng, count)
+    block["device"][attack] = rng.integers(0, len(device_types), size=count)
+    block["gap_s"][attack] = rng.uniform(5, 60, size=count) * 60
+    block["lat_offset"][attack] = 0.0
+    block["lon_offset"][attack] = 0.0
+    block["typing_speed"][attack] = rng.uniform(2, 15, size=count)  # Not the user's own rhythm
+    block["mouse_speed"][attack] = rng.uniform(300, 2000, size=count)
+    block["label"][attack] = SCENARIO_LABELS.index("impossible_travel")
+
+
+SCENARIOS = {
+    "relocation": relocation,
+    "device_change": device_change,
+    "local_drift": local_drift,
+    "impossible_travel": impossible_travel,
+}
+
+
+def parse_scenarios(specs):
+    """['relocation:0.02', 'local_drift'] -> [(name, rate)] in SCENARIOS order (rate defaults to 1.0)."""
+    rates = {}
+    for spec in specs:
+        name, _, rate = spec.partition(":")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (expected one of {', '.join(SCENARIOS)})")
+        rates[name] = float(rate) if rate else 1.0
+    return [(name, rates[name]) for name in SCENARIOS if name in rates]
+
+
+def generate_users(first_user_id, users, rng, scenarios, mean_logins=20, span_days=365, mean_gap_hours=24.0):
+    """Login history of `users` consecutive user ids, sorted by user_id and login_time."""
+    counts = 1 + rng.poisson(mean_logins - 1, size=users)
+    n = int(counts.sum())
+    first = np.zeros(n, dtype=bool)
+    first[np.cumsum(counts) - counts] = True
+    base_typing = rng.uniform(2.5, 15, size=users)
+    base_mouse = rng.uniform(300, 2000, size=users)
+    block = {
+        "n": n,
+        "first": first,
+        "segment_start": first.copy(),
+        "city": np.repeat(rng.integers(0, len(major_locations), size=users), counts),
+        "ip": np.repeat(random_ips(rng, users), counts),
+        "device": np.repeat(rng.integers(0, len(device_types), size=users), counts),
+        "gap_s": rng.exponential(mean_gap_hours * 3600, size=n),
+        "lat_offset": np.zeros(n),
+        "lon_offset": np.zeros(n),
+        # Each user types and moves the mouse at their own pace, with some session-to-session noise
+        "typing_speed": np.repeat(base_typing, counts) * rng.normal(1.0, 0.1, size=n),
+        "mouse_speed": np.repeat(base_mouse, counts) * rng.normal(1.0, 0.1, size=n),
+        "label": np.zeros(n, dtype=np.int8),
+    }
+    for name, rate in scenarios:
+        SCENARIOS[name](block, rng, rate)
+
+    block["gap_s"][first] = rng.uniform(0, span_days * 86400, size=users)  # First login somewhere in the span
+    login_time = START + segment_cumsum(block["gap_s"], first).astype("timedelta64[s]")
+    ips, ip_codes = np.unique(block["ip"], return_inverse=True)
+    ip_names = [f"{ip >> 24}.{(ip >> 16) & 255}.{(ip >> 8) & 255}.{ip & 255}" for ip in ips.tolist()]
+    return pd.DataFrame({
+        "user_id": np.repeat(np.arange(first_user_id, first_user_id + users, dtype=np.int64), counts),
+        "ip_address": pd.Categorical.from_codes(ip_codes.reshape(-1), ip_names),
+        "latitude": np.round(CITY_LATITUDES[block["city"]] + block["lat_offset"], 6),
+        "longitude": np.round(CITY_LONGITUDES[block["city"]] + block["lon_offset"], 6),
+        "timezone": pd.Categorical.from_codes(block["city"], TIMEZONES),
+        "device_info": pd.Categorical.from_codes(block["device"], device_types),
+        "typing_speed": np.round(np.clip(block["typing_speed"], 0.5, None), 2),
+        "mouse_speed": np.round(np.clip(block["mouse_speed"], 50, None), 2),
+        "login_time": login_time,
+        "scenario": pd.Categorical.from_codes(block["label"], SCENARIO_LABELS),
+    })
+
+
+def check_scenarios(scenarios, seed=42, users=2000):
+    """Generates a small sample and checks that relocation and device_change rows still switch device when
+    combined with the other scenarios (a later scenario must not undo an earlier one); returns the problems."""
+    df = generate_users(1, users, np.random.default_rng(seed), scenarios)
+    codes = df["device_info"].cat.codes.to_numpy()
+    changed = np.r_[False, codes[1:] != codes[:-1]]
+    expected = 1 - 1 / len(device_types)  # A random new device differs from the old one
+    problems = []
+    for name in ["relocation", "device_change"]:
+        rows = (df["scenario"] == name).to_numpy()
+        if rows.any() and changed[rows].mean() < expected / 2:
+            problems.append(f"only {changed[rows].mean():.0%} of {name} rows change device (expected ~{expected:.0%})")
+    return problems
+
+
+def generate_shard(task):
+    """Worker entry point: generates one shard and writes it (or returns it when the parent must write)."""
+    shard, first_user_id, users, seed_sequence, options, name, root, write = task
+    df = generate_users(first_user_id, users, np.random.default_rng(seed_sequence), **options)
+    if not write:
+        return shard, df
+    save_dataset(df, name, append=True, root=root, part_name=f"{shard:06d}")
+    return shard, len(df)
+
+
+def generate(name, users, scenarios, workers=None, seed=42, shard_users=DEFAULT_SHARD_USERS, first_user_id=1,
+             root=dataset_store.DATASET_ROOT, append=False, **options):
+    """Writes `users` users' login histories to dataset `name`; returns the number of rows."""
+    shards = -(-users // shard_users)
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    # Parquet parts can be written by the workers in parallel; a CSV fallback has to be appended by one writer
+    write_in_workers = dataset_store.pa is not None
+    if not append:
+        if os.path.isdir(dataset_path(name, root)):
+            shutil.rmtree(dataset_path(name, root))
+        if not write_in_workers and os.path.exists(dataset_store.csv_path(name)):
+            os.remove(dataset_store.csv_path(name))
+    tasks = [
+        (shard, first_user_id + shard * shard_users, min(shard_users, users - shard * shard_users), seeds[shard],
+         {"scenarios": scenarios, **options}, name, root, write_in_workers)
+        for shard in range(shards)
+    ]
+
+    rows = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        # Ordered, so a single CSV writer appends shards in user_id order
+        for done, (shard, result) in enumerate(pool.imap(generate_shard, tasks), start=1):
+            if not write_in_workers:
+                save_dataset(result, name, append=True, root=root)
+                result = len(result)
+            rows += result
+            if done % 10 == 0 or done == shards:
+                print(f"  {done}/{shards} shards, {rows:,} rows ({rows / (time.perf_counter() - start):,.0f} rows/s)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic login histories with composable scenarios")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--users", type=parse_count)
+    size.add_argument("--rows", type=parse_count, help="approximate row count (users = rows / --mean-logins)")
+    parser.add_argument("--name", default="synthetic_logins", help="dataset name in the dataset store")
+    parser.add_argument("--scenario", action="append", metavar="NAME[:RATE]",
+                        help=f"one of {', '.join(SCENARIOS)}; may be repeated (default: {' '.join(DEFAULT_SCENARIOS)})")
+    parser.add_argument("--mean-logins", type=int, default=20, help="average logins per user")
+    parser.add_argument("--span-days", type=int, default=365)
+    parser.add_argument("--mean-gap-hours", type=float, default=24.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shard-users", type=int, default=DEFAULT_SHARD_USERS, help="users per shard (and per part file)")
+    parser.add_argument("--first-user-id", type=int, default=1)
+    parser.add_argument("--append", action="store_true", help="add to the dataset instead of replacing it")
+    args = parser.parse_args()
+
+    users = args.users or max(1, args.rows // args.mean_logins)
+    try:
+        scenarios = parse_scenarios(args.scenario or DEFAULT_SCENARIOS)
+    except ValueError as e:
+        parser.error(str(e))
+    problems = check_scenarios(scenarios, seed=args.seed)
+    if problems:
+        print(f"⚠️ Scenario check failed: {'; '.join(problems)}")
+        raise SystemExit(1)
+    print(f"Generating {users:,} users ({', '.join(f'{name}:{rate:g}' for name, rate in scenarios)})...")
+    start = time.perf_counter()
+    rows = generate(args.name, users, scenarios, workers=args.workers, seed=args.seed, shard_users=args.shard_users,
+                    first_user_id=args.first_user_id, append=args.append, mean_logins=args.mean_logins,
+                    span_days=args.span_days, mean_gap_hours=args.mean_gap_hours)
+    print(f"✅ {rows:,} logins saved as '{args.name}' in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
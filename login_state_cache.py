@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+# The fields of a user's previous login that the /login risk rules read
+LastLogin = namedtuple("LastLogin", ["ip_address", "device_info", "timezone", "latitude", "longitude", "login_time"])
+
+_NO_HISTORY = object()  # Cached marker for users with no stored login
+
+
+class LastLoginCache:
+    """Bounded, LRU-evicting per-user store of the most recent allowed login.
+
+    Misses are resolved through `loader(user_id)`, which returns a LastLogin or None; callers
+    with their own (e.g. async) loader use lookup() and fill() instead of get().
+    Users without any history are cached too, so repeated first logins stay off the database.
+    """
+
+    def __init__(self, loader, capacity=100_000):
+        self.loader = loader
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        found, entry = self.lookup(user_id)
+        if found:
+            return entry
+        # Query outside the lock so one slow lookup doesn't stall other users
+        return self.fill(user_id, self.loader(user_id))
+
+    def lookup(self, user_id):
+        """Cache-only read: returns (True, entry) on a hit and (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return True, None if entry is _NO_HISTORY else entry
+
+    def fill(self, user_id, entry):
+        """Stores the result of a miss lookup and returns the user's current entry."""
+        with self._lock:
+            # A concurrent put() may have stored a newer login while we were loading
+            if user_id not in self._entries:
+                self._store(user_id, _NO_HISTORY if entry is None else entry)
+                return entry
+            current = self._entries[user_id]
+            return None if current is _NO_HISTORY else current
+
+    def put(self, user_id, last_login):
+        """Records a committed login as the user's latest state."""
+        with self._lock:
+            self._store(user_id, last_login)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def warm(self, rows):
+        """Bulk-loads (user_id, LastLogin) pairs, keeping at most `capacity` of them."""
+        with self._lock:
+            for user_id, last_login in rows:
+                self._store(user_id, last_login)
+
+    def _store(self, user_id, entry):
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,186 @@
+import bisect
+import random
+import threading
+import time
+
+
+# Default bucket bounds (upper edges). Batch sizes are small integers, waits are in microseconds.
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+MICROSECOND_BUCKETS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000]
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate percentiles."""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is the +Inf bucket
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """Returns the upper bound of the bucket holding the q-th percentile (0-100)."""
+        with self._lock:
+            counts, total, observed_max = list(self.counts), self.count, self.max
+        if total == 0:
+            return 0.0
+        rank = q / 100.0 * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index < len(self.buckets):
+                    return min(float(self.buckets[index]), observed_max)
+                return observed_max
+        return observed_max
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, total_sum = list(self.counts), self.count, self.sum
+        buckets = {str(bound): counts[i] for i, bound in enumerate(self.buckets)}
+        buckets["+Inf"] = counts[-1]
+        return {
+            "count": total,
+            "mean": total_sum / total if total else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class Counter:
+    """Monotonic counters keyed by a tuple of label values."""
+
+    def __init__(self, label_names):
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.values)
+
+
+class RequestTimer:
+    """Laps of one sampled request; each lap() closes the stage that started at the previous lap."""
+
+    __slots__ = ("metrics", "started", "last", "laps")
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.started = self.last = time.perf_counter()
+        self.laps = []
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.laps.append((stage, now - self.last))
+        self.last = now
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        for stage, seconds in self.laps:
+            self.metrics.histograms[stage].observe(seconds * 1_000_000.0)
+        self.metrics.histograms["total"].observe(total * 1_000_000.0)
+        self.laps.append(("total", total))
+
+    def server_timing(self):
+        """Server-Timing header value (durations in ms), e.g. 'last_login;dur=0.412, total;dur=1.9'."""
+        return ", ".join(f"{stage};dur={seconds * 1000.0:.3f}" for stage, seconds in self.laps)
+
+
+class _NullTimer:
+    """Stand-in for unsampled requests: every call is a no-op."""
+
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def finish(self):
+        pass
+
+    def server_timing(self):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+class StageMetrics:
+    """Per-stage latency histograms (microseconds) for a sampled fraction of requests.
+
+    start() returns a RequestTimer for sampled requests and NULL_TIMER otherwise, so with
+    sample_rate=0 instrumented code pays one comparison and a few no-op calls per request.
+    """
+
+    def __init__(self, stages, sample_rate=1.0, buckets=MICROSECOND_BUCKETS):
+        self.stages = list(stages)
+        self.sample_rate = sample_rate
+        self.histograms = {stage: Histogram(buckets) for stage in self.stages + ["total"]}
+
+    def start(self):
+        if self.sample_rate <= 0.0 or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return NULL_TIMER
+        return RequestTimer(self)
+
+    def snapshot(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "stages_us": {stage: histogram.snapshot() for stage, histogram in self.histograms.items()},
+        }
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+    return "{" + pairs + "}"
+
+
+def prometheus_histogram(name, help_text, series, label_name=None, scale=1.0):
+    """Prometheus text lines for {label value: Histogram}; `scale` converts observed units (e.g. 1e-6 for us -> s)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for label_value, histogram in series.items():
+        with histogram._lock:
+            counts, total, total_sum = list(histogram.counts), histogram.count, histogram.sum
+        names, values = ((label_name,), (label_value,)) if label_name else ((), ())
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + [None], counts):
+            cumulative += count
+            le = "+Inf" if bound is None else f"{bound * scale:g}"
+            lines.append(f"{name}_bucket{_labels(names + ('le',), values + (le,))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(names, values)} {total_sum * scale!r}")
+        lines.append(f"{name}_count{_labels(names, values)} {total}")
+    return lines
+
+
+def prometheus_counter(name, help_text, counter):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for label_values, value in sorted(counter.snapshot().items()):
+        lines.append(f"{name}{_labels(counter.label_names, label_values)} {value}")
+    return lines
+
+
+def prometheus_gauge(name, help_text, samples, label_names=()):
+    """`samples` maps a tuple of label values to the current value."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for label_values, value in samples.items():
+        lines.append(f"{name}{_labels(label_names, label_values)} {value}")
+    return lines
@@ -0,0 +1,20 @@
+"""login_attempts as first created by db42.sql."""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, DateTime, inspect
+
+
+def upgrade(conn):
+    if inspect(conn).has_table("login_attempts"):
+        return  # Created by db42.sql or by the app's create_all()
+    Table(
+        "login_attempts", MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("user_id", String(255)),
+        Column("ip_address", String(50)),
+        Column("latitude", Float),
+        Column("longitude", Float),
+        Column("timezone", String(50)),
+        Column("device_info", String(255)),
+        Column("typing_speed", Float),
+        Column("mouse_speed", Float),
+        Column("login_time", DateTime),
+    ).create(conn)
@@ -0,0 +1,8 @@
+"""The geo_velocity column, previously added by hand with an ALTER in db42.sql."""
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("login_attempts")}
+    if "geo_velocity" not in columns:
+        conn.execute(text("ALTER TABLE login_attempts ADD COLUMN geo_velocity FLOAT DEFAULT NULL"))
@@ -0,0 +1,14 @@
+"""Indexes for the latest-attempt-per-user lookup and per-IP counts (see schema.py)."""
+from sqlalchemy import inspect, text
+
+INDEXES = {
+    "ix_login_attempts_user_id_login_time": "user_id, login_time",
+    "ix_login_attempts_ip_address": "ip_address",
+}
+
+
+def upgrade(conn):
+    existing = {index["name"] for index in inspect(conn).get_indexes("login_attempts")}
+    for name, columns in INDEXES.items():
+        if name not in existing:  # MySQL has no CREATE INDEX IF NOT EXISTS
+            conn.execute(text(f"CREATE INDEX {name} ON login_attempts ({columns})"))
@@ -0,0 +1,20 @@
+"""login_rollups, filled by retention.py before old attempts are deleted."""
+from sqlalchemy import MetaData, Table, Column, Index, Integer, String, Float, Date, DateTime, inspect
+
+
+def upgrade(conn):
+    if inspect(conn).has_table("login_rollups"):
+        return
+    Table(
+        "login_rollups", MetaData(),
+        Column("day", Date, primary_key=True),
+        Column("user_id", String(255), primary_key=True),
+        Column("ip_address", String(50), primary_key=True),
+        Column("attempts", Integer, nullable=False, default=0),
+        Column("typing_speed_sum", Float, nullable=False, default=0.0),
+        Column("mouse_speed_sum", Float, nullable=False, default=0.0),
+        Column("max_geo_velocity", Float, nullable=True),
+        Column("first_login", DateTime, nullable=True),
+        Column("last_login", DateTime, nullable=True),
+        Index("ix_login_rollups_ip_address", "ip_address"),
+    ).create(conn)
@@ -0,0 +1,18 @@
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Input, Dense
+
+
+def build_autoencoder(input_dim, encoder_units=(16, 8, 4), optimizer='adam'):
+    """Dense autoencoder; the decoder mirrors the encoder (7-16-8-4-8-16-7 by default)."""
+    input_layer = Input(shape=(input_dim,))  #  Defines the input layer with the same number of features
+    encoded = input_layer
+    for units in encoder_units:
+        encoded = Dense(units, activation='relu')(encoded)
+    decoded = encoded
+    for units in reversed(encoder_units[:-1]):
+        decoded = Dense(units, activation='relu')(decoded)
+    decoded = Dense(input_dim, activation='sigmoid')(decoded)
+
+    autoencoder = Model(input_layer, decoded)  #Connects the input layer to the output layer.
+    autoencoder.compile(optimizer=optimizer, loss='mse')
+    return autoencoder
@@ -0,0 +1,433 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from artifacts import MANIFEST_PATH, load_manifest, verify_file, write_manifest
+from feature_pipeline import FeaturePipeline, FEATURE_COLUMNS, PIPELINE_PATH, build_pipeline
+from metrics import Histogram
+from numpy_autoencoder import load_autoencoder, model_file, quantized_weights_path, KERAS_MODEL_PATH, NUMPY_WEIGHTS_PATH
+from risk_scoring import RULES, DEFAULT_THRESHOLDS, decide_batch
+from rule_engine import RuleEngine
+
+# Versioned model bundles: models/<version>/ holds everything one model version needs,
+# and models/ACTIVE names the version every server process should serve, e.g.
+#   python model_registry.py publish --activate      # bundle the artifacts from the last training run
+#   python model_registry.py list
+#   python model_registry.py activate 20261017-201500
+
+REGISTRY_ROOT = "models"
+ACTIVE_FILE = "ACTIVE"
+LEGACY_VERSION = "legacy"  # The top-level artifacts, served while the registry has no active version
+THRESHOLDS_FILE = "thresholds.json"
+BUNDLE_MANIFEST = "manifest.json"
+# Copied into a bundle when present; the autoencoder needs the .npz export or the .keras model
+# (plus the float16 / int8 exports for AUTOENCODER_PRECISION)
+BUNDLE_FILES = [NUMPY_WEIGHTS_PATH, KERAS_MODEL_PATH, "scaler.pkl", "label_encoders.pkl", "ip_frequencies.pkl", PIPELINE_PATH,
+                quantized_weights_path(NUMPY_WEIGHTS_PATH, "float16"), quantized_weights_path(NUMPY_WEIGHTS_PATH, "int8")]
+DELTA_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+IP_FREQUENCY_INDEX = FEATURE_COLUMNS.index("ip_frequency")
+
+
+def bundle_path(version, root=REGISTRY_ROOT):
+    return os.path.join(root, version)
+
+
+def list_versions(root=REGISTRY_ROOT):
+    """Published versions, oldest first (half-written bundles have no manifest yet)."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if not name.startswith(".") and os.path.exists(os.path.join(root, name, BUNDLE_MANIFEST)))
+
+
+def active_version(root=REGISTRY_ROOT):
+    path = os.path.join(root, ACTIVE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def set_active(version, root=REGISTRY_ROOT):
+    """Points models/ACTIVE at `version` (atomic replace); LEGACY_VERSION removes it."""
+    path = os.path.join(root, ACTIVE_FILE)
+    if version == LEGACY_VERSION:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    if version not in list_versions(root):
+        raise ValueError(f"Unknown model version '{version}' in {root}/")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def publish_bundle(source_dir=".", version=None, thresholds=None, root=REGISTRY_ROOT, activate=False):
+    """Copies the trained artifacts in `source_dir` into models/<version>/ and returns the version.
+
+    The bundle is assembled in a hidden directory and renamed into place, so watchers never see
+    a partial bundle. `thresholds` overrides entries of DEFAULT_THRESHOLDS.
+    """
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    target = bundle_path(version, root)
+    if os.path.exists(target):
+        raise ValueError(f"Model version '{version}' already exists in {root}/")
+    if not any(os.path.exists(os.path.join(source_dir, name)) for name in [NUMPY_WEIGHTS_PATH, KERAS_MODEL_PATH]):
+        raise ValueError(f"No {NUMPY_WEIGHTS_PATH} or {KERAS_MODEL_PATH} in {source_dir}")
+
+    staging = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name in BUNDLE_FILES:
+        if os.path.exists(os.path.join(source_dir, name)):
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(staging, name))
+    if not os.path.exists(os.path.join(staging, PIPELINE_PATH)):
+        build_pipeline(os.path.join(staging, "scaler.pkl"), os.path.join(staging, "ip_frequencies.pkl"),
+                       os.path.join(staging, PIPELINE_PATH))
+    with open(os.path.join(staging, THRESHOLDS_FILE), "w", encoding="utf-8") as f:
+        json.dump({**DEFAULT_THRESHOLDS, **(thresholds or {})}, f, indent=2)
+        f.write("\n")
+    write_manifest(BUNDLE_FILES + [THRESHOLDS_FILE], os.path.join(staging, BUNDLE_MANIFEST), root=staging)
+    os.rename(staging, target)
+    if activate:
+        set_active(version, root)
+    return version
+
+
+class ModelBundle:
+    """One model version: autoencoder, feature pipeline and decision thresholds, always used together."""
+
+    def __init__(self, version, model, pipeline, thresholds=DEFAULT_THRESHOLDS):
+        self.version = version
+        self.model = model
+        self.pipeline = pipeline
+        self.thresholds = {**DEFAULT_THRESHOLDS, **thresholds}
+        self.timings = {}
+
+    def score(self, raw_rows):
+        """Reconstruction error of each unscaled feature row."""
+        scaled = self.pipeline.transform_rows(raw_rows)
+        return np.mean(np.abs(scaled - self.model.predict(scaled, verbose=0)), axis=1)
+
+    def warm(self, batch_sizes=(1, 8, 32), repeats=3):
+        """Runs a few predictions so the first real requests don't pay for lazy initialization."""
+        start = time.perf_counter()
+        # The middle of the training range for every feature
+        scale = np.where(self.pipeline.scale == 0, 1.0, self.pipeline.scale)
+        row = (0.5 - self.pipeline.offset) / scale
+        row[IP_FREQUENCY_INDEX] = self.pipeline.ip_frequency("0.0.0.0")
+        for size in batch_sizes:
+            for _ in range(repeats):
+                self.score(np.repeat(row[None, :], size, axis=0))
+        self.timings["warm_s"] = time.perf_counter() - start
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "precision": getattr(self.model, "precision", "float32"),
+            "thresholds": self.thresholds,
+            **{key: round(value, 4) for key, value in self.timings.items()},
+        }
+
+
+def load_bundle(version, root=REGISTRY_ROOT, pipeline_path=PIPELINE_PATH, precision=None):
+    """Loads models/<version>/ after checking it against its manifest.
+
+    LEGACY_VERSION loads the top-level artifacts (checked against artifacts_manifest.json) with the
+    default thresholds; `pipeline_path` only applies there. `precision` picks the autoencoder export
+    (default: AUTOENCODER_PRECISION).
+    """
+    start = time.perf_counter()
+    if version == LEGACY_VERSION:
+        directory, manifest, manifest_path = ".", load_manifest(), MANIFEST_PATH
+        model_paths = {"npz_path": NUMPY_WEIGHTS_PATH, "keras_path": KERAS_MODEL_PATH}
+    else:
+        directory = bundle_path(version, root)
+        manifest_path = os.path.join(directory, BUNDLE_MANIFEST)
+        manifest = load_manifest(manifest_path)
+        if manifest is None:
+            raise ValueError(f"Model version '{version}' not found (no {manifest_path})")
+        pipeline_path = os.path.join(directory, PIPELINE_PATH)
+        model_paths = {"npz_path": os.path.join(directory, NUMPY_WEIGHTS_PATH),
+                       "keras_path": os.path.join(directory, KERAS_MODEL_PATH)}
+
+    model_path = model_file(precision=precision, **model_paths)
+    thresholds_path = os.path.join(directory, THRESHOLDS_FILE) if version != LEGACY_VERSION else None
+    for path in [model_path, pipeline_path, thresholds_path]:
+        name = path and os.path.relpath(path, directory)
+        if manifest is not None and name in manifest:
+            verify_file(path, manifest[name], manifest_path)
+
+    thresholds = DEFAULT_THRESHOLDS
+    if thresholds_path is not None:
+        with open(thresholds_path, encoding="utf-8") as f:
+            thresholds = json.load(f)
+    bundle = ModelBundle(version, load_autoencoder(precision=precision, **model_paths), FeaturePipeline.load(pipeline_path),
+                         thresholds)
+    bundle.timings["load_s"] = time.perf_counter() - start
+    return bundle
+
+
+class ShadowScorer:
+    """Scores a candidate bundle on a copy of live traffic and tracks how its scores differ.
+
+    observe() only enqueues; a worker thread scores queued rows in batches with the candidate's
+    own IP frequencies and thresholds. When the queue is full rows are dropped (and counted),
+    so shadow scoring never slows down /login.
+    """
+
+    def __init__(self, bundle, max_queue=10000, batch_size=256):
+        self.bundle = bundle
+        self.batch_size = batch_size
+        self.abs_delta_histogram = Histogram(DELTA_BUCKETS)
+        self.observed = 0
+        self.dropped = 0
+        self.scored = 0
+        self.failed = 0
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.agreed = 0
+        self.decision_changes = {}  # "allow->mfa" -> count
+        self.rules = RuleEngine(RULES.config)  # Own copy, so shadow decisions stay out of the live rule hit counts
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name=f"shadow-{bundle.version}", daemon=True)
+        self._worker.start()
+
+    def observe(self, raw_row, ip_address, error_score, risk_score, has_changes, decision):
+        """Queues one scored login: the active model's raw feature row, error and decision."""
+        with self._lock:
+            self.observed += 1
+        try:
+            self._queue.put_nowait((raw_row, ip_address, error_score, risk_score, has_changes, decision))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._score(batch)
+            if item is None:
+                return
+
+    def _score(self, batch):
+        raw_rows, ips, errors, risk_scores, has_changes, decisions = zip(*batch)
+        raw = np.array(raw_rows, dtype=np.float64)
+        raw[:, IP_FREQUENCY_INDEX] = self.bundle.pipeline.ip_frequency_many(np.array(ips, dtype=object))
+        try:
+            shadow_errors = self.bundle.score(raw)
+        except Exception:
+            logging.exception(f"Shadow scoring with model {self.bundle.version} failed")
+            with self._lock:
+                self.failed += len(batch)
+            return
+        shadow_decisions, _, _ = decide_batch(shadow_errors, np.array(risk_scores), np.array(has_changes),
+                                              self.bundle.thresholds, rules=self.rules)
+        deltas = shadow_errors - np.array(errors, dtype=np.float64)
+        for delta in np.abs(deltas):
+            self.abs_delta_histogram.observe(float(delta))
+        with self._lock:
+            self.scored += len(batch)
+            self.delta_sum += float(deltas.sum())
+            self.abs_delta_sum += float(np.abs(deltas).sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(deltas).max()))
+            for active, shadow in zip(decisions, shadow_decisions):
+                if active == shadow:
+                    self.agreed += 1
+                else:
+                    key = f"{active}->{shadow}"
+                    self.decision_changes[key] = self.decision_changes.get(key, 0) + 1
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self):
+        with self._lock:
+            scored = self.scored
+            return {
+                "version": self.bundle.version,
+                "observed": self.observed,
+                "scored": scored,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "queued": self._queue.qsize(),
+                "mean_delta": self.delta_sum / scored if scored else 0.0,
+                "mean_abs_delta": self.abs_delta_sum / scored if scored else 0.0,
+                "max_abs_delta": self.max_abs_delta,
+                "abs_delta": self.abs_delta_histogram.snapshot(),
+                "decision_agreement": self.agreed / scored if scored else None,
+                "decision_changes": dict(self.decision_changes),
+            }
+
+
+class ModelRegistry:
+    """Serves the active ModelBundle and swaps in new versions without dropping requests.
+
+    A request reads `registry.active` once and uses that bundle throughout, so a swap (one
+    attribute assignment) never mixes two versions in one response. New versions are loaded,
+    verified and warmed in a background thread first; requests still holding the old bundle
+    finish with it. `prepare` is called on every bundle before it serves or shadows. Every
+    bundle scores with the `precision` export (default: AUTOENCODER_PRECISION).
+    """
+
+    def __init__(self, root=REGISTRY_ROOT, pipeline_path=PIPELINE_PATH, prepare=None, precision=None):
+        self.root = root
+        self.pipeline_path = pipeline_path
+        self.precision = precision
+        self.prepare = prepare
+        self.active = None
+        self.shadow = None
+        self.status = {"state": "idle"}
+        self.swaps = 0
+        self._load_lock = threading.Lock()  # One version is loaded at a time
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def configured_version(self):
+        return active_version(self.root) or LEGACY_VERSION
+
+    def load(self, version):
+        bundle = load_bundle(version, self.root, self.pipeline_path, self.precision)
+        if self.prepare is not None:
+            self.prepare(bundle)
+        bundle.warm()
+        return bundle
+
+    def start(self, bundle=None):
+        """Serves `bundle` (e.g. one attached from shared memory) or loads the configured version."""
+        self.active = bundle or self.load(self.configured_version())
+        self.status = {"state": "active", "version": self.active.version}
+        return self.active
+
+    def activate(self, version, persist=True):
+        """Loads and warms `version` in a background thread, then swaps it in; returns the thread.
+
+        With `persist`, models/ACTIVE is updated once the load succeeded, so other processes
+        watching the registry follow.
+        """
+        thread = threading.Thread(target=self._activate, args=(version, persist), name=f"model-load-{version}", daemon=True)
+        thread.start()
+        return thread
+
+    def _activate(self, version, persist):
+        with self._load_lock:
+            if self.active is not None and self.active.version == version:
+                return
+            self.status = {"state": "loading", "version": version}
+            try:
+                bundle = self.load(version)
+                if persist:
+                    set_active(version, self.root)
+            except Exception as e:
+                self.status = {"state": "failed", "version": version, "error": f"{type(e).__name__}: {e}"}
+                logging.exception(f"Loading model version {version} failed; still serving the previous one")
+                return
+            previous, self.active = self.active, bundle
+            self.swaps += 1
+            self.status = {"state": "active", "version": version}
+            logging.info(f"Model {previous.version if previous else None} -> {version} "
+                         f"(load {bundle.timings['load_s']:.2f} s, warm {bundle.timings['warm_s']:.2f} s)")
+
+    def watch(self, interval_s):
+        """Follows models/ACTIVE, so `model_registry.py activate` reaches every worker process."""
+        def run():
+            while not self._stop.wait(interval_s):
+                version = self.configured_version()
+                if self.active is None or version == self.active.version:
+                    continue
+                if self.status.get("state") == "failed" and self.status.get("version") == version:
+                    continue  # Don't retry a broken bundle until models/ACTIVE changes again
+                self._activate(version, persist=False)
+
+        self._watcher = threading.Thread(target=run, name="model-registry-watch", daemon=True)
+        self._watcher.start()
+
+    def start_shadow(self, version):
+        """Loads `version` in a background thread and shadow-scores live traffic with it; returns the thread."""
+        def run():
+            try:
+                scorer = ShadowScorer(self.load(version))
+            except Exception:
+                logging.exception(f"Loading shadow model {version} failed")
+                return
+            previous, self.shadow = self.shadow, scorer
+            if previous is not None:
+                previous.close()
+
+        thread = threading.Thread(target=run, name=f"shadow-load-{version}", daemon=True)
+        thread.start()
+        return thread
+
+    def stop_shadow(self):
+        previous, self.shadow = self.shadow, None
+        if previous is not None:
+            previous.close()
+
+    def describe(self):
+        return {
+            "active": self.active.describe() if self.active else None,
+            "shadow": self.shadow.bundle.version if self.shadow else None,
+            "configured": self.configured_version(),
+            "versions": list_versions(self.root),
+            "last_load": self.status,
+            "swaps": self.swaps,
+        }
+
+    def close(self):
+        self._stop.set()
+        self.stop_shadow()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish, list and activate versioned model bundles")
+    parser.add_argument("--root", default=REGISTRY_ROOT)
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="bundle the trained artifacts in --source")
+    publish.add_argument("--source", default=".")
+    publish.add_argument("--version")
+    publish.add_argument("--thresholds", help="JSON file overriding the default decision thresholds")
+    publish.add_argument("--activate", action="store_true")
+    commands.add_parser("list")
+    activate = commands.add_parser("activate", help=f"serve a version ('{LEGACY_VERSION}' for the top-level files)")
+    activate.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        thresholds = None
+        if args.thresholds:
+            with open(args.thresholds, encoding="utf-8") as f:
+                thresholds = json.load(f)
+        version = publish_bundle(args.source, args.version, thresholds, args.root, args.activate)
+        print(f"✅ Published model version {version}" + (" (active)" if args.activate else ""))
+    elif args.command == "list":
+        current = active_version(args.root) or LEGACY_VERSION
+        for version in [LEGACY_VERSION] + list_versions(args.root):
+            print(f"{'*' if version == current else ' '} {version}")
+    else:
+        load_bundle(args.version, args.root)  # Refuse to point servers at a bundle that doesn't load
+        set_active(args.version, args.root)
+        print(f"✅ Model version {args.version} is now active; servers swap it in within MODEL_REGISTRY_POLL_S")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+
+KERAS_MODEL_PATH = "autoencoder_model.keras"
+NUMPY_WEIGHTS_PATH = "autoencoder_weights.npz"
+# float16 / int8 load the post-training quantized export next to the .npz (see quantized_autoencoder.py)
+PRECISIONS = ("float32", "float16", "int8")
+AUTOENCODER_PRECISION = os.environ.get("AUTOENCODER_PRECISION", "float32")
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0, out=x),
+    "sigmoid": lambda x: 0.5 * (1.0 + np.tanh(0.5 * x)),  # Overflow-free form of 1 / (1 + e^-x)
+}
+
+
+def export_weights(keras_path=KERAS_MODEL_PATH, npz_path=NUMPY_WEIGHTS_PATH):
+    """Writes the Dense kernels, biases and activations of a Keras model to a .npz file.
+
+    Quantized exports of the previous weights next to it are removed (see quantized_autoencoder.export_quantized).
+    """
+    import tensorflow as tf  # Only the export step needs TensorFlow
+
+    model = tf.keras.models.load_model(keras_path)
+    arrays = {}
+    activations = []
+    dense_layers = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+    for i, layer in enumerate(dense_layers):
+        kernel, bias = layer.get_weights()
+        activation = layer.get_config()["activation"]
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation '{activation}' in layer {layer.name}")
+        arrays[f"kernel_{i}"] = kernel.astype(np.float32)
+        arrays[f"bias_{i}"] = bias.astype(np.float32)
+        activations.append(activation)
+    np.savez_compressed(npz_path, activations=np.array(activations), **arrays)
+    for precision in PRECISIONS[1:]:
+        if os.path.exists(quantized_weights_path(npz_path, precision)):
+            os.remove(quantized_weights_path(npz_path, precision))
+    return npz_path
+
+
+class NumpyAutoencoder:
+    """NumPy-only forward pass over the exported Dense stack (drop-in for model.predict)."""
+
+    def __init__(self, kernels, biases, activations):
+        self.kernels = [np.ascontiguousarray(k, dtype=np.float32) for k in kernels]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [str(a) for a in activations]
+        self._activation_fns = [ACTIVATIONS[a] for a in self.activations]
+
+    @classmethod
+    def load(cls, npz_path=NUMPY_WEIGHTS_PATH):
+        with np.load(npz_path) as weights:
+            activations = list(weights["activations"])
+            kernels = [weights[f"kernel_{i}"] for i in range(len(activations))]
+            biases = [weights[f"bias_{i}"] for i in range(len(activations))]
+        return cls(kernels, biases, activations)
+
+    def predict(self, x, verbose=0):
+        # Matches Keras: inputs are cast to float32 and every layer runs in float32
+        out = np.asarray(x, dtype=np.float32)
+        if out.ndim == 1:
+            out = out.reshape(1, -1)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self._activation_fns):
+            out = activation(out @ kernel + bias)
+        return out
+
+
+def quantized_weights_path(npz_path=NUMPY_WEIGHTS_PATH, precision="int8"):
+    """autoencoder_weights.npz -> autoencoder_weights_int8.npz"""
+    return f"{os.path.splitext(npz_path)[0]}_{precision}.npz"
+
+
+def model_file(keras_path=KERAS_MODEL_PATH, npz_path=NUMPY_WEIGHTS_PATH, precision=None):
+    """The file load_autoencoder() reads for `precision` (default: AUTOENCODER_PRECISION)."""
+    precision = precision or AUTOENCODER_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}' (expected one of {', '.join(PRECISIONS)})")
+    if precision != "float32":
+        return quantized_weights_path(npz_path, precision)
+    return npz_path if os.path.exists(npz_path) else keras_path
+
+
+def load_autoencoder(keras_path=KERAS_MODEL_PATH, npz_path=NUMPY_WEIGHTS_PATH, precision=None):
+    """Loads the NumPy runtime when exported weights exist, otherwise falls back to Keras.
+
+    float16 / int8 load the quantized export instead; it must exist (`python quantized_autoencoder.py`)
+    and have been quantized from the current npz_path.
+    """
+    path = model_file(keras_path, npz_path, precision)
+    if path not in (npz_path, keras_path):
+        if not os.path.exists(path):
+            raise ValueError(f"No {path}; run `python quantized_autoencoder.py` to calibrate and export it")
+        from quantized_autoencoder import QuantizedAutoencoder
+        return QuantizedAutoencoder.load(path, source_path=npz_path)
+    if path == npz_path:
+        return NumpyAutoencoder.load(npz_path)
+    import tensorflow as tf
+    return tf.keras.models.load_model(keras_path)
+
+
+if __name__ == "__main__":
+    from artifacts import write_manifest
+
+    export_weights()
+    write_manifest()
+    print(f"✅ Exported {KERAS_MODEL_PATH} weights to {NUMPY_WEIGHTS_PATH}")
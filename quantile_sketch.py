@@ -0,0 +1,333 @@
+import argparse
+import glob
+import math
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+SKETCH_DIR = "score_sketches"  # <dir>/<model version>/<process or job>.npz
+DEFAULT_K = 200  # ~1.65% rank error at 99% confidence
+DEFAULT_QUANTILES = {"anomaly_threshold": 0.95}  # threshold name -> quantile of the reconstruction error
+REPORT_QUANTILES = [0.5, 0.9, 0.95, 0.99, 0.999]
+_CAPACITY_RATIO = 2 / 3
+
+
+class KLLSketch:
+    """Mergeable streaming quantiles of a stream of floats (KLL sketch).
+
+    Values are buffered, then kept in a stack of levels where an item at level h stands for 2**h
+    values. A level that outgrows its capacity is sorted and every other item (random offset) is
+    promoted to the next level; capacities shrink by 2/3 per level below the top one, so the
+    sketch holds O(k) items however many values it has seen. Any quantile's rank is within
+    about 1.65% of the exact one at k=200 with 99% confidence (error falls as 1/k).
+
+    merge() adds another sketch level by level and compacts, which keeps the same guarantee as
+    one sketch fed both streams: per-worker and per-partition sketches combine into one.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []  # Raw values not yet in level 0; cheap single-value updates
+        self.metadata = {}  # Read back from a snapshot by load()
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def _capacity(self, level):
+        return max(2, math.ceil(self.k * _CAPACITY_RATIO ** (len(self.levels) - 1 - level)))
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                kept = items[len(items) - len(items) % 2:]  # An odd item out stays behind
+                promoted = items[self._rng.integers(2):len(items) - len(kept):2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def _flush_buffer(self):
+        if self._buffer:
+            self.levels[0] = np.concatenate([self.levels[0], self._buffer])
+            self._buffer = []
+            self._compact()
+
+    def update(self, value):
+        value = float(value)
+        with self._lock:
+            self._buffer.append(value)
+            self.count += 1
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+            if len(self._buffer) >= self.k:
+                self._flush_buffer()
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        with self._lock:
+            self._flush_buffer()
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += len(values)
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compact()
+
+    def merge(self, other):
+        """Adds `other` (a KLLSketch) into this sketch."""
+        with other._lock:
+            levels = [np.concatenate([other.levels[0], other._buffer])] + list(other.levels[1:])
+            count, low, high = other.count, other.min, other.max
+        with self._lock:
+            self._flush_buffer()
+            while len(self.levels) < len(levels):
+                self.levels.append(np.empty(0))
+            for level, items in enumerate(levels):
+                self.levels[level] = np.concatenate([self.levels[level], items])
+            self.count += count
+            self.min = min(self.min, low)
+            self.max = max(self.max, high)
+            self._compact()
+        return self
+
+    def _sorted_items(self):
+        """Retained items in ascending order with the cumulative weight up to each."""
+        with self._lock:
+            levels = [np.asarray(self._buffer, dtype=np.float64)] + list(self.levels)
+        weights = [np.ones(len(levels[0]))] + [np.full(len(items), 2.0 ** h) for h, items in enumerate(levels[1:])]
+        items, weights = np.concatenate(levels), np.concatenate(weights)
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """Approximate values at quantiles qs (each in [0, 1]); NaN while the sketch is empty."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items, cumulative = self._sorted_items()
+        index = np.minimum(np.searchsorted(cumulative, qs * cumulative[-1], side="left"), len(items) - 1)
+        values = items[index]
+        values = np.where(qs <= 0.0, self.min, values)
+        return np.where(qs >= 1.0, self.max, values)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def rank(self, value):
+        """Approximate fraction of values <= value."""
+        if self.count == 0:
+            return math.nan
+        items, cumulative = self._sorted_items()
+        index = np.searchsorted(items, value, side="right")
+        return float(cumulative[index - 1] / cumulative[-1]) if index else 0.0
+
+    @property
+    def retained(self):
+        return len(self._buffer) + sum(len(level) for level in self.levels)
+
+    def save(self, path, **metadata):
+        """Writes an uncompressed .npz snapshot atomically; metadata values are stored as strings."""
+        with self._lock:
+            levels = [np.concatenate([self.levels[0], self._buffer])] + list(self.levels[1:])
+            arrays = dict(
+                items=np.concatenate(levels), level_sizes=np.array([len(level) for level in levels]),
+                k=self.k, count=self.count, min=self.min, max=self.max,
+                **{f"meta_{key}": np.array(str(value)) for key, value in metadata.items()},
+            )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            sketch = cls(k=int(data["k"]))
+            sketch.levels = np.split(data["items"], np.cumsum(data["level_sizes"])[:-1])
+            sketch.count = int(data["count"])
+            sketch.min, sketch.max = float(data["min"]), float(data["max"])
+            sketch.metadata = {name[5:]: str(data[name]) for name in data.files if name.startswith("meta_")}
+        return sketch
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "k": self.k,
+            "retained": self.retained,
+            "levels": len(self.levels),
+            "memory_bytes": self.retained * 8,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "quantiles": {str(q): float(v) for q, v in zip(REPORT_QUANTILES, self.quantiles(REPORT_QUANTILES))}
+            if self.count else {},
+        }
+
+
+def parse_quantiles(spec):
+    """"anomaly_threshold=0.95,behavioral_allow_below=0.9" -> {threshold name: quantile}."""
+    quantiles = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, q = item.partition("=")
+        q = float(q)
+        if not 0.0 < q < 1.0:
+            raise ValueError(f"{name}: quantile must be between 0 and 1, got {q}")
+        quantiles[name.strip()] = q
+    return quantiles
+
+
+def merged_sketch(directory, version, k=DEFAULT_K, exclude=()):
+    """One sketch merged from every snapshot of `version` under directory; returns (sketch, files merged)."""
+    sketch = KLLSketch(k)
+    paths = [path for path in sorted(glob.glob(os.path.join(directory, str(version), "*.npz"))) if path not in exclude]
+    for path in paths:
+        sketch.merge(KLLSketch.load(path))
+    return sketch, len(paths)
+
+
+class ScoreCalibrator:
+    """Streaming distribution of one model version's reconstruction errors, and thresholds taken from it.
+
+    Each process or batch job feeds its own sketch (observe / observe_many) and snapshots it to
+    <directory>/<version>/<name>.npz; calibrate() merges it with every other snapshot of that
+    version (other workers, hosts sharing the directory, batch jobs, earlier runs) and maps each
+    configured threshold to its error quantile. A new model version starts a new sketch.
+    """
+
+    def __init__(self, directory=SKETCH_DIR, quantiles=None, k=DEFAULT_K, name=None):
+        self.directory = directory
+        self.quantiles = dict(DEFAULT_QUANTILES if quantiles is None else quantiles)
+        self.k = k
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.version = None
+        self.sketch = KLLSketch(k)
+        self.thresholds = {}  # Result of the last calibrate()
+        self.calibrated_count = 0
+        self.calibrated_sources = 0
+        self.calibrated_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def path(self, version=None):
+        return os.path.join(self.directory, str(self.version if version is None else version), f"{self.name}.npz")
+
+    def _switch(self, version):
+        with self._lock:
+            if version != self.version:
+                self.save()  # The previous version's sketch stays on disk for its own calibrations
+                self.version = version
+                self.sketch = KLLSketch(self.k)
+                self.thresholds = {}
+
+    def observe(self, version, error):
+        if version != self.version:
+            self._switch(version)
+        self.sketch.update(error)
+
+    def observe_many(self, version, errors):
+        if version != self.version:
+            self._switch(version)
+        self.sketch.update_many(errors)
+
+    def save(self):
+        if self.version is None or self.sketch.count == 0:
+            return
+        os.makedirs(os.path.dirname(self.path()), exist_ok=True)
+        self.sketch.save(self.path(), version=self.version, name=self.name)
+
+    def calibrate(self, min_count=0):
+        """{threshold name: quantile value} over all snapshots of the current version, or None below min_count."""
+        version, local = self.version, self.sketch
+        if version is None:
+            return None
+        merged, sources = merged_sketch(self.directory, version, self.k, exclude={self.path(version)})
+        merged.merge(local)
+        if merged.count < max(1, min_count):
+            return None
+        values = merged.quantiles(list(self.quantiles.values()))
+        self.thresholds = {name: float(value) for name, value in zip(self.quantiles, values)}
+        self.calibrated_count, self.calibrated_sources, self.calibrated_at = merged.count, sources + 1, time.time()
+        return self.thresholds
+
+    def start(self, snapshot_s=60, calibrate_s=0, apply=None, min_count=0):
+        """Saves a snapshot every snapshot_s seconds; with calibrate_s > 0 also recalibrates on that
+        schedule and passes (version, thresholds) to apply()."""
+        def run():
+            last_calibration = time.monotonic()
+            while not self._stop.wait(snapshot_s):
+                self.save()
+                if calibrate_s > 0 and time.monotonic() - last_calibration >= calibrate_s:
+                    last_calibration = time.monotonic()
+                    version, thresholds = self.version, self.calibrate(min_count)
+                    if thresholds and apply is not None:
+                        apply(version, thresholds)
+
+        self._thread = threading.Thread(target=run, name="score-calibrator", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stops the background thread and writes a final snapshot."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.save()
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "name": self.name,
+            "quantiles": self.quantiles,
+            "local": self.sketch.stats(),
+            "thresholds": self.thresholds,
+            "calibrated_count": self.calibrated_count,
+            "calibrated_sources": self.calibrated_sources,
+            "calibrated_at": self.calibrated_at,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merged reconstruction-error quantiles from the score sketches")
+    parser.add_argument("version", nargs="?", help="model version (default: every version in the directory)")
+    parser.add_argument("--dir", default=SKETCH_DIR)
+    parser.add_argument("--quantiles", default=",".join(f"{name}={q}" for name, q in DEFAULT_QUANTILES.items()),
+                        help="threshold=quantile pairs to calibrate, e.g. anomaly_threshold=0.95,behavioral_block_from=0.999")
+    parser.add_argument("--output", help="also write the merged sketch to this .npz")
+    args = parser.parse_args()
+
+    quantiles = parse_quantiles(args.quantiles)
+    versions = [args.version] if args.version else sorted(
+        name for name in os.listdir(args.dir) if os.path.isdir(os.path.join(args.dir, name)))
+    for version in versions:
+        sketch, sources = merged_sketch(args.dir, version)
+        if sketch.count == 0:
+            print(f"⚠️ No score sketches for model version {version} in {args.dir}")
+            continue
+        print(f"{version}: {sketch.count:,} scores from {sources} sketch(es), {sketch.retained:,} items kept")
+        for q, value in zip(REPORT_QUANTILES, sketch.quantiles(REPORT_QUANTILES)):
+            print(f"  p{q * 100:<6g} {value:.6f}")
+        for name, q in quantiles.items():
+            print(f"  {name} = {sketch.quantile(q):.6f} (p{q * 100:g})")
+        if args.output:
+            sketch.save(args.output, version=version)
+            print(f"✅ Merged sketch written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from numpy_autoencoder import NumpyAutoencoder, KERAS_MODEL_PATH, NUMPY_WEIGHTS_PATH, quantized_weights_path
+
+# Post-training float16 / int8 versions of the exported autoencoder, e.g.
+#   python quantized_autoencoder.py                  # calibrate, write both exports, print the accuracy report
+#   AUTOENCODER_PRECISION=int8 python app.py         # serve (or score offline) with the int8 export
+#   python score_batch.py logins.csv --precision int8
+# NumPy has no fast float16 or int8 matrix multiply (float16 is emulated, integer matmul skips
+# BLAS; both are over 10x slower than float32), so every precision multiplies in float32 BLAS.
+# float16 weights are widened once at load. int8 layers multiply the int8 codes held in float32,
+# which is exact: |sum| <= 127 * 127 * inputs stays below 2**24, so the result is what an
+# int8 x int8 -> int32 kernel computes. Rows run in chunks through preallocated buffers with
+# in-place bias and activation, which is where the batch speed-up comes from.
+# Every export records the SHA-256 of the float32 .npz it came from, and load() refuses it once
+# that file changes, so a retrained model never runs with the previous model's quantized weights.
+
+CALIBRATION_SOURCE = "augmented_login_data_v4"
+CHUNK_ROWS = 4096  # Rows per pass; keeps every layer's buffer in cache
+INT8_MAX = 127
+UINT8_MAX = 255
+EXACT_ACCUMULATION_LIMIT = 2 ** 24  # Largest integer range float32 holds exactly
+
+
+def _linear(x):
+    return x
+
+
+def _relu(x):
+    return np.maximum(x, 0.0, out=x)
+
+
+def _sigmoid(x):
+    # 1 / (1 + e^-x) as 0.5 * (1 + tanh(x / 2)), in place
+    x *= 0.5
+    np.tanh(x, out=x)
+    x += 1.0
+    x *= 0.5
+    return x
+
+
+IN_PLACE_ACTIVATIONS = {"linear": _linear, "relu": _relu, "sigmoid": _sigmoid}
+
+
+def quantize_kernel(kernel):
+    """Symmetric per-output-channel int8 codes and scales, kernel ~= codes * scales."""
+    scales = np.abs(kernel).max(axis=0) / INT8_MAX
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(kernel / scales), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return codes, scales
+
+
+def layer_input_ranges(model, rows, percentile=100.0):
+    """Per-layer percentile of |input| over calibration rows, from the float32 forward pass."""
+    ranges = []
+    out = np.asarray(rows, dtype=np.float32)
+    for kernel, bias, activation in zip(model.kernels, model.biases, model._activation_fns):
+        ranges.append(float(np.percentile(np.abs(out), percentile)))
+        out = activation(out @ kernel + bias)
+    return ranges
+
+
+def unsigned_inputs(activations):
+    """Layers whose input comes out of a ReLU and so is never negative: those use 0..255 codes."""
+    return np.array([False] + [activation == "relu" for activation in activations[:-1]])
+
+
+class QuantizedAutoencoder:
+    """Quantized Dense stack (drop-in for model.predict).
+
+    float16: kernels and biases rounded to float16 (weight-only; activations stay float32).
+    int8:    per-output-channel symmetric int8 kernels; each layer's input is quantized to 8 bits
+             (uint8 after a ReLU, int8 for the raw features) with a per-tensor
+             scale calibrated on training rows, so values beyond the calibrated range clip. Products
+             are accumulated exactly and rescaled to float32 for bias and activation.
+    """
+
+    def __init__(self, precision, kernels, biases, activations, kernel_scales=None, input_scales=None,
+                 input_unsigned=None, calibration=None, source_sha256=None):
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unsupported precision '{precision}' (expected float16 or int8)")
+        self.precision = precision
+        self.kernels = list(kernels)  # Stored form (float16 or int8)
+        self.biases = list(biases)
+        self.activations = [str(a) for a in activations]
+        self.kernel_scales = kernel_scales
+        self.input_scales = input_scales
+        self.input_unsigned = input_unsigned
+        self.calibration = calibration or {}
+        self.source_sha256 = source_sha256  # Of the float32 export these weights were quantized from
+        self._activation_fns = [IN_PLACE_ACTIVATIONS[a] for a in self.activations]
+        self._kernels = [np.ascontiguousarray(k, dtype=np.float32) for k in self.kernels]
+        self._biases = [np.asarray(b, dtype=np.float32) for b in self.biases]
+        if precision == "int8":
+            for kernel in self.kernels:
+                if kernel.shape[0] * UINT8_MAX * INT8_MAX >= EXACT_ACCUMULATION_LIMIT:
+                    raise ValueError(f"A {kernel.shape[0]}-input layer cannot accumulate 8-bit products exactly in float32")
+            self._inverse_input_scales = [np.float32(1.0 / s) for s in input_scales]
+            self._code_ranges = [(0, UINT8_MAX) if unsigned else (-INT8_MAX, INT8_MAX) for unsigned in input_unsigned]
+            self._output_scales = [np.asarray(s_in * s_w, dtype=np.float32) for s_in, s_w in zip(input_scales, kernel_scales)]
+
+    @classmethod
+    def quantize(cls, model, precision, calibration_rows=None, percentile=100.0, source=None, source_sha256=None):
+        """From a float32 NumpyAutoencoder; int8 needs scaled calibration rows for the activation scales."""
+        if precision == "float16":
+            return cls("float16", [k.astype(np.float16) for k in model.kernels],
+                       [b.astype(np.float16) for b in model.biases], model.activations, source_sha256=source_sha256)
+        if calibration_rows is None:
+            raise ValueError("int8 quantization needs calibration rows")
+        ranges = layer_input_ranges(model, calibration_rows, percentile)
+        input_unsigned = unsigned_inputs(model.activations)
+        input_scales = np.array([(limit / (UINT8_MAX if unsigned else INT8_MAX)) if limit > 0 else 1.0
+                                 for limit, unsigned in zip(ranges, input_unsigned)], dtype=np.float32)
+        codes, kernel_scales = zip(*(quantize_kernel(kernel) for kernel in model.kernels))
+        calibration = {"source": source or "", "rows": len(calibration_rows), "percentile": percentile}
+        return cls("int8", codes, model.biases, model.activations, list(kernel_scales), input_scales, input_unsigned,
+                   calibration, source_sha256)
+
+    @classmethod
+    def load(cls, path, source_path=None):
+        """Loads an export; with `source_path` (the float32 .npz) it must have been quantized from that file."""
+        with np.load(path, allow_pickle=False) as data:
+            source_sha256 = str(data["source_sha256"]) if "source_sha256" in data.files else None
+            precision = str(data["precision"])
+            activations = list(data["activations"])
+            layers = range(len(activations))
+            kernels = [data[f"kernel_{i}"] for i in layers]
+            biases = [data[f"bias_{i}"] for i in layers]
+            kernel_scales = input_scales = input_unsigned = None
+            calibration = {}
+            if precision == "int8":
+                kernel_scales = [data[f"kernel_scale_{i}"] for i in layers]
+                input_scales = data["input_scales"]
+                input_unsigned = data["input_unsigned"]
+                calibration = {"source": str(data["calibration_source"]), "rows": int(data["calibration_rows"]),
+                               "percentile": float(data["calibration_percentile"])}
+        if source_path is not None and os.path.exists(source_path):
+            from artifacts import file_sha256
+
+            if source_sha256 != file_sha256(source_path):
+                raise ValueError(f"{path} was not quantized from the current {source_path}; "
+                                 f"run `python quantized_autoencoder.py` to re-export it")
+        return cls(precision, kernels, biases, activations, kernel_scales, input_scales, input_unsigned, calibration,
+                   source_sha256)
+
+    def save(self, path):
+        arrays = {"precision": np.array(self.precision), "activations": np.array(self.activations)}
+        if self.source_sha256:
+            arrays["source_sha256"] = np.array(self.source_sha256)
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+        if self.precision == "int8":
+            for i, scales in enumerate(self.kernel_scales):
+                arrays[f"kernel_scale_{i}"] = scales
+            arrays["input_scales"] = self.input_scales
+            arrays["input_unsigned"] = self.input_unsigned
+            arrays["calibration_source"] = np.array(self.calibration["source"])
+            arrays["calibration_rows"] = self.calibration["rows"]
+            arrays["calibration_percentile"] = self.calibration["percentile"]
+        np.savez_compressed(path, **arrays)
+        return path
+
+    @property
+    def nbytes(self):
+        return sum(k.nbytes for k in self.kernels) + sum(np.asarray(b).nbytes for b in self.biases)
+
+    def _forward(self, rows, out, buffers):
+        x = rows
+        last = len(self._kernels) - 1
+        for i, (kernel, bias, activation) in enumerate(zip(self._kernels, self._biases, self._activation_fns)):
+            dest = out if i == last else buffers[i][:len(rows)]
+            if self.precision == "int8":
+                codes = buffers[last + i][:len(rows)]
+                np.multiply(x, self._inverse_input_scales[i], out=codes)
+                np.rint(codes, out=codes)
+                np.clip(codes, *self._code_ranges[i], out=codes)
+                np.matmul(codes, kernel, out=dest)
+                dest *= self._output_scales[i]
+            else:
+                np.matmul(x, kernel, out=dest)
+            dest += bias
+            x = activation(dest)
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        out = np.empty((len(x), self._kernels[-1].shape[1]), dtype=np.float32)
+        chunk = min(len(x), CHUNK_ROWS)
+        # Per call, so concurrent callers (micro-batcher, shadow scoring) never share buffers
+        buffers = [np.empty((chunk, k.shape[1]), dtype=np.float32) for k in self._kernels[:-1]]
+        if self.precision == "int8":
+            buffers += [np.empty((chunk, k.shape[0]), dtype=np.float32) for k in self._kernels]
+        for start in range(0, len(x), CHUNK_ROWS):
+            self._forward(x[start:start + CHUNK_ROWS], out[start:start + CHUNK_ROWS], buffers)
+        return out
+
+
+def export_quantized(npz_path, calibration_rows, source="", percentile=100.0, precisions=("float16", "int8")):
+    """Quantizes the float32 export at npz_path and writes the exports next to it; run after every export_weights()."""
+    from artifacts import file_sha256
+
+    model = NumpyAutoencoder.load(npz_path)
+    source_sha256 = file_sha256(npz_path)
+    quantized = {}
+    for precision in precisions:
+        quantized[precision] = QuantizedAutoencoder.quantize(model, precision, calibration_rows, percentile, source,
+                                                             source_sha256)
+        quantized[precision].save(quantized_weights_path(npz_path, precision))
+    return quantized
+
+
+def training_rows(pipeline, source=CALIBRATION_SOURCE):
+    """Scaled feature rows of a login dataset, derived like train_autoencoder.preprocess()."""
+    from dataset_store import load_dataset, LOGIN_COLUMNS
+    from geo_features import compute_geo_velocity
+
+    df = load_dataset(source, columns=LOGIN_COLUMNS).sort_values(by=["user_id", "login_time"])
+    df = df.join(compute_geo_velocity(df, method="ellipsoidal")).dropna()
+    return pipeline.transform_rows(pipeline.feature_frame(df).to_numpy())
+
+
+def synthetic_logins(pipeline, users, seed=42):
+    """(scaled rows, risk_score, has_changes, blocked) for generated logins, scored like /login."""
+    from geo_features import compute_geo_velocity
+    from login_generator import generate_users, parse_scenarios, DEFAULT_SCENARIOS
+    from risk_scoring import RULES
+    from rule_engine import RuleEngine
+
+    df = generate_users(1, users, np.random.default_rng(seed), parse_scenarios(DEFAULT_SCENARIOS))
+    df = df.join(compute_geo_velocity(df, method="haversine"))
+    current = df[["user_id"] + RULES.change_fields].astype(
+        {field: object for field in ["ip_address", "device_info", "timezone"]})
+    previous = current.groupby("user_id")[RULES.change_fields].shift(1)
+    rules = RuleEngine(RULES.config)  # Own copy, so the report stays out of the live rule hit counts
+    risk_score, flags = rules.changes(previous, current)
+    blocked, _, _ = rules.block({"geo_velocity": df["geo_velocity"]})
+    rows = pipeline.transform_rows(pipeline.feature_frame(df).to_numpy())
+    return rows, risk_score, flags.any(axis=1), blocked
+
+
+def time_per_row(model, rows, repeats=3):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(rows, verbose=0)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6
+
+
+def time_per_call(model, row, repeats=2000):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(row, verbose=0)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def report(reference, models, datasets, thresholds):
+    """Errors and decisions of each model against the float32 Keras reference, plus speed."""
+    from risk_scoring import RULES
+    from rule_engine import RuleEngine
+
+    rules = RuleEngine(RULES.config)
+    for name, (rows, risk_score, has_changes, blocked) in datasets.items():
+        expected = np.mean(np.abs(rows - reference.predict(rows, verbose=0)), axis=1)
+        expected_decision, _, _ = rules.decide(expected, risk_score, has_changes, thresholds)
+        expected_decision = np.where(blocked, "block", expected_decision)
+        print(f"\n{name}: {len(rows):,} rows; float32 Keras reference error mean {expected.mean():.5f}, "
+              f"p95 {np.percentile(expected, 95):.5f}")
+        print(f"  {'precision':10s} {'max |Δerr|':>11s} {'mean |Δerr|':>12s} {'p99 |Δerr|':>11s} "
+              f"{'max rel':>8s} {'decisions':>10s}  changed")
+        for precision, model in models.items():
+            errors = np.mean(np.abs(rows - model.predict(rows, verbose=0)), axis=1)
+            delta = np.abs(errors - expected)
+            decision, _, _ = rules.decide(errors, risk_score, has_changes, thresholds)
+            decision = np.where(blocked, "block", decision)
+            changed = decision != expected_decision
+            transitions = {}
+            for before, after in zip(expected_decision[changed], decision[changed]):
+                transitions[f"{before}->{after}"] = transitions.get(f"{before}->{after}", 0) + 1
+            print(f"  {precision:10s} {delta.max():11.2e} {delta.mean():12.2e} {np.percentile(delta, 99):11.2e} "
+                  f"{np.max(delta / np.maximum(expected, 1e-12)):8.2%} {1 - changed.mean():10.4%}  "
+                  f"{', '.join(f'{k} {v}' for k, v in sorted(transitions.items())) or '-'}")
+
+    rows = max((dataset[0] for dataset in datasets.values()), key=len)
+    print(f"\nspeed on {len(rows):,} rows (Keras: one run, others: best of 3) and one row at a time")
+    print(f"  {'precision':10s} {'us/row batch':>13s} {'us/call (1 row)':>16s} {'weights':>9s}")
+    for precision, model in {"keras": reference, **models}.items():
+        single_repeats = 50 if precision == "keras" else 2000
+        weights = f"{model.nbytes:,} B" if hasattr(model, "nbytes") else \
+            f"{sum(k.nbytes + b.nbytes for k, b in zip(model.kernels, model.biases)):,} B" if hasattr(model, "kernels") else "-"
+        batch_us = time_per_row(model, rows, repeats=1 if precision == "keras" else 3)
+        print(f"  {precision:10s} {batch_us:13.3f} {time_per_call(model, rows[:1], single_repeats):16.1f} "
+              f"{weights:>9s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate and export float16 / int8 autoencoders and report their accuracy")
+    parser.add_argument("--dir", default=".", help="directory with the float32 export (and where the exports go)")
+    parser.add_argument("--source", default=CALIBRATION_SOURCE, help="calibration dataset (training data)")
+    parser.add_argument("--percentile", type=float, default=100.0,
+                        help="percentile of |activation| mapped to the int8 range (lower clips outliers)")
+    parser.add_argument("--precision", choices=["float16", "int8"], action="append", help="default: both")
+    parser.add_argument("--synthetic-users", type=int, default=20_000, help="generated users in the report (0 = none)")
+    parser.add_argument("--no-report", action="store_true")
+    args = parser.parse_args()
+
+    from feature_pipeline import FeaturePipeline, PIPELINE_PATH
+
+    npz_path = os.path.join(args.dir, NUMPY_WEIGHTS_PATH)
+    model = NumpyAutoencoder.load(npz_path)
+    pipeline = FeaturePipeline.load(os.path.join(args.dir, PIPELINE_PATH))
+    calibration_rows = training_rows(pipeline, args.source)
+    quantized = export_quantized(npz_path, calibration_rows, args.source, args.percentile,
+                                 args.precision or ["float16", "int8"])
+    for precision, exported in quantized.items():
+        print(f"✅ {precision}: {quantized_weights_path(npz_path, precision)} ({exported.nbytes:,} bytes of weights)")
+    if args.dir == ".":
+        from artifacts import write_manifest
+
+        write_manifest()
+    if args.no_report:
+        return
+
+    import tensorflow as tf
+
+    reference = tf.keras.models.load_model(os.path.join(args.dir, KERAS_MODEL_PATH))
+    from risk_scoring import DEFAULT_THRESHOLDS
+
+    empty = np.zeros(len(calibration_rows))
+    # The calibration set has no decision context; scored as first logins (no changes, nothing blocked)
+    datasets = {f"{args.source} (calibration)": (calibration_rows, empty, empty.astype(bool), empty.astype(bool))}
+    if args.synthetic_users:
+        datasets[f"{args.synthetic_users:,} synthetic users"] = synthetic_logins(pipeline, args.synthetic_users)
+    report(reference, {"float32": model, **quantized}, datasets, DEFAULT_THRESHOLDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+from datetime import datetime
+from geo_features import haversine_km
+from rule_engine import RuleEngine
+
+# Rule-based scoring and decision logic shared by every /login entry point and batch scoring.
+# The rules themselves are declared in risk_rules.json (RISK_RULES_PATH) and evaluated by RULES.
+RULES = RuleEngine.load()
+CHANGE_LABELS = RULES.change_labels
+
+# Decision ladder of decide(); every model bundle ships its own copy in thresholds.json
+DEFAULT_THRESHOLDS = {
+    "anomaly_threshold": 0.5,  # Reported as is_anomalous; not used by the decision
+    "behavioral_block_below": 0.101,  # No changes: errors this low look scripted/replayed
+    "behavioral_allow_below": 0.15,
+    "behavioral_block_from": 0.18,
+    "rules_mfa_from": 3,  # With changes: autoencoder error + rule-based risk
+    "rules_block_from": 8,
+}
+
+
+def parse_login_request(data, login_time=None):
+    """Normalizes a /login JSON payload into the fields the scorer uses."""
+    login_time = login_time or datetime.utcnow()
+    return {
+        "user_id": data.get("user_id", "Unknown"),
+        "ip_address": data.get("ip_address", "0.0.0.0"),
+        "latitude": float(data.get("latitude", 0.0)),
+        "longitude": float(data.get("longitude", 0.0)),
+        "timezone": data.get("timezone", "UTC"),
+        "device_info": data.get("device_info", "Unknown"),
+        "typing_speed": max(0.0, float(data.get("typing_speed", 0.0))),
+        "mouse_speed": max(0.0, float(data.get("mouse_speed", 0.0))),
+        "login_time": login_time,
+        "login_hour": login_time.hour,
+    }
+
+
+def geo_velocity_since(last_attempt, latitude, longitude, login_time):
+    """Travel speed in km/h from the previous login; 0 when there is none."""
+    geo_velocity = 0
+    if last_attempt is not None and last_attempt.latitude is not None and last_attempt.longitude is not None \
+            and last_attempt.login_time is not None:
+        distance = haversine_km(last_attempt.latitude, last_attempt.longitude, latitude, longitude)
+        time_diff = (login_time - last_attempt.login_time).total_seconds() / 3600  # in hours
+        if time_diff > 0:
+            geo_velocity = distance / time_diff
+    return geo_velocity
+
+
+def rule_based_risk(last_attempt, ip_address, device_info, timezone, latitude, longitude):
+    """Returns (risk_score, [change labels]) against the previous login (by default +2 IP, +3 device,
+    +3 timezone, +5 location)."""
+    current = dict(ip_address=ip_address, device_info=device_info, timezone=timezone, latitude=latitude, longitude=longitude)
+    return RULES.changes_one(last_attempt, current)
+
+
+def decide(error_score, risk_score, changes, thresholds=DEFAULT_THRESHOLDS):
+    """Returns (risk_decision, reason, total_risk_score)."""
+    return RULES.decide_one(error_score, risk_score, changes, thresholds)
+
+
+# Vectorized equivalents of rule_based_risk() and decide() for batch scoring
+def rule_based_risk_batch(prev_ip, prev_device, prev_timezone, prev_latitude, prev_longitude,
+                          ip_address, device_info, timezone, latitude, longitude, rules=RULES):
+    """Returns (risk_score, change_flags) where change_flags is an (n, rules) bool array in CHANGE_LABELS order."""
+    previous = dict(ip_address=prev_ip, device_info=prev_device, timezone=prev_timezone,
+                    latitude=prev_latitude, longitude=prev_longitude)
+    current = dict(ip_address=ip_address, device_info=device_info, timezone=timezone, latitude=latitude, longitude=longitude)
+    return rules.changes(previous, current)
+
+
+def decide_batch(error_score, risk_score, has_changes, thresholds=DEFAULT_THRESHOLDS, rules=RULES):
+    """Returns (risk_decision, reason, total_risk_score) arrays with the same ladders as decide()."""
+    return rules.decide(error_score, risk_score, has_changes, thresholds)
+
+
+def blocked_response(reason, geo_velocity):
+    return {
+        "status": "block",
+        "reason": reason,
+        "geo_velocity": geo_velocity
+    }, 403
+
+
+def login_response(risk_decision, reason, total_risk_score, changes, geo_velocity, error_score, risk_score, behavior=None):
+    """The /login response body and status code (200 allow, 401 mfa, 403 block).
+
+    behavior: the per-user z-scores from behavior_profiles.py, reported in the breakdown when enabled.
+    """
+    breakdown = {
+        "autoencoder_error": error_score,
+        "rule_based_risk": risk_score if changes else 0,
+        "total_risk_score": total_risk_score
+    }
+    if behavior is not None:
+        breakdown["behavior"] = behavior
+    return {
+        "status": risk_decision,
+        "reason": reason,
+        "risk_score": total_risk_score,
+        "changes": changes,
+        "geo_velocity": geo_velocity,
+        "breakdown": breakdown
+    }, 401 if risk_decision == "mfa" else 403 if risk_decision == "block" else 200
@@ -0,0 +1,216 @@
+import json
+import operator
+import os
+import threading
+import time
+
+import numpy as np
+
+from metrics import Counter, Histogram, MICROSECOND_BUCKETS
+
+# Declarative rule-based scoring shared by /login, batch scoring and offline scripts.
+# risk_rules.json lists the hard block rules, the weighted change rules and the two decision
+# ladders; thresholds in the ladders are names looked up in the model bundle's thresholds.
+# Each rule is compiled once into a vectorized form (NumPy arrays / DataFrame columns) and a
+# plain-Python form for single /login records, from the same operators and presence test;
+# benchmark_rule_engine.py checks that both give the same answers.
+
+RULES_PATH = os.environ.get("RISK_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_rules.json"))
+# operator.* work element-wise on arrays and on scalars alike
+OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+LADDERS = ("changes", "no_changes")
+STAGES = ("block", "changes", "decide")
+
+
+def is_present(value):
+    """A previous value counts unless it is None, NaN or ""."""
+    return value is not None and value == value and value != ""
+
+
+def present(values):
+    """Element-wise is_present()."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return ~np.isnan(values)
+    import pandas as pd  # Object columns only; keeps pandas off the import path
+    values = values.astype(object)
+    return ~pd.isna(values) & (values != "")
+
+
+def _op(spec, where):
+    if spec not in OPS:
+        raise ValueError(f"{where}: unknown operator {spec!r} (expected one of {', '.join(OPS)})")
+    return OPS[spec]
+
+
+class RuleEngine:
+    """Rules compiled from a risk_rules.json config.
+
+    block():   hard block rules on per-login features (e.g. geo_velocity > 1000 km/h)
+    changes(): weighted change rules against the user's previous login; a rule fires when every
+               field was present before and any of them differs
+    decide():  first matching step of the "changes" or "no_changes" ladder
+    block_one() / changes_one() / decide_one() evaluate one login the same way without NumPy overhead.
+
+    Hit counts per rule and ladder step (`hits`) and evaluation times (`timings`, microseconds per
+    call; "<stage>" for single logins, "<stage>_batch" for arrays) feed /rules/stats and /metrics.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.block_rules = [
+            (rule["name"], rule["field"], _op(rule["op"], rule["name"]), rule["value"], rule["reason"])
+            for rule in config.get("block", [])
+        ]
+        self.change_rules = [(rule["name"], rule["label"], tuple(rule["fields"]), rule["weight"])
+                             for rule in config["changes"]]
+        self.change_labels = [label for _, label, _, _ in self.change_rules]
+        self.change_fields = sorted({field for _, _, fields, _ in self.change_rules for field in fields})
+        self.weights = np.array([weight for _, _, _, weight in self.change_rules])
+        self.ladders = {}
+        for ladder in LADDERS:
+            steps = config["ladders"][ladder]
+            if not steps or steps[-1].get("any"):
+                raise ValueError(f"ladders.{ladder}: the last step must have no conditions (it is the default)")
+            self.ladders[ladder] = [
+                (f"{ladder}.{step['decision']}", step["decision"], step["reason"],
+                 [(_op(op, f"ladders.{ladder}"), threshold) for op, threshold in step.get("any", [])])
+                for step in steps
+            ]
+        self.hits = Counter(["rule"])
+        self.timings = {name: Histogram(MICROSECOND_BUCKETS) for stage in STAGES for name in (stage, f"{stage}_batch")}
+        self.rows = {stage: 0 for stage in STAGES}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=RULES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def threshold(self, name):
+        """The value of a block rule, e.g. threshold("impossible_travel") -> 1000."""
+        return next(value for rule, _, _, value, _ in self.block_rules if rule == name)
+
+    def _record(self, timing, started, rows, hits):
+        self.timings[timing].observe((time.perf_counter() - started) * 1e6)
+        with self._lock:
+            self.rows[timing.split("_batch")[0]] += rows
+        for name, count in hits:
+            if count:
+                self.hits.inc(name, amount=int(count))
+
+    # Arrays: one entry per login
+    def block(self, features):
+        """(blocked, rule, reason) arrays: the first block rule that fires names the rule and reason ("" when none)."""
+        started = time.perf_counter()
+        n = len(next(iter(features.values())))
+        blocked = np.zeros(n, dtype=bool)
+        fired_rule = np.full(n, "", dtype=object)
+        reason = np.full(n, "", dtype=object)
+        hits = []
+        for name, field, op, value, rule_reason in self.block_rules:
+            fired = op(np.asarray(features[field], dtype=np.float64), value) & ~blocked
+            fired_rule[fired] = name
+            reason[fired] = rule_reason
+            blocked |= fired
+            hits.append((name, np.count_nonzero(fired)))
+        self._record("block_batch", started, n, hits)
+        return blocked, fired_rule, reason
+
+    def changes(self, previous, current):
+        """(risk_score, flags): flags is an (n, rules) bool array in change_labels order.
+
+        previous / current map field names to arrays (or DataFrame columns); previous values may be missing.
+        """
+        started = time.perf_counter()
+        flags = []
+        for _, _, fields, _ in self.change_rules:
+            was_present = np.logical_and.reduce([present(previous[field]) for field in fields])
+            differs = np.logical_or.reduce([
+                np.asarray(previous[field], dtype=object) != np.asarray(current[field], dtype=object) for field in fields
+            ])
+            flags.append(was_present & differs)
+        flags = np.column_stack(flags)
+        risk_score = flags @ self.weights
+        self._record("changes_batch", started, len(flags),
+                     zip([name for name, _, _, _ in self.change_rules], flags.sum(axis=0)))
+        return risk_score, flags
+
+    def decide(self, error_score, risk_score, has_changes, thresholds):
+        """(decision, reason, total_risk_score) arrays.
+
+        With changes the ladder scores error + rule risk; without, the autoencoder error alone.
+        """
+        started = time.perf_counter()
+        error_score = np.asarray(error_score, dtype=np.float64)
+        has_changes = np.asarray(has_changes, dtype=bool)
+        total_risk_score = np.where(has_changes, error_score + risk_score, error_score)
+        decision = np.empty(len(error_score), dtype="<U5")
+        reason = np.empty(len(error_score), dtype=object)
+        hits = []
+        for ladder, rows in (("changes", has_changes), ("no_changes", ~has_changes)):
+            undecided = rows.copy()
+            for name, step_decision, step_reason, conditions in self.ladders[ladder]:
+                matched = undecided.copy()
+                if conditions:
+                    matched &= np.logical_or.reduce([op(total_risk_score, thresholds[threshold])
+                                                     for op, threshold in conditions])
+                decision[matched] = step_decision
+                reason[matched] = step_reason
+                undecided &= ~matched
+                hits.append((name, np.count_nonzero(matched)))
+        self._record("decide_batch", started, len(error_score), hits)
+        return decision, reason.astype(str), total_risk_score
+
+    # One /login record
+    def block_one(self, **features):
+        """(rule, reason) of the first block rule one login hits, or None."""
+        started = time.perf_counter()
+        fired = None
+        for name, field, op, value, reason in self.block_rules:
+            if op(float(features[field]), value):
+                fired = (name, reason)
+                break
+        self._record("block", started, 1, [(fired[0], 1)] if fired else [])
+        return fired
+
+    def changes_one(self, last_attempt, current):
+        """(risk_score, [labels]) against last_attempt (an object with the change fields, or None)."""
+        started = time.perf_counter()
+        risk_score, labels, hits = 0, [], []
+        if last_attempt is not None:
+            for name, label, fields, weight in self.change_rules:
+                previous = [getattr(last_attempt, field, None) for field in fields]
+                if all(is_present(value) for value in previous) and \
+                        any(value != current[field] for value, field in zip(previous, fields)):
+                    risk_score += weight
+                    labels.append(label)
+                    hits.append((name, 1))
+        self._record("changes", started, 1, hits)
+        return risk_score, labels
+
+    def decide_one(self, error_score, risk_score, changes, thresholds):
+        """(decision, reason, total_risk_score) for one login; `changes` is its list of change labels."""
+        started = time.perf_counter()
+        total_risk_score = error_score + risk_score if changes else error_score
+        for name, decision, reason, conditions in self.ladders["changes" if changes else "no_changes"]:
+            if not conditions or any(op(total_risk_score, thresholds[threshold]) for op, threshold in conditions):
+                break
+        self._record("decide", started, 1, [(name, 1)])
+        return decision, reason, total_risk_score
+
+    def stats(self):
+        with self._lock:
+            rows = dict(self.rows)
+        return {
+            "hits": {name: count for (name,), count in sorted(self.hits.snapshot().items())},
+            "rows": rows,
+            "evaluation_us": {name: histogram.snapshot() for name, histogram in self.timings.items() if histogram.count},
+        }
@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Index, Integer, String, Float, Date, DateTime
+
+# Shared by the Flask app (Flask-SQLAlchemy model) and the async app (SQLAlchemy Core)
+metadata = MetaData()
+
+login_attempts = Table(
+    "login_attempts", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), nullable=False),
+    Column("ip_address", String(50), nullable=False),
+    Column("latitude", Float, nullable=False, default=0.0),
+    Column("longitude", Float, nullable=False, default=0.0),
+    Column("timezone", String(50), nullable=True),
+    Column("device_info", String(255), nullable=True, default='Unknown'),
+    Column("typing_speed", Float, nullable=True, default=0.0),
+    Column("mouse_speed", Float, nullable=True, default=0.0),
+    Column("geo_velocity", Float, nullable=True, default=0.0),
+    Column("login_time", DateTime, default=datetime.utcnow),
+    # "Latest attempt for user_id" (and the last-login cache warm-up) seeks this instead of scanning the table
+    Index("ix_login_attempts_user_id_login_time", "user_id", "login_time"),
+    # Per-IP counts for training (fetch_real_data.py) come straight from this index
+    Index("ix_login_attempts_ip_address", "ip_address"),
+)
+
+# Daily per-user, per-IP aggregates of attempts removed by retention.py
+login_rollups = Table(
+    "login_rollups", metadata,
+    Column("day", Date, primary_key=True),
+    Column("user_id", String(255), primary_key=True),
+    Column("ip_address", String(50), primary_key=True),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("typing_speed_sum", Float, nullable=False, default=0.0),
+    Column("mouse_speed_sum", Float, nullable=False, default=0.0),
+    Column("max_geo_velocity", Float, nullable=True),
+    Column("first_login", DateTime, nullable=True),
+    Column("last_login", DateTime, nullable=True),
+    Index("ix_login_rollups_ip_address", "ip_address"),
+)
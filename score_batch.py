@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+
+from numpy_autoencoder import load_autoencoder, PRECISIONS
+from feature_pipeline import FeaturePipeline
+from batch_scoring import score_stream, format_results, DEFAULT_CHUNK_SIZE
+from model_registry import LEGACY_VERSION
+from quantile_sketch import ScoreCalibrator
+
+# Re-scores historical logins with the same rules + autoencoder as /login, e.g.
+#   python score_batch.py augmented_login_data_v4.csv --output rescored.ndjson
+#   cat logins.ndjson | python score_batch.py - --input-format ndjson --output-format csv > rescored.csv
+#   python score_batch.py part-0001.csv --output part-0001.ndjson --score-sketch-dir score_sketches
+# With --score-sketch-dir the errors are also added to the score quantiles /login calibrates from
+
+
+def infer_format(path, default):
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream-score a CSV or NDJSON file of login records")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("--input-format", choices=["csv", "ndjson"])
+    parser.add_argument("--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("--output-format", choices=["csv", "ndjson"])
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--time-format", help="strftime format of login_time (default: ISO 8601 or dd-mm-YYYY HH:MM)")
+    parser.add_argument("--precision", choices=PRECISIONS, help="autoencoder export to score with (default: AUTOENCODER_PRECISION)")
+    parser.add_argument("--score-sketch-dir", help="write a quantile sketch of the reconstruction errors here")
+    args = parser.parse_args()
+
+    input_format = args.input_format or infer_format(args.input, "ndjson")
+    output_format = args.output_format or infer_format(args.output, "ndjson")
+
+    model = load_autoencoder(precision=args.precision)
+    feature_pipeline = FeaturePipeline.load("feature_pipeline.pkl")
+    calibrator = None
+    if args.score_sketch_dir:
+        # One sketch file per job; the top-level artifacts are the registry's legacy version
+        job = "stdin" if args.input == "-" else os.path.splitext(os.path.basename(args.input))[0]
+        calibrator = ScoreCalibrator(args.score_sketch_dir, name=f"batch-{job}-{os.getpid()}")
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    scored = 0
+    try:
+        for i, results in enumerate(score_stream(source, input_format, feature_pipeline, model,
+                                                 chunk_size=args.chunk_size, time_format=args.time_format)):
+            sink.write(format_results(results, output_format, include_header=(i == 0)))
+            sink.flush()
+            scored += len(results)
+            if calibrator is not None:
+                calibrator.observe_many(LEGACY_VERSION, results["autoencoder_error"].to_numpy())
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"✅ Scored {scored} login records", file=sys.stderr)
+    if calibrator is not None:
+        calibrator.save()
+        print(f"✅ Score sketch written to {calibrator.path()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def score_key(version, raw_row):
+    """The model version and the exact model input (float64 bytes of the raw feature row)."""
+    return version, np.asarray(raw_row, dtype=np.float64).tobytes()
+
+
+class ScoreCache:
+    """Bounded, LRU-evicting cache of autoencoder scores with a short TTL.
+
+    Keyed by score_key(), so an entry is only reused for the same input to the same model:
+    everything that depends on the user's state (geo-velocity from the last login, the live
+    IP frequency, the login hour) is part of the row, and the rules are evaluated afresh on
+    every request, so cached and uncached decisions agree. Retry storms and bots that repeat
+    an identical login skip the micro-batcher and the forward pass. clear() drops everything,
+    e.g. when a model bundle is loaded.
+    """
+
+    def __init__(self, capacity=10_000, ttl_s=30.0):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (expires_at, score)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """The cached score, or None on a miss or an expired entry."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, score):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, score)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,155 @@
+import json
+import os
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from feature_pipeline import FeaturePipeline
+from model_registry import ModelBundle
+from numpy_autoencoder import NumpyAutoencoder
+
+SHARED_STATE_ENV = "RBA_SHARED_STATE"  # Set by prefork_server.py; workers attach instead of loading files
+_ALIGNMENT = 64
+
+
+class SharedArrays:
+    """Named NumPy arrays packed into one shared-memory block.
+
+    The creating process owns the block (close() + unlink()); other processes attach by the
+    spec string from export() and get read-only, zero-copy views.
+    """
+
+    def __init__(self, shm, manifest, owner=False):
+        self.shm = shm
+        self.manifest = manifest
+        self.owner = owner
+
+    @classmethod
+    def create(cls, arrays, meta=None):
+        entries = {}
+        size = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": size}
+            size += array.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shared = cls(shm, {"arrays": entries, "meta": meta or {}}, owner=True)
+        for name, array in arrays.items():
+            shared._view(name)[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, spec):
+        manifest = json.loads(spec)
+        try:
+            shm = shared_memory.SharedMemory(name=manifest["name"], track=False)  # Python 3.13+
+        except TypeError:
+            # Older Pythons always register with the resource tracker, which would unlink the
+            # block when an attached process exits; only the owner should ever unlink it
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=manifest["name"])
+            finally:
+                resource_tracker.register = register
+        return cls(shm, manifest)
+
+    def export(self):
+        return json.dumps({"name": self.shm.name, **self.manifest})
+
+    def _view(self, name):
+        entry = self.manifest["arrays"][name]
+        return np.ndarray(tuple(entry["shape"]), dtype=np.dtype(entry["dtype"]), buffer=self.shm.buf, offset=entry["offset"])
+
+    def array(self, name):
+        view = self._view(name)
+        view.flags.writeable = False
+        return view
+
+    @property
+    def meta(self):
+        return self.manifest["meta"]
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedIPFrequencies(Mapping):
+    """Read-only IP -> frequency table over sorted byte-string keys (binary search, no per-worker dict)."""
+
+    def __init__(self, keys, values):
+        self.keys_array = keys
+        self.values_array = values
+
+    @staticmethod
+    def arrays(ip_frequencies):
+        ips = sorted(ip_frequencies, key=lambda ip: str(ip).encode())
+        keys = np.array([str(ip).encode() for ip in ips], dtype=bytes) if ips else np.array([], dtype="S1")
+        values = np.array([ip_frequencies[ip] for ip in ips], dtype=np.float64)
+        return keys, values
+
+    def get(self, ip_address, default=None):
+        key = str(ip_address).encode()
+        i = int(np.searchsorted(self.keys_array, key))
+        if i < len(self.keys_array) and self.keys_array[i] == key:
+            return float(self.values_array[i])
+        return default
+
+    def frequencies(self, ip_addresses, default=0.0):
+        keys = np.char.encode(np.asarray(ip_addresses, dtype=object).astype(str))
+        if len(self.keys_array) == 0:
+            return np.full(len(keys), default, dtype=np.float64)
+        i = np.minimum(np.searchsorted(self.keys_array, keys), len(self.keys_array) - 1)
+        return np.where(self.keys_array[i] == keys, self.values_array[i], default)
+
+    def __getitem__(self, ip_address):
+        value = self.get(ip_address)
+        if value is None:
+            raise KeyError(ip_address)
+        return value
+
+    def __iter__(self):
+        return (key.decode() for key in self.keys_array)
+
+    def __len__(self):
+        return len(self.keys_array)
+
+
+def publish_serving_state(bundle):
+    """Copies a bundle's autoencoder weights, scaler parameters and IP-frequency table into shared memory."""
+    model, pipeline = bundle.model, bundle.pipeline
+    if not isinstance(model, NumpyAutoencoder):
+        raise ValueError(f"Model {bundle.version} has no exported NumPy weights; run `python numpy_autoencoder.py` first")
+    arrays = {"scale": pipeline.scale, "offset": pipeline.offset}
+    for i, (kernel, bias) in enumerate(zip(model.kernels, model.biases)):
+        arrays[f"kernel_{i}"] = kernel
+        arrays[f"bias_{i}"] = bias
+    arrays["ip_keys"], arrays["ip_values"] = SharedIPFrequencies.arrays(pipeline.ip_frequencies)
+    meta = {
+        "activations": model.activations, "unseen_ip_frequency": pipeline.unseen_ip_frequency,
+        "version": bundle.version, "thresholds": bundle.thresholds,
+    }
+    return SharedArrays.create(arrays, meta)
+
+
+def attach_serving_state(spec=None):
+    """Returns the ModelBundle backed by the parent's shared memory, or None if not pre-forked."""
+    spec = spec or os.environ.get(SHARED_STATE_ENV)
+    if not spec:
+        return None
+    shared = SharedArrays.attach(spec)
+    activations = shared.meta["activations"]
+    model = NumpyAutoencoder(
+        [shared.array(f"kernel_{i}") for i in range(len(activations))],
+        [shared.array(f"bias_{i}") for i in range(len(activations))],
+        activations
+    )
+    pipeline = FeaturePipeline(shared.array("scale"), shared.array("offset"), {}, shared.meta["unseen_ip_frequency"])
+    pipeline.use_ip_frequencies(SharedIPFrequencies(shared.array("ip_keys"), shared.array("ip_values")))
+    pipeline.shared = shared  # Keeps the mapping open for as long as the pipeline is used
+    return ModelBundle(shared.meta["version"], model, pipeline, shared.meta["thresholds"])
@@ -0,0 +1,215 @@
+import os
+from collections import Counter
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler, LabelEncoder
+
+from dataset_store import parse_login_times, iter_dataset_batches, LOGIN_COLUMNS
+from feature_pipeline import FeaturePipeline, FEATURE_COLUMNS
+from geo_features import compute_geo_velocity
+
+DEFAULT_CHUNK_SIZE = 100_000
+CALIBRATION_ROWS = 200_000  # Training rows the int8 export calibrates its activation ranges on
+CATEGORICAL_COLUMNS = ["ip_address", "timezone", "device_info"]
+SOURCE_COLUMNS = LOGIN_COLUMNS
+
+
+def iter_parquet_chunks(path, chunk_size):
+    import pyarrow.dataset as ds  # Optional dependency, only needed for Parquet sources
+
+    dataset = ds.dataset(path, format="parquet")
+    for batch in dataset.to_batches(columns=SOURCE_COLUMNS, batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def iter_table_chunks(database_url, chunk_size, table="login_attempts"):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    query = text(f"SELECT {', '.join(SOURCE_COLUMNS)} FROM {table} ORDER BY user_id, login_time")
+    # stream_results keeps a server-side cursor open instead of buffering the whole table
+    with engine.connect().execution_options(stream_results=True) as conn:
+        yield from pd.read_sql(query, conn, chunksize=chunk_size)
+    engine.dispose()
+
+
+def chunk_source(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Returns a callable that restarts the chunk stream (one call per pass/epoch).
+
+    `source` is a dataset store name (or legacy .csv path), a .parquet file or directory,
+    or a SQLAlchemy URL for the login_attempts table. Each user's records must appear in login_time order.
+    """
+    if "://" in source:
+        return lambda: iter_table_chunks(source, chunk_size)
+    if source.endswith(".parquet") or os.path.isdir(source):
+        return lambda: iter_parquet_chunks(source, chunk_size)
+    return lambda: iter_dataset_batches(source, columns=SOURCE_COLUMNS, batch_size=chunk_size)
+
+
+class SequentialFeatures:
+    """Per-user geo-velocity across chunk boundaries, carrying each user's last record.
+
+    keep_first keeps each user's first-ever login (geo_velocity 0, like /login) instead of dropping it.
+    Rows are ordered by login_time within each user, since ids and chunks need not be: write-behind
+    batches and replayed spill rows are inserted after newer logins. A row older than the user's
+    carried record is treated like a first login (no previous point, geo_velocity 0), because the
+    login before it was already processed in an earlier chunk.
+    """
+
+    def __init__(self, method="ellipsoidal", keep_first=False):
+        self.method = method
+        self.keep_first = keep_first
+        self.last_record = {}  # user_id -> (latitude, longitude, login_time)
+
+    def transform(self, chunk):
+        """Adds geo_velocity and login_hour; drops each user's first-ever login unless keep_first."""
+        df = chunk.copy()
+        df["login_time"] = parse_login_times(df["login_time"])
+        df = df.dropna(subset=["user_id", "latitude", "longitude", "login_time"])
+        df["_carried"] = False
+
+        carried_users = [user for user in df["user_id"].unique() if user in self.last_record]
+        late = None
+        if carried_users:
+            carried = pd.DataFrame(
+                [(user, *self.last_record[user]) for user in carried_users],
+                columns=["user_id", "latitude", "longitude", "login_time"]
+            )
+            carried["_carried"] = True
+            df = pd.concat([carried, df], ignore_index=True)
+            carried_times = df["user_id"].map(dict(zip(carried["user_id"], carried["login_time"])))
+            late = (~df["_carried"] & (df["login_time"] < carried_times)).to_numpy()
+
+        # On equal times the carried record stays in front of the user's rows from this chunk
+        df = df.sort_values(by=["user_id", "login_time", "_carried"], ascending=[True, True, False])
+        velocity = compute_geo_velocity(df, method=self.method)
+        if late is not None and late.any():
+            late = late[df.index]  # Row positions before the sort, looked up in sorted order
+            velocity.loc[late, velocity.columns] = np.nan
+            velocity.loc[late, "geo_velocity"] = 0.0
+        df = df.join(velocity)
+
+        last_rows = df.drop_duplicates("user_id", keep="last")
+        self.last_record.update(zip(last_rows["user_id"],
+                                    zip(last_rows["latitude"], last_rows["longitude"], last_rows["login_time"])))
+
+        keep = ~df["_carried"] if self.keep_first else ~df["_carried"] & df["prev_login_time"].notna()
+        df = df[keep].drop(columns="_carried")
+        df["login_hour"] = df["login_time"].dt.hour
+        return df
+
+
+def fit_preprocessing(make_chunks):
+    """Passes 1 and 2: IP frequencies and categories, then an incremental MinMaxScaler fit."""
+    ip_counts = Counter()
+    categories = {col: set() for col in CATEGORICAL_COLUMNS}
+    total_rows = 0
+    for chunk in make_chunks():
+        ip_counts.update(chunk["ip_address"].value_counts().to_dict())
+        for col in CATEGORICAL_COLUMNS:
+            categories[col].update(chunk[col].dropna().unique())
+        total_rows += len(chunk)
+    if total_rows == 0:
+        raise ValueError(" Error: The dataset is empty! Check data loading.")
+    ip_frequencies = {ip: count / total_rows for ip, count in ip_counts.items()}
+
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder()
+        le.classes_ = np.array(sorted(categories[col]))  # Same classes LabelEncoder.fit would learn
+        label_encoders[col] = le
+
+    scaler = MinMaxScaler()
+    sequential = SequentialFeatures()
+    feature_rows = 0
+    for chunk in make_chunks():
+        features = sequential.transform(chunk)
+        if features.empty:
+            continue
+        features["ip_frequency"] = features["ip_address"].map(ip_frequencies)
+        scaler.partial_fit(features[FEATURE_COLUMNS])
+        feature_rows += len(features)
+    if feature_rows == 0:
+        raise ValueError(" Error: No training data available after preprocessing!")
+    return ip_frequencies, label_encoders, scaler, feature_rows
+
+
+def iter_scaled_batches(make_chunks, pipeline, validation=False, val_fraction=0.1, seed=42):
+    """Yields scaled float32 feature arrays, one per chunk, for the train or validation split.
+
+    The split draws from a fixed-seed RNG in stream order, so every epoch sees the same split.
+    """
+    rng = np.random.default_rng(seed)
+    shuffle_rng = np.random.default_rng()
+    sequential = SequentialFeatures()
+    for chunk in make_chunks():
+        features = sequential.transform(chunk)
+        in_validation = rng.random(len(features)) < val_fraction
+        features = features[in_validation] if validation else features[~in_validation]
+        if features.empty:
+            continue
+        X = pipeline.transform_frame(features).astype(np.float32)
+        if not validation:
+            X = X[shuffle_rng.permutation(len(X))]  # Shuffle within the chunk
+        yield X
+
+
+def calibration_rows(make_chunks, pipeline, max_rows=CALIBRATION_ROWS):
+    """The first max_rows scaled training rows, for the int8 activation ranges."""
+    rows, count = [], 0
+    for X in iter_scaled_batches(make_chunks, pipeline):
+        rows.append(X[:max_rows - count])
+        count += len(rows[-1])
+        if count >= max_rows:
+            break
+    return np.concatenate(rows)
+
+
+def make_dataset(make_chunks, pipeline, batch_size, validation=False):
+    import tensorflow as tf
+
+    def batches():
+        for X in iter_scaled_batches(make_chunks, pipeline, validation=validation):
+            for start in range(0, len(X), batch_size):
+                yield X[start:start + batch_size]
+
+    dataset = tf.data.Dataset.from_generator(
+        batches, output_signature=tf.TensorSpec(shape=(None, len(FEATURE_COLUMNS)), dtype=tf.float32)
+    )
+    return dataset.map(lambda x: (x, x)).prefetch(tf.data.AUTOTUNE)
+
+
+def train_streaming(source, chunk_size=DEFAULT_CHUNK_SIZE, epochs=50, batch_size=32):
+    """Trains the autoencoder from a chunked source with peak memory bounded by chunk size.
+
+    Memory still grows with the number of distinct users (carried last record) and IPs
+    (frequency table), but not with the number of rows.
+    """
+    from model_builder import build_autoencoder
+    from numpy_autoencoder import export_weights
+    from quantized_autoencoder import export_quantized
+    from artifacts import write_manifest
+
+    make_chunks = chunk_source(source, chunk_size)
+    ip_frequencies, label_encoders, scaler, feature_rows = fit_preprocessing(make_chunks)
+    joblib.dump(label_encoders, "label_encoders.pkl")
+    joblib.dump(ip_frequencies, "ip_frequencies.pkl")
+    joblib.dump(scaler, "scaler.pkl")
+    pipeline = FeaturePipeline.from_scaler(scaler, ip_frequencies)
+    pipeline.save("feature_pipeline.pkl")
+    print(f"✅ Preprocessing fitted incrementally on {feature_rows} rows; encoders, frequencies and scaler saved.")
+
+    autoencoder = build_autoencoder(len(FEATURE_COLUMNS))
+    autoencoder.fit(
+        make_dataset(make_chunks, pipeline, batch_size),
+        validation_data=make_dataset(make_chunks, pipeline, batch_size, validation=True),
+        epochs=epochs
+    )
+    autoencoder.save("autoencoder_model.keras")
+    export_weights("autoencoder_model.keras", "autoencoder_weights.npz")
+    export_quantized("autoencoder_weights.npz", calibration_rows(make_chunks, pipeline), str(source))
+    write_manifest()
+    print(" Autoencoder training complete. Model saved successfully!")
+    return autoencoder
@@ -1,101 +1,106 @@
+import argparse
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense
 import joblib
-from datetime import datetime
-from geopy.distance import geodesic
-
-# Load dataset
-df = pd.read_csv("augmented_login_data_v4.csv")
-print(f"✅ Dataset loaded. Shape: {df.shape}")
-
-# Encode categorical features
-label_encoders = {}
-categorical_cols = ["ip_address", "timezone", "device_info"]
-for col in categorical_cols:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])
-    label_encoders[col] = le
-joblib.dump(label_encoders, "label_encoders.pkl")
-print("✅ Label encoders saved.")
-
-# Compute frequency of each IP address & add as feature
-ip_frequencies = df["ip_address"].value_counts(normalize=True).to_dict()
-df["ip_frequency"] = df["ip_address"].map(ip_frequencies)
-joblib.dump(ip_frequencies, "ip_frequencies.pkl")
-
-# Convert `login_time` to datetime
-df["login_time"] = pd.to_datetime(df["login_time"], format="%d-%m-%Y %H:%M", dayfirst=True, errors="coerce")
-
-
-# Sort by user_id and login_time for sequential processing
-df = df.sort_values(by=["user_id", "login_time"])
-df["prev_latitude"] = df.groupby("user_id")["latitude"].shift(1)
-df["prev_longitude"] = df.groupby("user_id")["longitude"].shift(1)
-df["prev_login_time"] = df.groupby("user_id")["login_time"].shift(1)
-
-# Drop NaN values (ensures every entry has a valid previous login)
-df.dropna(inplace=True)
-if df.empty:
-    raise ValueError(" Error: The dataset is empty after preprocessing! Check data loading.")
-
-def calculate_speed(row):
-    try:
-        prev_location = (row["prev_latitude"], row["prev_longitude"])
-        current_location = (row["latitude"], row["longitude"])
-        
-        # Ensure valid datetime values
-        if pd.isnull(row["prev_login_time"]) or pd.isnull(row["login_time"]):
-            return 0.0
-        
-        time_diff = (row["login_time"] - row["prev_login_time"]).total_seconds() / 3600.0
-        distance = geodesic(prev_location, current_location).km
-        
-        return distance / time_diff if time_diff > 0 else 0.0
-    except:
-        return 0.0
-
-df["geo_velocity"] = df.apply(calculate_speed, axis=1)
-print("✅ Geo-velocity computed.")
-
-# Extract login hour
-df["login_hour"] = df["login_time"].dt.hour
-
-# Normalize numerical features
-numerical_cols = ["latitude", "longitude", "typing_speed", "mouse_speed", "geo_velocity", "login_hour", "ip_frequency"]
-scaler = MinMaxScaler()
-
-df[numerical_cols] = scaler.fit_transform(df[numerical_cols])
-joblib.dump(scaler, "scaler.pkl")
-print("✅ Numerical features normalized and scaler saved.")
-
-# Prepare training data
-X = df[numerical_cols].values  #Converts the DataFrame into a NumPy array
-if X.shape[0] == 0:
-    raise ValueError(" Error: No training data available after preprocessing!")
-
-# Train-validation split
-X_train, X_val = train_test_split(X, test_size=0.1, random_state=42)
-
-# Define a deeper Autoencoder model
-input_dim = X_train.shape[1]   # Gets number of features 
-input_layer = Input(shape=(input_dim,))  #  Defines the input layer with the same number of features
-encoded = Dense(16, activation='relu')(input_layer)  #First hidden layer with 16 neurons, using 'relu' activation
-encoded = Dense(8, activation='relu')(encoded)
-encoded = Dense(4, activation='relu')(encoded)
-decoded = Dense(8, activation='relu')(encoded)
-decoded = Dense(16, activation='relu')(decoded)
-decoded = Dense(input_dim, activation='sigmoid')(decoded)
-
-autoencoder = Model(input_layer, decoded)  #Connects the input layer to the output layer.
-autoencoder.compile(optimizer='adam', loss='mse')
-
-# Train the model
-autoencoder.fit(X_train, X_train, epochs=50, batch_size=32, shuffle=True, validation_data=(X_val, X_val))
-
-# Save model
-autoencoder.save("autoencoder_model.keras")
-print(" Autoencoder training complete. Model saved successfully!")
+from geo_features import compute_geo_velocity
+from numpy_autoencoder import export_weights
+from quantized_autoencoder import export_quantized
+from feature_pipeline import FeaturePipeline, FEATURE_COLUMNS
+from model_builder import build_autoencoder
+from artifacts import write_manifest
+from dataset_store import load_dataset, LOGIN_COLUMNS
+
+
+def preprocess(df):
+    """Fits the training transforms on a login history.
+
+    Returns (X, ip_frequencies, label_encoders, scaler) where X holds the scaled FEATURE_COLUMNS.
+    """
+    # Compute frequency of each IP address (keyed by the raw IP, as looked up at scoring time) & add as feature
+    ip_frequencies = df["ip_address"].value_counts(normalize=True).to_dict()
+    df["ip_frequency"] = df["ip_address"].map(ip_frequencies)
+
+    # Encode categorical features
+    label_encoders = {}
+    categorical_cols = ["ip_address", "timezone", "device_info"]
+    for col in categorical_cols:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col])
+        label_encoders[col] = le
+
+    # Sort by user_id and login_time for sequential processing
+    df = df.sort_values(by=["user_id", "login_time"])
+
+    # Previous location/time, distance, time delta and geo-velocity (ellipsoidal distance, like geopy's geodesic)
+    df = df.join(compute_geo_velocity(df, method="ellipsoidal"))
+
+    # Drop NaN values (ensures every entry has a valid previous login)
+    df.dropna(inplace=True)
+    if df.empty:
+        raise ValueError(" Error: The dataset is empty after preprocessing! Check data loading.")
+    print("✅ Geo-velocity computed.")
+
+    # Extract login hour
+    df["login_hour"] = df["login_time"].dt.hour
+
+    # Normalize numerical features
+    numerical_cols = FEATURE_COLUMNS
+    scaler = MinMaxScaler()
+    df[numerical_cols] = scaler.fit_transform(df[numerical_cols])
+
+    # Prepare training data
+    X = df[numerical_cols].values  #Converts the DataFrame into a NumPy array
+    if X.shape[0] == 0:
+        raise ValueError(" Error: No training data available after preprocessing!")
+    return X, ip_frequencies, label_encoders, scaler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the login autoencoder")
+    parser.add_argument("--streaming", action="store_true",
+                        help="read the source in chunks instead of loading it into memory")
+    parser.add_argument("--source", default="augmented_login_data_v4",
+                        help="dataset name, CSV file, Parquet file/directory, or database URL (login_attempts table, --streaming only)")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.streaming:
+        from streaming_training import train_streaming
+        train_streaming(args.source, chunk_size=args.chunk_size, epochs=50, batch_size=32)
+        sys.exit(0)
+
+    # Load dataset (only the columns training uses; login_time arrives as timestamps)
+    df = load_dataset(args.source, columns=LOGIN_COLUMNS)
+    print(f"✅ Dataset loaded. Shape: {df.shape}")
+
+    X, ip_frequencies, label_encoders, scaler = preprocess(df)
+    joblib.dump(ip_frequencies, "ip_frequencies.pkl")
+    joblib.dump(label_encoders, "label_encoders.pkl")
+    print("✅ Label encoders saved.")
+    joblib.dump(scaler, "scaler.pkl")
+    FeaturePipeline.from_scaler(scaler, ip_frequencies).save("feature_pipeline.pkl")  # Shared by the API and offline scripts
+    print("✅ Numerical features normalized and scaler saved.")
+
+    # Train-validation split
+    X_train, X_val = train_test_split(X, test_size=0.1, random_state=42)
+
+    # Define a deeper Autoencoder model (7-16-8-4-8-16-7)
+    input_dim = X_train.shape[1]   # Gets number of features
+    autoencoder = build_autoencoder(input_dim, encoder_units=(16, 8, 4))
+
+    # Train the model
+    autoencoder.fit(X_train, X_train, epochs=50, batch_size=32, shuffle=True, validation_data=(X_val, X_val))
+
+    # Save model
+    autoencoder.save("autoencoder_model.keras")
+    export_weights("autoencoder_model.keras", "autoencoder_weights.npz")  # NumPy runtime used for serving
+    export_quantized("autoencoder_weights.npz", X, args.source)  # float16 / int8 for AUTOENCODER_PRECISION
+    write_manifest()  # Content hashes the API checks before loading these artifacts
+    print(" Autoencoder training complete. Model saved successfully!")
+
+
+if __name__ == "__main__":
+    main()
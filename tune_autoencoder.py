@@ -0,0 +1,321 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from dataset_store import load_dataset, dataset_path, csv_path, LOGIN_COLUMNS
+from feature_pipeline import FeaturePipeline, PIPELINE_PATH
+from geo_features import compute_geo_velocity
+from login_generator import generate_users, parse_count, parse_scenarios, SCENARIO_LABELS
+from model_registry import publish_bundle, REGISTRY_ROOT
+from numpy_autoencoder import NumpyAutoencoder, KERAS_MODEL_PATH, NUMPY_WEIGHTS_PATH
+from quantized_autoencoder import export_quantized
+from risk_scoring import RULES, DEFAULT_THRESHOLDS
+from rule_engine import RuleEngine
+
+# Hyperparameter and decision-threshold search for the autoencoder, e.g.
+#   python tune_autoencoder.py --units 16,8,4 --units 32,16,8 --units 8,4 --batch-size 32 --batch-size 128
+#   python tune_autoencoder.py --publish --activate      # also bundle the best candidate into models/
+# Candidates train in parallel worker processes with early stopping on the validation loss. The
+# preprocessed training arrays and the labeled evaluation logins are cached in tuning_cache/, so
+# trials (and later runs on the same data) skip preprocessing. Each candidate then gets the
+# allow/mfa/block cut-points that minimise DECISION_COSTS on logins from login_generator.py,
+# whose scenario labels say which logins are account takeovers.
+
+CACHE_DIR = "tuning_cache"
+OUTPUT_DIR = "tuning"
+CACHE_VERSION = 1  # Bump when the cached features are computed differently
+DEFAULT_UNITS = ["16,8,4", "32,16,8", "16,8", "8,4"]
+DEFAULT_BATCH_SIZES = [32, 128]
+EVAL_SCENARIOS = ["relocation:0.02", "device_change:0.02", "local_drift:1.0", "impossible_travel:0.02"]
+DECISIONS = ["allow", "mfa", "block"]
+# Cost of each decision per scenario: a takeover must not be allowed; a genuine user should not be blocked
+DECISION_COSTS = {
+    "normal": {"allow": 0.0, "mfa": 0.2, "block": 1.0},
+    "local_drift": {"allow": 0.0, "mfa": 0.2, "block": 1.0},
+    "relocation": {"allow": 0.0, "mfa": 0.2, "block": 1.0},
+    "device_change": {"allow": 0.0, "mfa": 0.2, "block": 1.0},
+    "impossible_travel": {"allow": 10.0, "mfa": 1.0, "block": 0.0},
+}
+GRID_POINTS = 100  # Candidate cut-points per threshold (quantiles of the scores)
+
+
+def source_fingerprint(*parts):
+    """Hash of `parts` and of the size / mtime of every file behind a dataset name or path among them."""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for part in parts:
+        digest.update(f"|{part}".encode())
+        for path in {dataset_path(str(part)), csv_path(str(part)), str(part)}:
+            if not os.path.exists(path):
+                continue
+            files = [os.path.join(d, f) for d, _, names in os.walk(path) for f in names] if os.path.isdir(path) else [path]
+            for name in sorted(files):
+                stat = os.stat(name)
+                digest.update(f"|{name}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def training_features(source, cache_dir=CACHE_DIR, val_fraction=0.1, seed=42):
+    """(path of the cached X_train / X_val .npz, fitted artifacts), preprocessing only on a cache miss."""
+    key = source_fingerprint(source, val_fraction, seed)
+    features_path = os.path.join(cache_dir, f"train-{key}.npz")
+    artifacts_path = os.path.join(cache_dir, f"train-{key}.pkl")
+    if os.path.exists(features_path) and os.path.exists(artifacts_path):
+        print(f"✅ Reusing cached training features {features_path}")
+        return features_path, joblib.load(artifacts_path)
+
+    from sklearn.model_selection import train_test_split
+    from train_autoencoder import preprocess  # Imports TensorFlow; only needed on a cache miss
+
+    start = time.perf_counter()
+    df = load_dataset(source, columns=LOGIN_COLUMNS)
+    X, ip_frequencies, label_encoders, scaler = preprocess(df)
+    X_train, X_val = train_test_split(X, test_size=val_fraction, random_state=seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(features_path + ".tmp.npz", X_train=X_train, X_val=X_val)
+    os.replace(features_path + ".tmp.npz", features_path)
+    artifacts = {"ip_frequencies": ip_frequencies, "label_encoders": label_encoders, "scaler": scaler}
+    joblib.dump(artifacts, artifacts_path)
+    print(f"✅ Preprocessed {source} ({len(X_train):,} train / {len(X_val):,} validation rows) "
+          f"in {time.perf_counter() - start:.1f} s; cached in {features_path}")
+    return features_path, artifacts
+
+
+def scenario_features(users, seed, cache_dir=CACHE_DIR):
+    """Labeled evaluation logins: raw feature rows plus the rule results /login would compute for them.
+
+    Geo-velocity uses the haversine distance and IP frequencies come from the evaluation history
+    itself, as the API sees them; change rules compare each login with the user's previous one.
+    """
+    key = source_fingerprint("scenarios", users, seed, EVAL_SCENARIOS)
+    path = os.path.join(cache_dir, f"scenarios-{key}.npz")
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return {name: cached[name] for name in cached.files}
+
+    df = generate_users(1, users, np.random.default_rng(seed), parse_scenarios(EVAL_SCENARIOS))
+    df = df.join(compute_geo_velocity(df, method="haversine"))
+    current = df[["user_id", "ip_address", "latitude", "longitude", "timezone", "device_info"]].astype(
+        {"ip_address": object, "timezone": object, "device_info": object})
+    previous = current.groupby("user_id")[RULES.change_fields].shift(1)
+    rules = RuleEngine(RULES.config)
+    risk_score, flags = rules.changes(previous, current)
+    blocked, _, _ = rules.block({"geo_velocity": df["geo_velocity"]})
+    ip_frequency = df["ip_address"].map(df["ip_address"].value_counts(normalize=True)).astype(np.float64)
+    features = {
+        "raw": np.column_stack([
+            df["latitude"], df["longitude"], df["typing_speed"], df["mouse_speed"], df["geo_velocity"],
+            df["login_time"].dt.hour, ip_frequency,
+        ]).astype(np.float64),
+        "risk_score": risk_score,
+        "has_changes": flags.any(axis=1),
+        "blocked": blocked,
+        "label": df["scenario"].cat.codes.to_numpy(),
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path + ".tmp.npz", **features)
+    os.replace(path + ".tmp.npz", path)
+    return features
+
+
+def train_trial(task):
+    """Worker: trains one candidate with early stopping and saves it (Keras model + NumPy export) to its directory."""
+    trial, units, batch_size, max_epochs, patience, features_path, out_dir, seed, threads = task
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.keras.utils.set_random_seed(seed)
+    from model_builder import build_autoencoder
+    from numpy_autoencoder import export_weights
+
+    with np.load(features_path) as features:
+        X_train, X_val = features["X_train"], features["X_val"]
+    start = time.perf_counter()
+    model = build_autoencoder(X_train.shape[1], encoder_units=units)
+    stop = tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True)
+    history = model.fit(X_train, X_train, epochs=max_epochs, batch_size=batch_size, shuffle=True,
+                        validation_data=(X_val, X_val), callbacks=[stop], verbose=0)
+    train_s = time.perf_counter() - start
+    os.makedirs(out_dir, exist_ok=True)
+    model.save(os.path.join(out_dir, KERAS_MODEL_PATH))
+    export_weights(os.path.join(out_dir, KERAS_MODEL_PATH), os.path.join(out_dir, NUMPY_WEIGHTS_PATH))
+    val_loss = history.history["val_loss"]
+    return {
+        "trial": trial,
+        "units": list(units),
+        "batch_size": batch_size,
+        "epochs": len(val_loss),
+        "best_epoch": int(np.argmin(val_loss)) + 1,
+        "val_loss": float(np.min(val_loss)),
+        "train_s": train_s,
+        "dir": out_dir,
+    }
+
+
+def _cumulative_costs(labels, costs):
+    """Per decision, the cumulative cost of rows in the given order (length n + 1)."""
+    return {decision: np.concatenate([[0.0], np.cumsum(costs[labels, i])]) for i, decision in enumerate(DECISIONS)}
+
+
+def _grid(scores):
+    return np.unique(np.concatenate([np.quantile(scores, np.linspace(0, 1, GRID_POINTS)), [np.inf]]))
+
+
+def search_thresholds(error_score, evaluation, costs):
+    """Cut-points of both decision ladders that minimise the total decision cost.
+
+    The ladders are independent (a login uses one of them), so each is searched on its own rows:
+    scores are sorted once, and the cost of every grid combination comes from cumulative sums.
+    """
+    ladder_rows = ~evaluation["blocked"]
+    thresholds = {}
+
+    # No changes: block below bb, allow below ab, mfa below bf, block from bf (bb <= ab <= bf)
+    rows = ladder_rows & ~evaluation["has_changes"]
+    order = np.argsort(error_score[rows])
+    scores, cum = error_score[rows][order], _cumulative_costs(evaluation["label"][rows][order], costs)
+    grid = _grid(scores)
+    cut = np.searchsorted(scores, grid)  # Rows below each candidate threshold
+    bb, ab, bf = np.meshgrid(cut, cut, cut, indexing="ij")
+    total = cum["block"][bb] + (cum["allow"][ab] - cum["allow"][bb]) + (cum["mfa"][bf] - cum["mfa"][ab]) + \
+        (cum["block"][-1] - cum["block"][bf])
+    total = np.where((bb <= ab) & (ab <= bf), total, np.inf)
+    i, j, k = np.unravel_index(np.argmin(total), total.shape)
+    thresholds.update(behavioral_block_below=float(grid[i]), behavioral_allow_below=float(grid[j]),
+                      behavioral_block_from=float(grid[k]))
+
+    # Changes: allow below mfa_from, mfa below block_from, block from block_from
+    rows = ladder_rows & evaluation["has_changes"]
+    scores = error_score[rows] + evaluation["risk_score"][rows]
+    order = np.argsort(scores)
+    scores, cum = scores[order], _cumulative_costs(evaluation["label"][rows][order], costs)
+    grid = _grid(scores)
+    cut = np.searchsorted(scores, grid)
+    mfa, block = np.meshgrid(cut, cut, indexing="ij")
+    total = cum["allow"][mfa] + (cum["mfa"][block] - cum["mfa"][mfa]) + (cum["block"][-1] - cum["block"][block])
+    total = np.where(mfa <= block, total, np.inf)
+    i, j = np.unravel_index(np.argmin(total), total.shape)
+    thresholds.update(rules_mfa_from=float(grid[i]), rules_block_from=float(grid[j]))
+    return {key: (value if np.isfinite(value) else 1e9) for key, value in thresholds.items()}  # JSON-safe
+
+
+def evaluate(error_score, evaluation, thresholds, costs):
+    """Decisions of the shared rule engine with `thresholds`, and their cost and rates."""
+    rules = RuleEngine(RULES.config)
+    decision, _, _ = rules.decide(error_score, evaluation["risk_score"], evaluation["has_changes"], thresholds)
+    decision = np.where(evaluation["blocked"], "block", decision)
+    codes = np.select([decision == name for name in DECISIONS], range(len(DECISIONS)))
+    labels = evaluation["label"]
+    attack = labels == SCENARIO_LABELS.index("impossible_travel")
+    return {
+        "cost_per_1k": float(costs[labels, codes].sum() / len(labels) * 1000),
+        "attacks_stopped": float(np.mean(codes[attack] > 0)) if attack.any() else None,
+        "genuine_allowed": float(np.mean(codes[~attack] == 0)),
+        "genuine_mfa": float(np.mean(codes[~attack] == 1)),
+        "genuine_blocked": float(np.mean(codes[~attack] == 2)),
+    }
+
+
+def score(model_dir, pipeline, evaluation):
+    """Mean absolute reconstruction error of the evaluation rows, as /login computes it."""
+    model = NumpyAutoencoder.load(os.path.join(model_dir, NUMPY_WEIGHTS_PATH))
+    scaled = pipeline.transform_rows(evaluation["raw"])
+    return np.mean(np.abs(scaled - model.predict(scaled)), axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the autoencoder architecture, training and decision thresholds")
+    parser.add_argument("--source", default="augmented_login_data_v4", help="training dataset (see train_autoencoder.py)")
+    parser.add_argument("--units", action="append", help="encoder layer sizes, e.g. 16,8,4 (repeatable)")
+    parser.add_argument("--batch-size", type=int, action="append", help="repeatable")
+    parser.add_argument("--max-epochs", type=int, default=50)
+    parser.add_argument("--patience", type=int, default=5, help="epochs without a better val_loss before stopping")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--eval-users", type=parse_count, default=parse_count("5k"), help="users in the labeled evaluation set")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--publish", action="store_true", help="bundle the best candidate into the model registry")
+    parser.add_argument("--activate", action="store_true", help="with --publish: make it the active version")
+    parser.add_argument("--registry", default=REGISTRY_ROOT)
+    args = parser.parse_args()
+
+    units = [tuple(int(u) for u in spec.split(",")) for spec in (args.units or DEFAULT_UNITS)]
+    batch_sizes = args.batch_size or DEFAULT_BATCH_SIZES
+    run_dir = os.path.join(args.output, time.strftime("%Y%m%d-%H%M%S"))
+    costs = np.array([[DECISION_COSTS[label][decision] for decision in DECISIONS] for label in SCENARIO_LABELS])
+
+    features_path, artifacts = training_features(args.source, args.cache_dir, seed=args.seed)
+    pipeline = FeaturePipeline.from_scaler(artifacts["scaler"], artifacts["ip_frequencies"])
+    evaluation = scenario_features(args.eval_users, args.seed, args.cache_dir)
+    print(f"✅ {len(evaluation['label']):,} labeled evaluation logins "
+          f"({np.sum(evaluation['label'] == SCENARIO_LABELS.index('impossible_travel')):,} takeovers)")
+
+    candidates = list(itertools.product(units, batch_sizes))
+    workers = max(1, min(args.workers, len(candidates)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    tasks = [(trial, candidate_units, batch_size, args.max_epochs, args.patience, features_path,
+              os.path.join(run_dir, f"trial-{trial:02d}"), args.seed, threads)
+             for trial, (candidate_units, batch_size) in enumerate(candidates)]
+    print(f"Training {len(tasks)} candidates on {workers} worker process(es)...")
+    start = time.perf_counter()
+    results = []
+    # spawn: TensorFlow does not survive fork()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for future in as_completed([pool.submit(train_trial, task) for task in tasks]):
+            result = future.result()
+            error_score = score(result["dir"], pipeline, evaluation)
+            result["thresholds"] = search_thresholds(error_score, evaluation, costs)
+            result.update(evaluate(error_score, evaluation, result["thresholds"], costs))
+            result["default_thresholds_cost_per_1k"] = evaluate(error_score, evaluation, DEFAULT_THRESHOLDS, costs)["cost_per_1k"]
+            results.append(result)
+            print(f"  trial {result['trial']:2d} units={result['units']} batch={result['batch_size']}: "
+                  f"{result['epochs']} epochs (best {result['best_epoch']}), val_loss {result['val_loss']:.5f}, "
+                  f"cost/1k {result['cost_per_1k']:.2f}, {result['train_s']:.1f} s")
+    wall_s = time.perf_counter() - start
+
+    results.sort(key=lambda r: (r["cost_per_1k"], r["val_loss"]))
+    for rank, result in enumerate(results, start=1):
+        result["rank"] = rank
+    os.makedirs(run_dir, exist_ok=True)
+    report = {"source": args.source, "costs": DECISION_COSTS, "wall_s": wall_s, "workers": workers, "trials": results}
+    with open(os.path.join(run_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    pd.json_normalize(results).to_csv(os.path.join(run_dir, "report.csv"), index=False)
+
+    print(f"\n{len(results)} candidates in {wall_s:.1f} s ({sum(r['train_s'] for r in results):.1f} s of training)\n")
+    print(f"{'rank':>4s} {'units':12s} {'batch':>5s} {'epochs':>6s} {'val_loss':>9s} {'cost/1k':>8s} {'(default)':>9s} "
+          f"{'stopped':>7s} {'allowed':>7s} {'blocked':>7s}")
+    for r in results:
+        stopped = f"{r['attacks_stopped']:.1%}" if r["attacks_stopped"] is not None else "-"
+        print(f"{r['rank']:4d} {','.join(map(str, r['units'])):12s} {r['batch_size']:5d} {r['epochs']:6d} "
+              f"{r['val_loss']:9.5f} {r['cost_per_1k']:8.2f} {r['default_thresholds_cost_per_1k']:9.2f} "
+              f"{stopped:>7s} {r['genuine_allowed']:7.1%} {r['genuine_blocked']:7.1%}")
+    best = results[0]
+    print(f"\nBest thresholds: {json.dumps(best['thresholds'])}")
+    print(f"Report: {os.path.join(run_dir, 'report.json')}")
+
+    if args.publish:
+        # The bundle needs the preprocessing artifacts the candidate was trained with
+        joblib.dump(artifacts["ip_frequencies"], os.path.join(best["dir"], "ip_frequencies.pkl"))
+        joblib.dump(artifacts["label_encoders"], os.path.join(best["dir"], "label_encoders.pkl"))
+        joblib.dump(artifacts["scaler"], os.path.join(best["dir"], "scaler.pkl"))
+        pipeline.save(os.path.join(best["dir"], PIPELINE_PATH))
+        with np.load(features_path) as features:  # float16 / int8 exports, for AUTOENCODER_PRECISION
+            export_quantized(os.path.join(best["dir"], NUMPY_WEIGHTS_PATH), features["X_train"], args.source)
+        version = publish_bundle(best["dir"], thresholds=best["thresholds"], root=args.registry, activate=args.activate)
+        print(f"✅ Published the best candidate as model version {version}"
+              f"{' (active)' if args.activate else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,23 @@
 import numpy as np
-import pandas as pd
-import joblib
-from tensorflow.keras.models import load_model
+from numpy_autoencoder import load_autoencoder
+from feature_pipeline import FeaturePipeline
+from dataset_store import load_dataset, save_dataset
+from quantile_sketch import KLLSketch
 
-# Load scaler, autoencoder model, and IP frequency mapping
-scaler = joblib.load("scaler.pkl")
-autoencoder = load_model("autoencoder_model.keras")
-
-try:
-    ip_frequencies = joblib.load("ip_frequencies.pkl")  # Load precomputed IP frequency mapping
-except FileNotFoundError:
-    ip_frequencies = {}  # If missing, initialize as empty dictionary
+# Load the feature pipeline (scaler + IP frequency mapping) and autoencoder model
+feature_pipeline = FeaturePipeline.load("feature_pipeline.pkl")
+autoencoder = load_autoencoder()
 
 def detect_anomalies(data):
     """Detects anomalies using the trained autoencoder."""
-    # Compute missing columns
-    if 'login_hour' not in data:
-        data['login_hour'] = pd.to_datetime(data['login_time']).dt.hour  # Extract login hour
-
-    if 'ip_frequency' not in data:
-        # Compute frequency (normalized) using training distribution
-        data["ip_frequency"] = data["ip_address"].map(ip_frequencies).fillna(1 / len(ip_frequencies))
-
-    # Ensure only the expected features are used
-    required_features = ['latitude', 'longitude', 'typing_speed', 'mouse_speed', 'geo_velocity', 'login_hour', 'ip_frequency']
-    data = data[required_features]  # Keep only necessary columns
+    # Expected features only; login_hour and ip_frequency are derived the same way as in the API
+    data = feature_pipeline.feature_frame(data)
 
     # Handle missing values (fill with median)
     data.fillna(data.median(), inplace=True)
 
     # Normalize using the previously fitted scaler
-    data_scaled = scaler.transform(data)
+    data_scaled = feature_pipeline.transform_rows(data.values)
 
     # Reconstruct using the autoencoder
     reconstructed = autoencoder.predict(data_scaled)
@@ -42,19 +29,21 @@ def detect_anomalies(data):
 
 def main():
     # Load real login data with geo_velocity
-    df = pd.read_csv("augmented_login_data_v4_with_geo_velocity.csv")
+    df = load_dataset("augmented_login_data_v4_with_geo_velocity")
 
     # Detect anomalies
     reconstruction_errors = detect_anomalies(df)
 
-    # Define threshold for anomalies (e.g., top 5% highest errors)
-    threshold = np.percentile(reconstruction_errors, 95)
+    # Define threshold for anomalies (e.g., top 5% highest errors), from a quantile sketch of the errors
+    sketch = KLLSketch()
+    sketch.update_many(reconstruction_errors)
+    threshold = sketch.quantile(0.95)
     df["anomaly_score"] = reconstruction_errors
     df["is_anomalous"] = df["anomaly_score"] > threshold
 
     # Save results
-    df.to_csv("validated_anomalies.csv", index=False)
-    print("✅ Validation complete! Anomalies saved in validated_anomalies.csv.")
+    save_dataset(df, "validated_anomalies")
+    print("✅ Validation complete! Anomalies saved in the validated_anomalies dataset.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class WriteBehindWriter:
+    """Persists rows from a bounded in-memory queue on a background thread.
+
+    Rows are flushed through `insert_rows(rows)` (one multi-row INSERT) once `batch_size`
+    rows are queued or `flush_interval_ms` has passed. When the queue stays full for
+    `enqueue_timeout_ms` (backpressure), or an insert fails, rows are appended to a local
+    spill file and fsynced, then replayed once the database accepts writes again.
+    """
+
+    def __init__(self, insert_rows, max_queue=10000, batch_size=500, flush_interval_ms=200,
+                 enqueue_timeout_ms=50, spill_path="login_attempts_spill.jsonl",
+                 datetime_fields=("login_time",), spill_retry_s=5.0):
+        self.insert_rows = insert_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout_ms / 1000.0
+        self.spill_path = spill_path
+        self.datetime_fields = datetime_fields
+        self.spill_retry_s = spill_retry_s
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_spilled = 0
+        self.rows_replayed = 0
+        self.rows_quarantined = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._next_replay = 0.0
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        """Queues one row; blocks up to enqueue_timeout_ms, then spills it to disk."""
+        if self._stopping.is_set():
+            raise RuntimeError("WriteBehindWriter is closed")
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._spill([row])
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._collect_batch()
+                if batch:
+                    self._flush(batch)
+                elif self._stopping.is_set():
+                    break
+                if time.monotonic() >= self._next_replay:
+                    self._replay_spill()
+            except Exception:
+                # Never let one bad batch or replay stop the writer for good
+                logging.exception("Write-behind worker error")
+                self._next_replay = time.monotonic() + self.spill_retry_s
+        self._replay_spill()
+
+    def _collect_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        try:
+            self.insert_rows(batch)
+            self.rows_written += len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            logging.error(f"Write-behind flush of {len(batch)} rows failed, spilling to {self.spill_path}: {e}")
+            self._spill(batch)
+            self._next_replay = time.monotonic() + self.spill_retry_s
+
+    def _spill(self, rows):
+        self._append_spill(rows)
+        self.rows_spilled += len(rows)
+
+    def _append_spill(self, rows):
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=_encode_datetime) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _replay_spill(self):
+        """Moves spilled rows back into the database, keeping the rows that fail to insert.
+
+        The lock is only held to move the spill file aside (to <spill_path>.replay), so request
+        threads spilling under backpressure never wait for the inserts. A .replay file left by a
+        crash or a failed insert is replayed first. Lines that don't decode (e.g. the last line
+        of an interrupted spill write) are moved to <spill_path>.bad.
+        """
+        replay_path = self.spill_path + ".replay"
+        try:
+            with self._spill_lock:
+                if not os.path.exists(replay_path):
+                    if not os.path.exists(self.spill_path):
+                        return
+                    os.replace(self.spill_path, replay_path)
+            rows = self._read_spill(replay_path)
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    self.insert_rows(rows[start:start + self.batch_size])
+                    self.rows_replayed += len(rows[start:start + self.batch_size])
+            except Exception as e:
+                self._next_replay = time.monotonic() + self.spill_retry_s
+                logging.warning(f"Spill replay failed, retrying in {self.spill_retry_s}s: {e}")
+                _write_rows(replay_path, rows[start:])  # Only the rows that were not inserted
+                return
+            os.remove(replay_path)
+        except Exception:
+            logging.exception(f"Spill replay of {replay_path} failed")
+            self._next_replay = time.monotonic() + self.spill_retry_s
+
+    def _read_spill(self, path):
+        rows, bad = [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(self._decode_row(json.loads(line)))
+                except ValueError:
+                    bad.append(line if line.endswith("\n") else line + "\n")
+        if bad:
+            logging.warning(f"Moving {len(bad)} undecodable spill lines to {self.spill_path}.bad")
+            with open(self.spill_path + ".bad", "a", encoding="utf-8") as f:
+                f.writelines(bad)
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows_quarantined += len(bad)
+        return rows
+
+    def _decode_row(self, row):
+        for field in self.datetime_fields:
+            if isinstance(row.get(field), str):
+                row[field] = datetime.fromisoformat(row[field])
+        return row
+
+    def close(self):
+        """Stops accepting rows and drains the queue and spill file before returning."""
+        self._stopping.set()
+        self._worker.join()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+            "rows_spilled": self.rows_spilled,
+            "rows_replayed": self.rows_replayed,
+            "rows_quarantined": self.rows_quarantined,
+            "spill_pending": os.path.exists(self.spill_path) or os.path.exists(self.spill_path + ".replay"),
+        }
+
+
+def _encode_datetime(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _write_rows(path, rows):
+    """Atomically replaces `path` with `rows` as JSON lines."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_encode_datetime) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)